@@ -0,0 +1,53 @@
+"""
+Resident memory over many calls of compiled kernels which allocate
+temporaries or return freshly allocated arrays. With temporaries placed 
+in the per-thread memory pool and returned arrays owning their data, 
+the RSS should stay flat after the first few calls. 
+Pass the number of calls on the command line (default 10^6). 
+"""
+import os
+import sys
+import time 
+
+import numpy as np
+
+from parakeet import jit 
+
+def temp_sum(x):
+  y = x + 1
+  y[0] = 3.0
+  return np.sum(y)
+
+def loop_temps(x, n):
+  total = 0.0
+  for i in range(n):
+    y = x * i
+    y[1] = 0
+    total += np.sum(y)
+  return total
+
+def add_one(x):
+  return x + 1
+
+_page_size = os.sysconf('SC_PAGE_SIZE')
+
+def rss_mb():
+  with open('/proc/self/statm') as f:
+    return int(f.read().split()[1]) * _page_size / 2.0 ** 20
+
+n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+n_reports = 10 
+x = np.random.randn(1000)
+
+for name, fn, args in [('temp_sum', temp_sum, (x,)), 
+                       ('loop_temps', loop_temps, (x, 4)), 
+                       ('add_one', add_one, (x,))]:
+  jit_fn = jit(fn)
+  jit_fn(*args)
+  print "--- %s, RSS (MB) every %d calls ---" % (name, n_calls / n_reports)
+  start_t = time.time()
+  for report in xrange(n_reports):
+    for _ in xrange(n_calls / n_reports):
+      jit_fn(*args)
+    print "  %10d calls %10.1f MB" % ((report + 1) * (n_calls / n_reports), rss_mb())
+  print "  %.2f us/call" % ((time.time() - start_t) / n_calls * 10 ** 6)
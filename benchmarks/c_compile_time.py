@@ -0,0 +1,63 @@
+"""
+Time spent by the C compiler on the generated source of the kernels from
+compile_time.py, once the usual way and once with the Python, NumPy and C
+library headers loaded from a precompiled header, as well as at the quick
+and hot optimization levels used by tiered compilation. Each starts from an
+empty cache directory, the time to build the precompiled header is shown apart.
+
+Usage: python c_compile_time.py [repeat]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from compile_time import kernels, load_functions, generate_source
+
+def compile_all(sources, precompiled_headers, opt_level = None):
+  """
+  Returns the time to set up the precompiled header and
+  the total time spent compiling all the sources
+  """
+  from parakeet.c_backend import config as c_config, prelude
+  from parakeet.c_backend.compile_util import compile_module_from_source, get_compiler
+  from parakeet.c_backend.flags import get_compiler_flags
+  if opt_level is None:
+    opt_level = c_config.opt_level
+  opt_flags = opt_level.split()
+  old_dir, old_pch = c_config.cache_dir, c_config.precompiled_headers
+  c_config.cache_dir = tempfile.mkdtemp(prefix = "parakeet_bench")
+  c_config.precompiled_headers = precompiled_headers
+  prelude._dirs.clear()
+  try:
+    start_t = time.time()
+    for flags in set(tuple(src['extra_compile_flags']) for src in sources):
+      prelude.prelude_dir(get_compiler(), get_compiler_flags(list(flags), opt_flags = opt_flags))
+    setup_time = time.time() - start_t
+    start_t = time.time()
+    for src in sources:
+      compile_module_from_source(opt_flags = opt_flags, **src)
+    return setup_time, time.time() - start_t
+  finally:
+    shutil.rmtree(c_config.cache_dir)
+    c_config.cache_dir, c_config.precompiled_headers = old_dir, old_pch
+
+if __name__ == '__main__':
+  repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+  sources = []
+  for (filename, fn_name, make_args) in kernels:
+    fn = load_functions(filename)[fn_name]
+    sources.append(generate_source(fn, make_args()))
+  from parakeet.c_backend import config as c_config
+  for src in sources:
+    del src['opt_flags']
+  print "%-40s %10s %10s %14s" % ("", "setup (s)", "total (s)", "per kernel (s)")
+  for (name, precompiled, opt_level) in \
+      [("plain", False, None), 
+       ("precompiled headers", True, None), 
+       ("quick: " + c_config.quick_opt_level, True, c_config.quick_opt_level), 
+       ("hot: " + c_config.hot_opt_level, True, c_config.hot_opt_level)]:
+    results = [compile_all(sources, precompiled, opt_level) for _ in xrange(repeat)]
+    setup_time = min(setup for (setup, _) in results)
+    total = min(t for (_, t) in results)
+    print "%-40s %10.3f %10.3f %14.3f" % (name, setup_time, total, total / len(sources))
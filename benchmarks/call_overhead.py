@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+
+from parakeet import jit, run_untyped_fn, config
+
+def add_scalars(x, y, z = 1):
+  return x + y + z
+
+def add_vecs(x, y):
+  return x + y
+
+def time_calls(fn, args, kwargs = {}, n = 10000):
+  # warm up, make sure everything's been compiled
+  fn(*args, **kwargs)
+  start_t = time.time()
+  for _ in xrange(n):
+    fn(*args, **kwargs)
+  return (time.time() - start_t) / n * 10.0 ** 6
+
+def compare_call_overhead(fn, args, kwargs = {}, n = 10000):
+  jit_fn = jit(fn)
+  jit_fn(*args, **kwargs)
+  untyped = jit_fn.untyped
+
+  def full_frontend(*args, **kwargs):
+    return run_untyped_fn(untyped, args, kwargs)
+
+  print "--- %s (backend = %s) ---" % (fn.__name__, config.backend)
+  print "  Python                : %8.2f us/call" % time_calls(fn, args, kwargs, n)
+  print "  Parakeet (dispatch)   : %8.2f us/call" % time_calls(jit_fn, args, kwargs, n)
+  print "  Parakeet (no dispatch): %8.2f us/call" % time_calls(full_frontend, args, kwargs, n)
+
+x = np.arange(10, dtype = 'float64')
+y = np.arange(10, dtype = 'float64')
+
+compare_call_overhead(add_scalars, (3, 4.0))
+compare_call_overhead(add_scalars, (3, 4.0), {'z' : 2})
+compare_call_overhead(add_vecs, (x, y))
+compare_call_overhead(add_vecs, (x[::2], y[::2]))
@@ -0,0 +1,155 @@
+"""
+Compile time and peak memory of Parakeet's compiler on kernels taken from
+the other benchmarks. Each kernel gets compiled in a fresh process, from
+Python source all the way down to the generated C (the C compiler itself
+isn't included), so the numbers reflect the cost of specialization and
+the transformation pipeline. Reports the best of several runs of the
+wall time and of the growth in peak RSS during compilation.
+
+Usage: python compile_time.py [repeat] [kernel_name ...]
+       python compile_time.py --profile kernel_name
+"""
+import ast
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+_dir = os.path.dirname(os.path.abspath(__file__))
+
+def _small_image():
+  return (np.random.randn(32, 32) ** 2).astype('float32')
+
+# (benchmark file, function name, small example arguments)
+kernels = [
+  ('harris.py', 'harris', lambda: [_small_image()]),
+  ('growcut.py', 'growcut_par',
+    lambda: [np.zeros((8, 8, 3)), np.zeros((8, 8, 2)), 2]),
+  ('kmeans.py', 'kmeans_loops', lambda: [np.random.randn(20, 3), 2, 2]),
+  ('allpairs_distances.py', 'sqr_dists',
+    lambda: [np.random.randn(20, 3), np.random.randn(5, 3)]),
+  ('allpairs_distances.py', 'sqr_dists_loops',
+    lambda: [np.random.randn(20, 3), np.random.randn(5, 3)]),
+  ('arc_distance.py', 'arc_distance_python_nested_for_loops',
+    lambda: [np.random.rand(10, 2), np.random.rand(10, 2)]),
+  ('matmult_tropical.py', 'matmult_loops',
+    lambda: [np.random.randn(4, 3), np.random.randn(3, 5), np.zeros((4, 5))]),
+  ('rosenbrock.py', 'rosen_der_loops', lambda: [np.random.randn(10)]),
+  ('rosenbrock.py', 'rosen_der_np', lambda: [np.random.randn(10)]),
+  ('summation.py', 'summation',
+    lambda: [np.random.randn(6, 3), np.random.randn(6), np.random.randn(4, 3)]),
+  ('simple_regression.py', 'fit_simple_regression',
+    lambda: [np.random.randn(10), np.random.randn(10)]),
+  ('smoothing.py', 'smooth',
+    lambda: [np.random.randn(10).astype('float32'), 0.01]),
+  ('2d_convolution.py', 'conv',
+    lambda: [np.random.randn(8, 8), np.random.randn(3, 3)]),
+  ('julia.py', 'julia', lambda: [0.285, 0.01, 8]),
+  ('parallel_reductions.py', 'kmeans_assignments',
+    lambda: [np.random.randn(20, 3), np.random.randn(4, 3)]),
+  ('sph_render.py', 'render_image',
+    lambda: [np.random.rand(10) for _ in xrange(7)] + [8, 8, 0.0, 1.0, 0.0, 1.0]),
+]
+
+# leave out imports of Numba and of the timing helpers
+_modules = ('math', 'numpy', 'parakeet')
+
+def load_functions(filename):
+  """
+  Run only the imports and function definitions of a benchmark script,
+  since the scripts themselves go on to time everything at full size
+  """
+  with open(os.path.join(_dir, filename)) as f:
+    tree = ast.parse(f.read(), filename)
+  def keep(stmt):
+    if isinstance(stmt, ast.Import):
+      return all(alias.name.split('.')[0] in _modules for alias in stmt.names)
+    elif isinstance(stmt, ast.ImportFrom):
+      return stmt.module.split('.')[0] in _modules
+    return isinstance(stmt, ast.FunctionDef)
+  tree.body = filter(keep, tree.body)
+  namespace = {'__name__' : filename[:-3]}
+  exec compile(tree, filename, 'exec') in namespace
+  return namespace
+
+def generate_source(fn, args):
+  from parakeet.c_backend import PyModuleCompiler, specialize_entry
+  from parakeet.c_backend.prepare_args import prepare_args
+  from parakeet.frontend import ast_conversion
+  from parakeet.frontend.run_function import specialize
+
+  untyped = ast_conversion.translate_function_value(fn)
+  typed_fn, linear_args = specialize(untyped, args)
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  entry_fn = specialize_entry(typed_fn, linear_args)
+  return PyModuleCompiler().entry_source(entry_fn)
+
+def compile_kernel(filename, fn_name, make_args):
+  """
+  Returns the compile time in seconds and the growth in peak RSS in MB
+  """
+  # keep importing Parakeet out of the measurements
+  import parakeet
+  fn = load_functions(filename)[fn_name]
+  args = make_args()
+  rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  start_t = time.time()
+  generate_source(fn, args)
+  elapsed = time.time() - start_t
+  rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return elapsed, (rss_after - rss_before) / 1024.0
+
+def run_in_subprocess(fn_name):
+  child = subprocess.Popen([sys.executable, __file__, '--child', fn_name],
+                           stdout = subprocess.PIPE, stderr = subprocess.STDOUT)
+  output = child.communicate()[0]
+  if child.returncode != 0:
+    print output
+    return None
+  elapsed, rss_mb = output.split()[-2:]
+  return float(elapsed), float(rss_mb)
+
+def profile_kernel(filename, fn_name, make_args, n_lines = 25):
+  import cProfile
+  import pstats
+  import parakeet
+  fn = load_functions(filename)[fn_name]
+  args = make_args()
+  profiler = cProfile.Profile()
+  profiler.runcall(generate_source, fn, args)
+  pstats.Stats(profiler).sort_stats('time').print_stats(n_lines)
+
+if __name__ == '__main__':
+  if len(sys.argv) == 3 and sys.argv[1] == '--profile':
+    for (filename, fn_name, make_args) in kernels:
+      if fn_name == sys.argv[2]:
+        profile_kernel(filename, fn_name, make_args)
+    sys.exit(0)
+
+  if len(sys.argv) == 3 and sys.argv[1] == '--child':
+    for (filename, fn_name, make_args) in kernels:
+      if fn_name == sys.argv[2]:
+        print "%f %f" % compile_kernel(filename, fn_name, make_args)
+    sys.exit(0)
+
+  repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+  selected = sys.argv[2:]
+  total_time = 0.0
+  total_rss = 0.0
+  print "%-40s %12s %16s" % ("kernel", "time (s)", "peak RSS (MB)")
+  for (filename, fn_name, _) in kernels:
+    if selected and fn_name not in selected:
+      continue
+    results = [run_in_subprocess(fn_name) for _ in xrange(repeat)]
+    if None in results:
+      print "%-40s %12s" % (fn_name, "failed")
+      continue
+    best_time = min(elapsed for (elapsed, _) in results)
+    best_rss = min(rss_mb for (_, rss_mb) in results)
+    total_time += best_time
+    total_rss += best_rss
+    print "%-40s %12.3f %16.1f" % (fn_name, best_time, best_rss)
+  print "%-40s %12.3f %16.1f" % ("total", total_time, total_rss)
@@ -0,0 +1,62 @@
+"""
+Irregular workloads under different OpenMP schedules and thread counts, 
+all of which get picked at call time without recompiling. 
+"""
+import multiprocessing
+import time 
+
+import numpy as np
+
+import parakeet 
+from parakeet import jit 
+
+def collatz_len(a0):
+  a = a0
+  length = 0
+  while a != 1:
+    a = (a if a % 2 == 0 else 3 * a + 1) / 2
+    length += 1
+  return length
+
+def collatz_lengths(xs):
+  return parakeet.each(collatz_len, xs)
+
+def kernel(zr, zi, cr, ci, lim, cutoff):
+  count = 0
+  while ((zr*zr + zi*zi) < (lim*lim)) and count < cutoff:
+    zr, zi = zr * zr - zi * zi + cr, 2 * zr * zi + ci
+    count += 1
+  return count
+
+def julia(cr, ci, N, bound = 1.5, lim = 1000., cutoff = 1e6):
+  grid_x = np.linspace(-bound, bound, N)
+  return np.array([[kernel(x, y, cr, ci, lim, cutoff) 
+                    for x in grid_x] 
+                    for y in grid_x])
+
+def best_time(fn, args, kwargs, repeat = 3):
+  fn(*args, **kwargs)
+  best = np.inf 
+  for _ in xrange(repeat):
+    start_t = time.time()
+    fn(*args, **kwargs)
+    best = min(best, time.time() - start_t)
+  return best 
+
+schedules = [('static', None), ('static', 16), ('dynamic', 1), 
+             ('dynamic', 16), ('guided', None)]
+thread_counts = sorted(set([1, 2, multiprocessing.cpu_count()]))
+
+for name, fn, args in [('collatz', collatz_lengths, [np.arange(1, 10 ** 6)]), 
+                       ('julia', julia, [0.285, 0.01, 400])]:
+  jit_fn = jit(fn)
+  print "--- %s (seconds) ---" % name
+  print "  %-16s" % "schedule" + "".join("%10s" % ("%d threads" % n) for n in thread_counts)
+  for schedule, chunk_size in schedules:
+    times = [best_time(jit_fn, args, dict(_backend = 'openmp', 
+                                          _num_threads = num_threads, 
+                                          _schedule = schedule, 
+                                          _chunk_size = chunk_size))
+             for num_threads in thread_counts]
+    label = schedule if chunk_size is None else "%s,%d" % (schedule, chunk_size)
+    print "  %-16s" % label + "".join("%10.4f" % t for t in times)
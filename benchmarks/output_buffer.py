@@ -0,0 +1,48 @@
+"""
+Streaming loop over fixed size frames, comparing kernels which allocate 
+their result on every call against the same kernels writing into a 
+preallocated output array with _out. Frames bigger than malloc's mmap 
+threshold get fresh pages from the OS on every allocation, which is where 
+writing into the same output pays off the most. 
+Pass the number of frames on the command line (default 200). 
+"""
+import sys
+import time 
+
+import numpy as np
+
+from parakeet import jit 
+
+def normalize(frame, gain, offset):
+  return frame * gain + offset
+
+def magnitude(re, im):
+  return np.sqrt(re * re + im * im)
+
+def run(name, shape, jit_fn, args):
+  out = np.empty(shape)
+  expected = jit_fn(*args)
+  jit_fn(*args, _out = out)
+  assert np.allclose(out, expected)
+  
+  start_t = time.time()
+  for _ in xrange(n_frames):
+    jit_fn(*args)
+  alloc_t = time.time() - start_t 
+  
+  start_t = time.time()
+  for _ in xrange(n_frames):
+    jit_fn(*args, _out = out)
+  out_t = time.time() - start_t
+  
+  print "%s %s: allocating %.2f ms/frame, _out %.2f ms/frame (%.2fx)" % \
+    (name, shape, alloc_t / n_frames * 10 ** 3, out_t / n_frames * 10 ** 3, alloc_t / out_t)
+
+n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+for shape in [(480, 640), (2160, 3840)]:
+  re = np.random.randn(*shape)
+  im = np.random.randn(*shape)
+  for name, fn, args in [('normalize', normalize, (re, 1.5, 0.25)), 
+                         ('magnitude', magnitude, (re, im))]:
+    run(name, shape, jit(fn), args)
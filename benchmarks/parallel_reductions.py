@@ -0,0 +1,27 @@
+"""
+Reductions whose combiners aren't simple OpenMP operators: the C backend
+runs them sequentially (as the OpenMP backend used to), the OpenMP backend
+now reduces one chunk per core and merges the partial results.
+"""
+import numpy as np
+
+from compare_perf import compare_perf
+
+def reduce_min(x):
+  return np.min(x)
+
+def argmax(x):
+  return np.argmax(x)
+
+def kmeans_assignments(X, C):
+  # the expensive step of k-means: find the nearest centroid of each point
+  return np.array([np.argmin(np.array([np.sum((x-c)**2) for c in C])) for x in X])
+
+x = np.random.randn(10**7)
+compare_perf(reduce_min, [x], numba = False, backends = ('c', 'openmp'))
+compare_perf(argmax, [x], numba = False, backends = ('c', 'openmp'))
+
+n, d, k = 10**4, 50, 25
+X = np.random.randn(n, d)
+compare_perf(kmeans_assignments, [X, X[:k, :]], numba = False, 
+             backends = ('c', 'openmp'))
@@ -0,0 +1,42 @@
+"""
+Throughput of the blocked parallel scan (OpenMP backend) against the 
+sequential scan (C backend) and NumPy, for arrays from 10^3 up to 
+10^max_exponent elements (default 8, pass e.g. 9 on the command line 
+for machines with enough memory). 
+"""
+import sys
+import time 
+
+import numpy as np
+
+import parakeet 
+from parakeet import jit 
+
+def cumsum(x):
+  return np.cumsum(x)
+
+def running_max(x):
+  return parakeet.scan(parakeet.maximum, x, init = -np.inf)
+
+def throughput(fn, x, repeat = 3):
+  fn(x)
+  best = np.inf
+  for _ in xrange(repeat):
+    start_t = time.time()
+    fn(x)
+    best = min(best, time.time() - start_t)
+  return len(x) / best / 10.0 ** 6 
+
+max_exponent = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+
+for fn, numpy_fn in [(cumsum, np.cumsum), 
+                     (running_max, np.maximum.accumulate)]:
+  jit_fn = jit(fn)
+  print "--- %s (Melts/sec) ---" % fn.__name__
+  print "  %12s %10s %10s %10s" % ("n", "NumPy", "C", "OpenMP")
+  for exponent in xrange(3, max_exponent + 1):
+    x = np.random.randn(10 ** exponent)
+    print "  %12d %10.1f %10.1f %10.1f" % (len(x), 
+      throughput(numpy_fn, x), 
+      throughput(lambda x: jit_fn(x, _backend = 'c'), x), 
+      throughput(lambda x: jit_fn(x, _backend = 'openmp'), x))
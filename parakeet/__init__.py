@@ -23,6 +23,10 @@ from lib import *
 from prims import *
 
 from frontend import jit, macro, run_python_fn, run_untyped_fn, run_typed_fn
-from frontend import typed_repr, specialize, find_broken_transform
+from frontend import typed_repr, specialize, find_broken_transform, precompile, export
+from frontend import stats
+
+from profiling import profile_compile
+from caches import cache_stats, clear_caches
 
 
@@ -14,6 +14,7 @@ from index_elim_analysis import IndexElimAnalysis
 from inline_allowed import can_inline
 from mutability_analysis import find_mutable_types, TypeBasedMutabilityAnalysis
 from offset_analysis import OffsetAnalysis 
+from structural_key import settings_key, structural_key
 from syntax_visitor import SyntaxVisitor 
 from use_analysis import find_live_vars, use_count
 from usedef import StmtPath, UseDefAnalysis
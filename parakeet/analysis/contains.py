@@ -1,10 +1,11 @@
+from ..caches import LRUCache
 from ..ndtypes import ScalarT, PtrT, NoneT, TupleT, FnT, ClosureT 
 from .. syntax import Adverb, ParFor, Closure, UntypedFn, TypedFn, ArrayExpr  
 
 from syntax_visitor import SyntaxVisitor
 
 def memoize(analyzer):
-  _cache = {}
+  _cache = LRUCache("contains analysis")
   def memoized(fn_arg): 
     key = analyzer, fn_arg.cache_key
     if key in _cache:
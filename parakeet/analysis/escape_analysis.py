@@ -1,5 +1,6 @@
 
 from .. import config
+from .. caches import LRUCache
 from .. ndtypes import ScalarT, ArrayT, PtrT, TupleT, ClosureT, FnT, SliceT, NoneT
 from .. syntax import Var, Attribute, Tuple 
 from syntax_visitor import SyntaxVisitor
@@ -245,7 +246,7 @@ class EscapeAnalysis(SyntaxVisitor):
       self.update_escaped(name, combined_set)
       self.update_return(name, combined_set)
 
-_cache = {}
+_cache = LRUCache("escape analysis")
 def escape_analysis(fundef, fresh_alloc_args = set([])):
   key = fundef.cache_key, frozenset(fresh_alloc_args)
   if key in _cache:
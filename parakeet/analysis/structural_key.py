@@ -0,0 +1,154 @@
+"""
+Hashable description of a typed function which stays the same when its
+local variables get renamed, so that caches can share the work done on
+functions which only differ in their names (such as the specializations
+of two closures created by the same Python function).
+
+Two functions get the same key only if renaming the variables of one
+gives the other one: variables get numbered in the order in which they
+first appear, every node contributes its class, its type and all of its
+fields, and nested typed functions contribute their own keys. Anything
+which can't be described that way (untyped functions, values without a
+hash) leaves the whole function without a key.
+"""
+
+from .. ndtypes import ClosureT, TupleT, Type
+from .. syntax import Expr, TypedFn, Var
+from .. syntax.node import Node
+
+class Unkeyable(Exception):
+  pass
+
+_literal_types = (type(None), bool, int, long, float, complex, str)
+
+class StructuralKey(object):
+  def __init__(self, fn_keys):
+    # id of every typed function seen so far -> its key, shared
+    # with the keys being built for the functions nesting this one
+    self.fn_keys = fn_keys
+    self.names = {}
+    # while deciding in which order to number the outputs of phi nodes,
+    # look at their inputs without numbering any new variables
+    self.peek = False
+
+  def name(self, name):
+    idx = self.names.get(name)
+    if idx is None:
+      if self.peek:
+        return -1
+      idx = len(self.names)
+      self.names[name] = idx
+    return idx
+
+  def type_key(self, t):
+    c = t.__class__
+    if c is ClosureT and t.fn.__class__ is TypedFn:
+      return (c, fn_key(t.fn, self.fn_keys),
+              tuple(self.type_key(arg_t) for arg_t in t.arg_types))
+    elif c is TupleT:
+      return (c, tuple(self.type_key(elt_t) for elt_t in t.elt_types))
+    return t
+
+  def merge_key(self, merge):
+    """
+    Phi nodes map the names they define to pairs of incoming values, number
+    those names in an order which depends only on the incoming values
+    """
+    self.peek = True
+    try:
+      items = sorted((repr(self.value(v)), k, v) for (k, v) in merge.iteritems())
+    finally:
+      self.peek = False
+    result = []
+    for (_, k, v) in items:
+      if k.__class__ is not str:
+        raise Unkeyable(k)
+      result.append((self.name(k), self.value(v)))
+    return tuple(result)
+
+  def value(self, v):
+    c = v.__class__
+    if c is Var:
+      return (Var, self.name(v.name), self.type_key(getattr(v, 'type', None)))
+    fields = _node_fields.get(c)
+    if fields is None and c is not TypedFn and isinstance(v, Node):
+      fields = node_fields(c)
+    if fields is not None:
+      (is_expr, names) = fields
+      result = [c]
+      if is_expr:
+        result.append(self.type_key(getattr(v, 'type', None)))
+      for k in names:
+        result.append(self.value(getattr(v, k, None)))
+      return tuple(result)
+    elif c is TypedFn:
+      return (TypedFn, fn_key(v, self.fn_keys))
+    elif c is list or c is tuple:
+      return (c,) + tuple(self.value(elt) for elt in v)
+    elif c is dict:
+      return (dict, self.merge_key(v))
+    elif c in _literal_types:
+      # keep 1, 1.0 and True apart
+      return (c, v)
+    else:
+      try:
+        hash(v)
+      except TypeError:
+        raise Unkeyable(v)
+      return self.type_key(v) if isinstance(v, Type) else v
+
+# node class -> whether it's an expression (which adds its type to
+# the key) and the fields making up its key
+_node_fields = {}
+
+def node_fields(c):
+  if '__dict__' in dir(c):
+    # nodes which don't declare their fields in slots
+    # (such as UntypedFn) can't be described by them
+    raise Unkeyable(c)
+  fields = (issubclass(c, Expr), c.members())
+  _node_fields[c] = fields
+  return fields
+
+_in_progress = object()
+
+def fn_key(fn, fn_keys):
+  key = fn_keys.get(id(fn))
+  if key is _in_progress:
+    # recursive functions
+    raise Unkeyable(fn)
+  elif key is not None:
+    return key
+  fn_keys[id(fn)] = _in_progress
+  builder = StructuralKey(fn_keys)
+  arg_ids = tuple(builder.name(name) for name in fn.arg_names)
+  key = (tuple(builder.type_key(t) for t in fn.input_types),
+         builder.type_key(fn.return_type),
+         arg_ids,
+         builder.value(fn.body),
+         fn.transform_history.cache_key)
+  fn_keys[id(fn)] = key
+  return key
+
+def structural_key(fn, *config_modules):
+  """
+  Key shared by typed functions which are the same up to the names of
+  their variables, or None if the function can't be described by one.
+  The current settings of any given config modules also become part of
+  the key, since they change what gets made out of the same function. 
+  """
+  try:
+    key = fn_key(fn, {})
+  except Unkeyable:
+    return None
+  if config_modules:
+    key = key, settings_key(config_modules)
+  return key
+
+def settings_key(config_modules):
+  settings = []
+  for module in config_modules:
+    for (name, value) in sorted(vars(module).iteritems()):
+      if not name.startswith('_') and value.__class__ in _literal_types:
+        settings.append((module.__name__, name, value))
+  return tuple(settings)
@@ -1,15 +1,13 @@
-from .. syntax import (Expr, Assign, ExprStmt, ForLoop, If, Return, While, Comment, ParFor, 
-                       TypedFn, UntypedFn,  Closure, ClosureElt, Select,  
-                       Attribute, Const, Index, PrimCall, Tuple, Var, 
-                       Alloc, Array, Call, Struct, Shape, Strides, Range, Ravel, Transpose,
-                       AllocArray, ArrayView, Cast, Slice, TupleProj, TypeValue,  
-                       Map, Reduce, Scan, OuterMap, IndexMap, IndexReduce, IndexScan )
+from .. syntax import Attribute, Expr, Index, Tuple, Var 
+from .. syntax.dispatch_table import DispatchTable, find_handler
 
 class SyntaxVisitor(object):
   """
   Traverse the statement structure of a syntax block, optionally collecting
   values
   """
+  __metaclass__ = DispatchTable
+  _dispatch_prefixes = ("visit_",)
 
   def visit_if_expr(self, expr):
     if isinstance(expr, Expr):
@@ -172,69 +170,14 @@ class SyntaxVisitor(object):
     for v in expr.children():
       self.visit_expr(v)
 
-  _expr_method_names = {
-    Var : 'visit_Var', 
-    Const : 'visit_Const', 
-    PrimCall : 'visit_PrimCall', 
-    Attribute : 'visit_Attribute', 
-    Index : 'visit_Index', 
-    Tuple : 'visit_Tuple', 
-    TupleProj : 'visit_TupleProj', 
-    Slice : 'visit_Slice', 
-    Struct : 'visit_Struct', 
-    AllocArray : 'visit_AllocArray', 
-    ArrayView : 'visit_ArrayView', 
-    Array : 'visit_Array',
-    Range : 'visit_Range',
-    Ravel : 'visit_Ravel',   
-    Transpose : 'visit_Transpose', 
-    Shape : 'visit_Shape', 
-    Strides : 'visit_Strides', 
-    Alloc : 'visit_Alloc', 
-    Cast : 'visit_Cast', 
-    Call : 'visit_Call', 
-    Select : 'visit_Select', 
-    Map : 'visit_Map',
-    OuterMap : 'visit_OuterMap',
-    IndexMap : 'visit_IndexMap', 
-    Reduce : 'visit_Reduce',
-    IndexReduce : 'visit_IndexReduce',
-    Scan : 'visit_Scan', 
-    IndexScan : 'visit_IndexScan',
-    Closure : 'visit_Closure', 
-    ClosureElt : 'visit_ClosureElt', 
-    UntypedFn : 'visit_UntypedFn',  
-    TypedFn : 'visit_TypedFn', 
-    TypeValue : 'visit_TypeValue', 
-  }
-  
   def visit_expr(self, expr):   
     c = expr.__class__
-    if c is Var:  
-      return self.visit_Var(expr)
-    elif c is Const: 
-      return self.visit_Const(expr)
-    elif c is PrimCall:
-      return self.visit_PrimCall(expr)
-    elif c is Tuple:
-      return self.visit_Tuple(expr)
-    elif c is TupleProj:
-      return self.visit_TupleProj(expr) 
-    elif c is Index: 
-      return self.visit_Index(expr)
-    
-    # try looking up the method in fast-path dictionary
-    method_name = self._expr_method_names.get(c)
-    if not method_name:
-      # ...otherwise, just construct a new string following the visit_Expr pattern 
-      method_name = "visit_" + c.__name__
-    
-    # if we found a method, call it 
-    if method_name:
-      method = getattr(self, method_name)
-      
-    if method:
-      return method(expr)
+    try:
+      method = self._visit_methods[c]
+    except KeyError:
+      method = find_handler(self.__class__, "visit_", c)
+    if method is not None:
+      return method(self, expr)
 
     for child in expr.children():
       self.visit_expr(child)
@@ -324,24 +267,15 @@ class SyntaxVisitor(object):
     self.visit_expr(expr.fn)
     self.visit_expr(expr.bounds)
   
-  _stmt_method_names = {
-    Assign : 'visit_Assign', 
-    Return : 'visit_Return', 
-    While : 'visit_While', 
-    ForLoop : 'visit_ForLoop', 
-    If : 'visit_If', 
-    ExprStmt : 'visit_ExprStmt', 
-    ParFor : 'visit_ParFor', 
-    Comment : 'visit_Comment',                    
-  }
-  
   def visit_stmt(self, stmt):
     c = stmt.__class__
-    if c is Assign: 
-      self.visit_Assign(stmt)
-    else:
-      getattr(self, self._stmt_method_names[c])(stmt)
-    
+    try:
+      method = self._visit_methods[c]
+    except KeyError:
+      method = find_handler(self.__class__, "visit_", c)
+    assert method is not None, \
+      "Statement %s not supported by %s" % (c.__name__, self.__class__.__name__)
+    method(self, stmt)
 
   def visit_fn(self, fn):
     self.visit_block(fn.body)
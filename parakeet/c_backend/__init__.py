@@ -1,3 +1,3 @@
 from fn_compiler import FnCompiler
 from pymodule_compiler import PyModuleCompiler
-from run_function import run 
+from run_function import run, compile_entry, specialize_entry
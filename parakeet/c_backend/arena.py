@@ -0,0 +1,103 @@
+"""
+C source for the memory pool used by temporaries which don't escape the
+compiled function allocating them.
+
+Every thread keeps its own list of chunks and allocates from them by bumping
+an offset. A function which allocates from the pool remembers the position
+it started from and rewinds to it before returning, so everything it allocated
+gets released in bulk and the chunks get reused by the next call. Since
+functions always return in the opposite order they were called, and OpenMP
+worker threads only ever touch their own pool, nothing needs locking.
+"""
+
+import config
+
+arena_signature = "static void* parakeet_arena_alloc(size_t nbytes)"
+
+def arena_source():
+  return """
+typedef struct parakeet_arena_chunk {
+  struct parakeet_arena_chunk* next;
+  size_t size;
+  size_t used;
+  // keep the data which follows this header 16 byte aligned
+  size_t padding;
+} parakeet_arena_chunk;
+
+static __thread parakeet_arena_chunk* parakeet_arena_head = NULL;
+static __thread parakeet_arena_chunk* parakeet_arena_current = NULL;
+
+%(signature)s {
+  parakeet_arena_chunk** link;
+  parakeet_arena_chunk* chunk = parakeet_arena_current;
+  nbytes = (nbytes + 15) & ~((size_t) 15);
+  if (chunk && chunk->size - chunk->used >= nbytes) {
+    void* ptr = (char*) (chunk + 1) + chunk->used;
+    chunk->used += nbytes;
+    return ptr;
+  }
+  // move on to the first spare chunk which is big enough
+  link = chunk ? &chunk->next : &parakeet_arena_head;
+  while (*link && (*link)->size < nbytes) { link = &(*link)->next; }
+  if (!*link) {
+    size_t size = nbytes > %(chunk_bytes)dL ? nbytes : %(chunk_bytes)dL;
+    parakeet_arena_chunk* new_chunk =
+      (parakeet_arena_chunk*) malloc(sizeof(parakeet_arena_chunk) + size);
+    if (!new_chunk) { return NULL; }
+    new_chunk->next = NULL;
+    new_chunk->size = size;
+    *link = new_chunk;
+  }
+  chunk = *link;
+  chunk->used = nbytes;
+  parakeet_arena_current = chunk;
+  return chunk + 1;
+}
+
+static void parakeet_arena_release(parakeet_arena_chunk* chunk, size_t used) {
+  parakeet_arena_chunk** link;
+  size_t retained = 0;
+  parakeet_arena_current = chunk;
+  if (chunk) {
+    chunk->used = used;
+    link = &chunk->next;
+  } else {
+    link = &parakeet_arena_head;
+  }
+  // keep some spare chunks around for later calls and give back the rest
+  while (*link) {
+    parakeet_arena_chunk* spare = *link;
+    if (retained + spare->size <= %(retain_bytes)dL) {
+      retained += spare->size;
+      link = &spare->next;
+    } else {
+      *link = spare->next;
+      free(spare);
+    }
+  }
+}
+""" % {'signature' : arena_signature,
+       'chunk_bytes' : config.arena_chunk_bytes,
+       'retain_bytes' : config.arena_retain_bytes}
+
+owned_buffer_signature = "static PyObject* parakeet_own_buffer(PyObject** owned, void* data)"
+
+owned_buffer_source = """
+static void parakeet_free_buffer(PyObject* capsule) {
+  free(PyCapsule_GetPointer(capsule, NULL));
+}
+
+%s {
+  // the capsule frees the data once the last array using it is gone,
+  // until the entry point returns it's kept alive by the owned list
+  PyObject* capsule = PyCapsule_New(data, NULL, parakeet_free_buffer);
+  if (!capsule) { return NULL; }
+  if (!*owned) { *owned = PyList_New(0); }
+  if (!*owned || PyList_Append(*owned, capsule) < 0) {
+    Py_DECREF(capsule);
+    return NULL;
+  }
+  Py_DECREF(capsule);
+  return capsule;
+}
+""" % owned_buffer_signature
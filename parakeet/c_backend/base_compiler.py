@@ -1,10 +1,13 @@
 from .. import names 
+from ..syntax.dispatch_table import DispatchTable, find_handler
 from ..ndtypes import BoolT, IntT 
 import type_mappings 
 from reserved_names import is_reserved
 
 
 class BaseCompiler(object):
+  __metaclass__ = DispatchTable
+  _dispatch_prefixes = ("visit_",)
   
   def __init__(self, extra_link_flags = None, extra_compile_flags = None):
     self.blocks = []
@@ -23,12 +26,16 @@ class BaseCompiler(object):
         
   
   def visit_expr(self, expr):
-    expr_class_name = expr.__class__.__name__
-    method_name = "visit_" + expr_class_name
-    assert hasattr(self, method_name), "Unsupported expression %s" % expr_class_name  
-    result = getattr(self, method_name)(expr)
+    expr_class = expr.__class__
+    try:
+      method = self._visit_methods[expr_class]
+    except KeyError:
+      method = find_handler(self.__class__, "visit_", expr_class)
+    assert method is not None, "Unsupported expression %s" % expr_class.__name__  
+    result = method(self, expr)
     assert result is not None, \
-      "Compilation method for expression %s returned None, expected code string" % expr_class_name
+      "Compilation method for expression %s returned None, expected code string" % \
+      expr_class.__name__
     return result 
       
   def visit_expr_list(self, exprs):
@@ -38,12 +45,16 @@ class BaseCompiler(object):
     self.append("raise(SIGINT);")
     
   def visit_stmt(self, stmt):
-    stmt_class_name = stmt.__class__.__name__
-    method_name = "visit_" + stmt_class_name
-    assert hasattr(self, method_name), \
-      "Statement %s not supported by %s" % (stmt_class_name, self.__class__.__name__)  
-    result = getattr(self, method_name)(stmt)
-    assert result is not None, "Compilation method for statement %s return None" % stmt_class_name
+    stmt_class = stmt.__class__
+    try:
+      method = self._visit_methods[stmt_class]
+    except KeyError:
+      method = find_handler(self.__class__, "visit_", stmt_class)
+    assert method is not None, \
+      "Statement %s not supported by %s" % (stmt_class.__name__, self.__class__.__name__)  
+    result = method(self, stmt)
+    assert result is not None, \
+      "Compilation method for statement %s return None" % stmt_class.__name__
     return result 
   
   def push(self):
@@ -6,6 +6,7 @@ import os
 from tempfile import NamedTemporaryFile
 
 from .. import config as root_config 
+from .. profiling import mark, timed
 import config 
   
 from system_info import (python_lib_dir,  
@@ -13,7 +14,11 @@ from system_info import (python_lib_dir,
                          get_source_extension, object_extension, shared_extension,  
                          get_compiler, 
                          include_dirs)
-from flags import get_compiler_flags, get_linker_flags
+import disk_cache
+from entry_stats import stats_fn_name
+from prelude import (c_headers, core_python_headers, numpy_headers, python_headers, 
+                     global_preprocessor_defs, prelude_lines, prelude_header, prelude_dir)
+from flags import get_compiler_flags, get_linker_flags, get_opt_flags
 from shell_command import CommandFailed, run_cmd 
 
 CompiledPyFn = collections.namedtuple(
@@ -25,7 +30,9 @@ CompiledPyFn = collections.namedtuple(
      "shared_filename", 
      "src", 
      "fn_name",
-     "fn_signature"
+     "fn_signature", 
+     # returns the entry point's timing counters, if it was compiled with them
+     "stats_fn", 
   )
 )
 
@@ -38,32 +45,55 @@ CompiledObject = collections.namedtuple(
   )
 )
 
-  
-c_headers = ["stdint.h",  "math.h",  "signal.h"]
-core_python_headers = ["Python.h"]
-numpy_headers = ['numpy/arrayobject.h', 'numpy/arrayscalars.h']
-
-python_headers = core_python_headers + numpy_headers 
 
-# went to some annoying effort to clean up all the array->flags, &c that have been 
-# replaced with PyArray_FLAGS in NumPy 1.7 
-global_preprocessor_defs = ["#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION"]
 
+def module_init_source(module_name, fn_names):
+  """
+  Method table and init function of a Python extension module 
+  which exposes the given C entry points
+  """
+  method_defs = "".join("""
+      {"%(fn_name)s",  %(fn_name)s, METH_VARARGS,
+       "%(fn_name)s"},
+""" % {'fn_name' : fn_name} for fn_name in fn_names)
+  return """
+    \n\n
+    static PyMethodDef %(module_name)sMethods[] = {%(method_defs)s
+      {NULL, NULL, 0, NULL}        /* Sentinel */
+    };
+  
+    PyMODINIT_FUNC
+    init%(module_name)s(void)
+    {
+      //Py_Initialize();
+      Py_InitModule("%(module_name)s", %(module_name)sMethods);
+      import_array();
+    }
+  """ % locals()
 
 def create_module_source(raw_src, fn_name, 
                             extra_headers = [], 
                             declarations = [], 
                             extra_function_sources = [], 
-                            print_source = None):
-    # when compiling with NVCC, other headers get implicitly included 
-  # and cause warnings since Python redefines this constant
-  src_lines = list(global_preprocessor_defs) 
-  if config.undef_posix_c_source:
-    src_lines.append("#undef _XOPEN_SOURCE")
-    src_lines.append("#undef _POSIX_C_SOURCE")
+                            print_source = None, 
+                            module_name = None, 
+                            entry_names = None, 
+                            prelude = None):
+  """
+  Full C source of an extension module, by default named after its single 
+  entry point fn_name, unless module_name and the list of entry_names are given.
+  With the name of a prelude header, the Python, NumPy and C library headers
+  come from that instead of extra_headers.
+  """
+  if module_name is None: module_name = fn_name 
+  if entry_names is None: entry_names = [fn_name]
   
-  for header in extra_headers + c_headers:
-    src_lines.append("#include <%s>" % header)
+  if prelude is None:
+    src_lines = prelude_lines(extra_headers + c_headers)
+  else:
+    # the standard headers come precompiled 
+    src_lines = ['#include "%s"' % prelude]
+    src_lines.extend("#include <%s>" % header for header in extra_headers)
   
   for decl in declarations:
     decl = decl.strip()
@@ -74,24 +104,7 @@ def create_module_source(raw_src, fn_name,
   src_lines.extend(extra_function_sources)
   
   src_lines.append(raw_src)
-  module_init = """
-    \n\n
-    static PyMethodDef %(fn_name)sMethods[] = {
-      {"%(fn_name)s",  %(fn_name)s, METH_VARARGS,
-       "%(fn_name)s"},
-
-      {NULL, NULL, 0, NULL}        /* Sentinel */
-    };
-  
-    PyMODINIT_FUNC
-    init%(fn_name)s(void)
-    {
-      //Py_Initialize();
-      Py_InitModule("%(fn_name)s", %(fn_name)sMethods);
-      import_array();
-    }
-  """ % locals()
-  src_lines.append(module_init)
+  src_lines.append(module_init_source(module_name, entry_names))
   full_src =  "\n".join(src_lines)
   
   if print_source is None: print_source = root_config.print_generated_code  
@@ -136,7 +149,8 @@ def compile_object(
       extra_compile_flags = [], 
       print_commands = None, 
       compiler = None, 
-      compiler_flag_prefix = None):
+      compiler_flag_prefix = None, 
+      opt_flags = None):
   
   
   if print_commands is None:  print_commands = config.print_commands
@@ -144,7 +158,7 @@ def compile_object(
   if compiler is None: compiler = get_compiler()
     
   object_name = src_filename.replace(src_extension, object_extension)
-  compiler_flags = get_compiler_flags(extra_compile_flags, compiler_flag_prefix)
+  compiler_flags = get_compiler_flags(extra_compile_flags, compiler_flag_prefix, opt_flags)
   
   if isinstance(compiler, (list,tuple)):
     compiler_cmd = list(compiler)
@@ -153,7 +167,8 @@ def compile_object(
     
   compiler_cmd += compiler_flags 
   compiler_cmd += ['-c', src_filename, '-o', object_name]
-  run_cmd(compiler_cmd, label = "Compile source")
+  with timed("compile", fn_name, src = src_filename):
+    run_cmd(compiler_cmd, label = "Compile source")
   
   return CompiledObject(src_filename = src_filename, 
                         object_filename = object_name, 
@@ -178,20 +193,22 @@ def link_module(
   env = os.environ.copy()
   if not windows:
     env["LD_LIBRARY_PATH"] = python_lib_dir
-  run_cmd(linker_cmd, env = env, label = "Linking")
+  with timed("link", os.path.basename(shared_name)):
+    run_cmd(linker_cmd, env = env, label = "Linking")
 
 def compile_with_distutils(extension_name, 
                               src_filename,
                               extra_objects = [], 
                               extra_compiler_flags = [],
                               extra_link_flags = [],   
-                              print_commands = False):
+                              print_commands = False, 
+                              opt_flags = None):
 
     # copied largely from pyxbuild 
     from distutils.dist import Distribution
     from distutils.extension import Extension
     
-    compiler_flags = get_compiler_flags(extra_compiler_flags)
+    compiler_flags = get_compiler_flags(extra_compiler_flags, opt_flags = opt_flags)
     # don't need -shared in the flags since the default CC on Mac OS 
     # might specify -bundle instead and the two are mutually exclusive
     linker_flags = get_linker_flags(extra_link_flags, shared=False)
@@ -229,10 +246,64 @@ def compiler_is_gnu(compiler):
           compiler.endswith("g++") or 
           compiler.endswith("g++.exe"))
 
+def build_module(src_filename, fn_name, digest, 
+                 src_extension, 
+                 extra_objects = [],
+                 extra_compile_flags = [], 
+                 extra_link_flags = [], 
+                 print_commands = False, 
+                 compiler = None, 
+                 compiler_flag_prefix = None, 
+                 linker_flag_prefix = None, 
+                 opt_flags = None):
+  """
+  Compile and link the source file into a shared object, 
+  return the name of the shared object 
+  """
+  if compiler is None: compiler = get_compiler()
+
+  try:
+    compiled_object = compile_object(src_filename,
+                                     fn_name = fn_name,
+                                     src_extension = src_extension,
+                                     extra_objects = extra_objects,
+                                     extra_compile_flags = extra_compile_flags,
+                                     print_commands = print_commands,
+                                     compiler = compiler,
+                                     compiler_flag_prefix = compiler_flag_prefix,
+                                     opt_flags = opt_flags)
+
+    object_name = compiled_object.object_filename
+    shared_name = src_filename.replace(src_extension, shared_extension)
+    link_module(compiler, object_name, shared_name,
+                extra_objects = extra_objects,
+                extra_link_flags = extra_link_flags,
+                linker_flag_prefix = linker_flag_prefix)
+
+    if config.delete_temp_files:
+      os.remove(object_name)
+  except CommandFailed:
+    # if normal compilation fails, try distutils instead
+    if not compiler_is_gnu(compiler):
+      raise
+    if compiler_flag_prefix or linker_flag_prefix:
+      raise
+
+    with timed("compile", fn_name, distutils = True):
+      shared_name = compile_with_distutils(fn_name + "_" + digest,
+                                           src_filename,
+                                           extra_objects,
+                                           extra_compile_flags,
+                                           extra_link_flags,
+                                           print_commands, 
+                                           opt_flags)
+  return shared_name 
+
 def compile_module_from_source(
       partial_src, 
       fn_name,
       fn_signature = None,  
+      entry_names = None, 
       src_filename = None,
       src_extension = None, 
       declarations = [],
@@ -245,89 +316,87 @@ def compile_module_from_source(
       print_commands = None, 
       compiler = None, 
       compiler_flag_prefix = None, 
-      linker_flag_prefix = None):
+      linker_flag_prefix = None, 
+      opt_flags = None):
   
   if print_source is None: print_source = root_config.print_generated_code 
   if print_commands is None: print_commands = config.print_commands
   if src_extension is None: src_extension = get_source_extension()
   
+  if compiler is None: compiler = get_compiler()
+  if opt_flags is None: opt_flags = get_opt_flags()
+  
+  compiler_flags = get_compiler_flags(extra_compile_flags, compiler_flag_prefix, opt_flags)
+  pch_dir = None
+  if compiler_is_gnu(compiler) and not compiler_flag_prefix:
+    pch_dir = prelude_dir(compiler, compiler_flags, src_extension)
+  if pch_dir is None:
+    prelude = None 
+    extra_headers = python_headers + extra_headers
+  else:
+    prelude = prelude_header()[0]
+    extra_compile_flags = list(extra_compile_flags) + ['-I%s' % pch_dir]
+  
   full_src = create_module_source(partial_src, fn_name, 
-                                 extra_headers = python_headers + extra_headers, 
+                                 extra_headers = extra_headers, 
+                                 prelude = prelude, 
                                  declarations = declarations,  
                                  extra_function_sources = extra_function_sources, 
-                                 print_source = print_source)
+                                 print_source = print_source, 
+                                 entry_names = entry_names)
 
 
-  digest = hashlib.sha224(full_src).hexdigest()
+  # the same source built with different flags 
+  # (such as another optimization level) is a different module 
+  digest = hashlib.sha224(full_src + repr(compiler_flags)).hexdigest()
   
-  if config.cache_dir:
-    cached_name = os.path.join(config.cache_dir, fn_name + "_" + digest + shared_extension)
-    have_cached_version = os.path.exists(cached_name)
-  else:
-    cached_name = None
-    have_cached_version = False
-
-  if have_cached_version:
-    shared_name = cached_name
-  else:
+  # the source file gets created by build, unless the module is cached
+  src_files = [src_filename]
+  def build():
     src_file = create_source_file(full_src,
                                   fn_name = fn_name,
                                   src_filename = src_filename,
                                   src_extension = src_extension)
-    src_filename = src_file.name
-
-    if compiler is None: compiler = get_compiler()
-
-    try:
-      compiled_object = compile_object(src_filename,
-                                       fn_name = fn_name,
-                                       src_extension = src_extension,
-                                       extra_objects = extra_objects,
-                                       extra_compile_flags = extra_compile_flags,
-                                       print_commands = print_commands,
-                                       compiler = compiler,
-                                       compiler_flag_prefix = compiler_flag_prefix)
-
-      object_name = compiled_object.object_filename
-      shared_name = src_filename.replace(src_extension, shared_extension)
-      link_module(compiler, object_name, shared_name,
-                  extra_objects = extra_objects,
-                  extra_link_flags = extra_link_flags,
-                  linker_flag_prefix = linker_flag_prefix)
-
-      if config.delete_temp_files:
-        os.remove(object_name)
-    except CommandFailed:
-      # if normal compilation fails, try distutils instead
-      if not compiler_is_gnu(compiler):
-        raise
-      if compiler_flag_prefix or linker_flag_prefix:
-        raise
-
-      shared_name = compile_with_distutils(fn_name + "_" + digest,
-                                           src_filename,
-                                           extra_objects,
-                                           extra_compile_flags,
-                                           extra_link_flags,
-                                           print_commands)
-
-  # if we're caching generated modules, move our output
-  # over to the cache directory before loading it up.
-  if config.cache_dir and not have_cached_version:
-    if print_commands:
-      print 'Caching... %s -> %s' % (shared_name, cached_name)
-    if not os.path.exists(config.cache_dir):
-      os.makedirs(config.cache_dir)
-    os.rename(shared_name, cached_name)
-    shared_name = cached_name
+    src_files[0] = src_file.name
+    return build_module(src_file.name, fn_name, digest, 
+                        src_extension = src_extension, 
+                        extra_objects = extra_objects,
+                        extra_compile_flags = extra_compile_flags,
+                        extra_link_flags = extra_link_flags,
+                        print_commands = print_commands,
+                        compiler = compiler,
+                        compiler_flag_prefix = compiler_flag_prefix,
+                        linker_flag_prefix = linker_flag_prefix, 
+                        opt_flags = opt_flags)
+  
+  if config.cache_dir:
+    # other processes might be building the same module right now, 
+    # fetch_or_build makes sure only one of them does and 
+    # the others load what it moved into the cache 
+    cached_name = disk_cache.module_filename(fn_name, digest)
+    shared_name, have_cached_version = disk_cache.fetch_or_build(cached_name, build)
+    if have_cached_version:
+      mark("compile", fn_name, cached = True)
+    elif print_commands:
+      print 'Cached %s' % shared_name
+  else:
+    shared_name = build()
+  src_filename = src_files[0]
 
   if print_commands:
     print "Loading newly compiled extension module %s..." % shared_name
-  module =  imp.load_dynamic(fn_name, shared_name)
+  with timed("load", fn_name, shared_object = shared_name):
+    module =  imp.load_dynamic(fn_name, shared_name)
   #on a UNIX-style filesystem it should be OK to delete a file while it's open
   #since the inode will just float untethered from any name
   #If we ever support windows we should find some other way to delete the .dll 
   c_fn = getattr(module,fn_name)
+  # look up everything the module exports right away, since loading another 
+  # module with the same name replaces the attributes of this one  
+  if entry_names and stats_fn_name(fn_name) in entry_names:
+    stats_fn = getattr(module, stats_fn_name(fn_name))
+  else:
+    stats_fn = None 
   
   if config.delete_temp_files and src_filename is not None:
     os.remove(src_filename)
@@ -342,6 +411,47 @@ def compile_module_from_source(
                              src = full_src, 
                              src_filename = src_filename,
                              fn_name = fn_name, 
-                             fn_signature = fn_signature)
+                             fn_signature = fn_signature, 
+                             stats_fn = stats_fn)
   return compiled_fn
 
+
+def compile_extension_module(
+      full_src, 
+      module_name, 
+      output_dir, 
+      src_extension = None, 
+      extra_objects = [],
+      extra_compile_flags = [], 
+      extra_link_flags = [], 
+      compiler = None, 
+      compiler_flag_prefix = None, 
+      linker_flag_prefix = None):
+  """
+  Build a complete module source into output_dir/module_name.so (keeping the 
+  C source next to it) without going through the cache directory, 
+  return the name of the shared library 
+  """
+  if src_extension is None: src_extension = get_source_extension()
+  if compiler is None: compiler = get_compiler()
+  if not os.path.exists(output_dir):
+    os.makedirs(output_dir)
+  
+  src_filename = os.path.join(output_dir, module_name + src_extension)
+  create_source_file(full_src, src_filename = src_filename)
+  compiled_object = compile_object(src_filename,
+                                   fn_name = module_name,
+                                   src_extension = src_extension,
+                                   extra_objects = extra_objects,
+                                   extra_compile_flags = extra_compile_flags,
+                                   compiler = compiler,
+                                   compiler_flag_prefix = compiler_flag_prefix)
+  object_name = compiled_object.object_filename
+  shared_name = os.path.join(output_dir, module_name + shared_extension)
+  link_module(compiler, object_name, shared_name,
+              extra_objects = extra_objects,
+              extra_link_flags = extra_link_flags,
+              linker_flag_prefix = linker_flag_prefix)
+  if config.delete_temp_files:
+    os.remove(object_name)
+  return shared_name 
@@ -4,6 +4,32 @@
 fast_math = True 
 sse2 = True 
 opt_level = '-O2'
+
+# Tiered optimization: jit functions compile each new specialization with 
+# quick_opt_level first, count the calls it serves along with their run time 
+# and once either crosses its threshold, recompile it in the background with 
+# hot_opt_level and swap the result in when it's ready. Code built with 
+# -march=native only runs on machines like this one, which is why only 
+# the hot version goes into the persistent index. 
+tiered_opt_levels = False
+quick_opt_level = '-O1'
+hot_opt_level = '-O3 -march=native -funroll-loops'
+hot_call_threshold = 1000
+# seconds 
+hot_time_threshold = 0.25
+
+# Put temporary arrays which don't escape the function allocating them
+# in a per-thread memory pool, released in bulk when that function returns 
+arena_allocation = True
+# size of each chunk the pool requests from malloc 
+arena_chunk_bytes = 2 ** 20
+# how much unused memory each thread's pool holds on to for later calls 
+arena_retain_bytes = 2 ** 24
+# load the Python, NumPy and C library headers every module includes from 
+# a header precompiled once (in cache_dir), which saves gcc from parsing 
+# them again for every module 
+precompiled_headers = True
+
 # overload the default compiler path  
 compiler_path = None
 
@@ -37,6 +63,10 @@ delete_temp_files = True
 from appdirs import user_cache_dir
 cache_dir = user_cache_dir('parakeet')
 
+# once the cached modules take up more space than this, the least 
+# recently used ones get deleted (None to let the cache grow forever) 
+cache_max_bytes = 2 ** 30
+
 # if compiling C or OpenMP we can skip some of the craziness and 
 # have distutils figure out the system config and compiler for us 
 use_distutils = True
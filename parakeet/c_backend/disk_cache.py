@@ -0,0 +1,240 @@
+"""
+Shared objects cached in config.cache_dir, safe to use from many processes
+at once (such as a pool of server workers all starting at the same time).
+
+  - Building a module holds a lock file for its digest, so only one process
+    runs the compiler while the others wait and then load what it built.
+  - Modules get copied into the cache under a temporary name, flushed to
+    disk and then renamed, so nobody ever loads a partially written file.
+  - Loading a cached module updates its modification time and once the
+    cache holds more than config.cache_max_bytes of modules, the least
+    recently used ones get deleted.
+
+The same can be done by hand with the parakeet-cache command:
+
+  parakeet-cache list               cached modules, most recently used first
+  parakeet-cache stats              number of modules, their total size, limit
+  parakeet-cache prune [max_bytes]  shrink the cache (to nothing with 0)
+"""
+
+import errno
+import os
+import shutil
+import sys
+import time
+
+from tempfile import NamedTemporaryFile
+
+from .. system_info import windows
+import config
+from system_info import shared_extension
+
+if not windows:
+  import fcntl
+
+def ensure_dir(d):
+  """
+  Create the directory unless it exists already,
+  even if some other process creates it at the same time
+  """
+  try:
+    os.makedirs(d)
+  except OSError as e:
+    if e.errno != errno.EEXIST or not os.path.isdir(d):
+      raise
+
+def module_filename(fn_name, digest):
+  return os.path.join(config.cache_dir, fn_name + "_" + digest + shared_extension)
+
+def lock_dir():
+  return os.path.join(config.cache_dir, "locks")
+
+class FileLock(object):
+  """
+  Exclusive lock held on a file in the cache's lock directory
+  for as long as the with block runs
+  """
+  def __init__(self, filename):
+    self.filename = filename
+    self.f = None
+
+  def __enter__(self):
+    ensure_dir(os.path.dirname(self.filename))
+    self.f = open(self.filename, 'a')
+    if not windows:
+      fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+    return self
+
+  def __exit__(self, *exc_info):
+    if not windows:
+      fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+    self.f.close()
+    self.f = None
+    return False
+
+def build_lock(cached_name):
+  name = os.path.basename(cached_name)[:-len(shared_extension)]
+  return FileLock(os.path.join(lock_dir(), name + ".lock"))
+
+def touch(filename):
+  """
+  Mark a cached module as just used, returns False if it's gone
+  """
+  try:
+    os.utime(filename, None)
+    return True
+  except OSError:
+    return False
+
+def atomic_copy(src_filename, dest_filename):
+  """
+  Copy the file so that other processes either see the
+  complete file at dest_filename or nothing at all
+  """
+  d = os.path.dirname(dest_filename)
+  ensure_dir(d)
+  tmp = NamedTemporaryFile(dir = d, suffix = ".tmp", delete = False)
+  try:
+    with open(src_filename, 'rb') as src:
+      shutil.copyfileobj(src, tmp)
+    tmp.flush()
+    os.fsync(tmp.fileno())
+    tmp.close()
+    os.chmod(tmp.name, os.stat(src_filename).st_mode)
+    os.rename(tmp.name, dest_filename)
+  except:
+    tmp.close()
+    if os.path.exists(tmp.name):
+      os.remove(tmp.name)
+    raise
+
+def fetch_or_build(cached_name, build):
+  """
+  Return the name of the cached module along with whether it was already
+  there. Otherwise call build (which returns the name of the freshly
+  built shared object) while holding the lock for this module, publish
+  the result under cached_name and prune the cache if it grew too big.
+  """
+  if touch(cached_name):
+    return cached_name, True
+  with build_lock(cached_name):
+    # somebody else might have built it while we were waiting
+    if touch(cached_name):
+      return cached_name, True
+    shared_name = build()
+    atomic_copy(shared_name, cached_name)
+    os.remove(shared_name)
+  if config.cache_max_bytes is not None:
+    prune(config.cache_max_bytes, keep = cached_name)
+  return cached_name, False
+
+def cached_modules():
+  """
+  (filename, size in bytes, last use) of every module in
+  the cache, the most recently used ones first
+  """
+  if not config.cache_dir or not os.path.isdir(config.cache_dir):
+    return []
+  modules = []
+  for name in os.listdir(config.cache_dir):
+    if not name.endswith(shared_extension):
+      continue
+    filename = os.path.join(config.cache_dir, name)
+    try:
+      st = os.stat(filename)
+    except OSError:
+      # pruned by another process
+      continue
+    modules.append((filename, st.st_size, st.st_mtime))
+  modules.sort(key = lambda m: m[2], reverse = True)
+  return modules
+
+def prune(max_bytes, keep = None):
+  """
+  Delete the least recently used modules until the remaining ones take up
+  at most max_bytes (except for keep, which stays regardless). Processes
+  which already loaded a deleted module can keep using it, everyone else
+  just has to compile it again. Returns the number of bytes freed.
+  """
+  total = 0
+  freed = 0
+  for (filename, size, _) in cached_modules():
+    if total + size <= max_bytes or filename == keep:
+      total += size
+      continue
+    try:
+      os.remove(filename)
+      freed += size
+    except OSError:
+      pass
+  remove_unused_locks()
+  return freed
+
+def remove_unused_locks():
+  """
+  Lock files of modules which aren't in the cache anymore and which
+  nobody is holding (if someone grabs one while it's being deleted,
+  the worst outcome is that two processes build the same module)
+  """
+  d = lock_dir()
+  if windows or not os.path.isdir(d):
+    return
+  for name in os.listdir(d):
+    module_name = os.path.join(config.cache_dir, name[:-len(".lock")] + shared_extension)
+    if os.path.exists(module_name):
+      continue
+    filename = os.path.join(d, name)
+    try:
+      with open(filename, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.remove(filename)
+    except (IOError, OSError):
+      pass
+
+def stats():
+  modules = cached_modules()
+  return {'dir' : config.cache_dir,
+          'modules' : len(modules),
+          'bytes' : sum(size for (_, size, _) in modules),
+          'max_bytes' : config.cache_max_bytes}
+
+def _format_bytes(n):
+  for unit in ('B', 'KB', 'MB'):
+    if n < 1024:
+      return "%d%s" % (n, unit)
+    n /= 1024.0
+  return "%.1fGB" % n
+
+usage = "usage: parakeet-cache (list | stats | prune [max_bytes])"
+
+def main(argv = None):
+  if argv is None:
+    argv = sys.argv[1:]
+  if not argv or argv[0] not in ('list', 'stats', 'prune') or \
+     (argv[0] != 'prune' and len(argv) > 1) or len(argv) > 2:
+    print >> sys.stderr, usage
+    return 2
+  if not config.cache_dir:
+    print >> sys.stderr, "Caching of compiled modules is disabled"
+    return 1
+  command = argv[0]
+  if command == 'list':
+    now = time.time()
+    for (filename, size, last_use) in cached_modules():
+      print "%10s  %8.1fh ago  %s" % (_format_bytes(size), (now - last_use) / 3600.0,
+                                     os.path.basename(filename))
+  elif command == 'stats':
+    s = stats()
+    print "directory: %s" % s['dir']
+    print "modules: %d" % s['modules']
+    print "size: %s" % _format_bytes(s['bytes'])
+    print "limit: %s" % ("none" if s['max_bytes'] is None else _format_bytes(s['max_bytes']))
+  else:
+    if len(argv) > 1:
+      max_bytes = int(argv[1])
+    else:
+      max_bytes = config.cache_max_bytes
+    if max_bytes is None:
+      max_bytes = 0
+    print "freed %s" % _format_bytes(prune(max_bytes))
+  return 0
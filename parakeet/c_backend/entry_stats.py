@@ -0,0 +1,55 @@
+"""
+C source for the timing counters compiled into module entry points when
+parakeet.config.collect_stats is set.
+
+Each module has a single entry point, so its counters live in one static
+struct. They only get updated while holding the GIL, and a second function
+exported by the module returns them as the tuple
+(calls, unbox, body, box, nogil) with the times in seconds.
+"""
+
+counters_name = "parakeet_entry_counters"
+
+counters_signature = "static double parakeet_now(void)"
+
+counters_source = """
+#include <time.h>
+
+typedef struct parakeet_counters {
+  unsigned long long calls;
+  double unbox;
+  double body;
+  double box;
+  double nogil;
+} parakeet_counters;
+
+static parakeet_counters %(counters)s = {0, 0.0, 0.0, 0.0, 0.0};
+
+%(signature)s {
+  struct timespec t;
+  clock_gettime(CLOCK_MONOTONIC, &t);
+  return t.tv_sec + 1e-9 * t.tv_nsec;
+}
+""" % {'counters' : counters_name, 'signature' : counters_signature}
+
+def stats_fn_name(entry_name):
+  return entry_name + "_stats"
+
+def stats_fn_source(entry_name):
+  return """
+PyObject* %(fn_name)s (PyObject* dummy, PyObject* args) {
+  return Py_BuildValue("(Kdddd)", %(counters)s.calls, %(counters)s.unbox,
+                       %(counters)s.body, %(counters)s.box, %(counters)s.nogil);
+}
+""" % {'fn_name' : stats_fn_name(entry_name), 'counters' : counters_name}
+
+stats_fields = ('calls', 'unbox', 'body', 'box', 'nogil')
+
+def read_entry_stats(compiled_fn):
+  """
+  Counters of a CompiledPyFn as a dictionary, or None if its
+  entry point wasn't compiled with them
+  """
+  if compiled_fn is None or compiled_fn.stats_fn is None:
+    return None
+  return dict(zip(stats_fields, compiled_fn.stats_fn()))
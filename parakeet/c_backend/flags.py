@@ -1,18 +1,35 @@
 import distutils
 import os 
+from contextlib import contextmanager
 
 from . system_info import include_dirs, windows, mac_os 
 from . import config 
 
 def get_opt_flags():
-  opt_flags = [config.opt_level] 
+  # the optimization level can also hold more flags, like -march=native
+  opt_flags = config.opt_level.split() 
   if config.sse2:
     opt_flags.append('-msse2')
   if config.fast_math:
     opt_flags.append('-ffast-math')
   return opt_flags 
 
-def get_compiler_flags(extra_flags = [], compiler_flag_prefix = None):
+@contextmanager
+def opt_level(level):
+  """
+  Generate code for the given optimization level (and whatever other flags
+  come with it) within the with block. Since the level is part of the 
+  settings which key the compiler's caches, code generated for 
+  each level gets cached separately.
+  """
+  old_level = config.opt_level
+  config.opt_level = level
+  try:
+    yield
+  finally:
+    config.opt_level = old_level
+
+def get_compiler_flags(extra_flags = [], compiler_flag_prefix = None, opt_flags = None):
   compiler_flags = ['-I%s' % path for path in include_dirs]
   
   def add_flag(flag):
@@ -26,7 +43,9 @@ def get_compiler_flags(extra_flags = [], compiler_flag_prefix = None):
     # nvcc understands debug mode flags
     compiler_flags.extend(['-g', '-O0'])
   else:
-    for flag in get_opt_flags():
+    if opt_flags is None:
+      opt_flags = get_opt_flags()
+    for flag in opt_flags:
       add_flag(flag)
 
   if not config.pure_c: 
@@ -1,14 +1,20 @@
 from collections import namedtuple
 import numpy as np 
 
+from .. import config as root_config
 from .. import names, prims  
+from ..analysis import escape_analysis, FindLocalArrays, structural_key
 from ..ndtypes import (IntT, FloatT, TupleT, FnT, Type, BoolT, NoneT, Float32, Float64, Bool, 
                        ClosureT, ScalarT, PtrT, NoneType, ArrayT, SliceT, TypeValueT)    
 from ..syntax import (Const, Var,  PrimCall, Attribute, TupleProj, Tuple, ArrayView,
-                      Expr, Closure, TypedFn)
+                      Expr, Closure, TypedFn, Alloc, AllocArray)
+from ..caches import LRUCache
+from ..profiling import mark
 # from ..syntax.helpers import get_types   
 import type_mappings
+from arena import arena_signature, arena_source 
 from base_compiler import BaseCompiler
+import config 
 
 
 CompiledFlatFn = namedtuple("CompiledFlatFn", 
@@ -49,6 +55,12 @@ class FnCompiler(BaseCompiler):
     # if so, expect some of the methods like visit_Return to be overloaded 
     # to return PyObjects
     self.module_entry = module_entry
+    
+    # names of local allocations which don't escape and can 
+    # go in the memory pool, along with the C variables recording 
+    # where this function's part of the pool starts 
+    self.arena_allocs = set([])
+    self.arena_mark = None 
      
   def add_decl(self, decl):
     if decl not in self.declarations:
@@ -157,12 +169,57 @@ class FnCompiler(BaseCompiler):
     step = self.visit_expr(expr.step)
     return self.fresh_var(typename, "slice", "{%s, %s, %s}" % (start,stop,step))
     
-  def visit_Alloc(self, expr):
+  def find_arena_allocs(self, fn):
+    """
+    Names of arrays and pointers allocated in the given function which 
+    never escape it, so they can be released when it returns 
+    """
+    if not config.arena_allocation:
+      return set([])
+    local_arrays = FindLocalArrays()
+    local_arrays.visit_fn(fn)
+    candidates = set(local_arrays.local_allocs.iterkeys())
+    for (name, stmt) in local_arrays.local_arrays.iteritems():
+      if stmt.rhs.__class__ is AllocArray:
+        candidates.add(name)
+    if len(candidates) == 0:
+      return candidates 
+    return candidates.difference(escape_analysis(fn).may_escape)
+  
+  def enter_arena(self):
+    """
+    Record where this function's allocations in the memory pool start, 
+    returns the C declarations which need to go at the top of its body 
+    """
+    if arena_signature not in self.extra_function_signatures:
+      self.extra_function_signatures.append(arena_signature)
+      self.extra_functions[arena_signature] = arena_source()
+    chunk = self.fresh_name("arena_chunk")
+    used = self.fresh_name("arena_used")
+    self.arena_mark = (chunk, used)
+    return """
+    parakeet_arena_chunk* %(chunk)s = parakeet_arena_current;
+    size_t %(used)s = %(chunk)s ? %(chunk)s->used : 0;
+    """ % locals()
+  
+  def release_arena(self):
+    """
+    Code to release everything this function allocated in the memory pool
+    """
+    if self.arena_mark is None:
+      return ""
+    return "parakeet_arena_release(%s, %s);" % self.arena_mark 
+  
+  def return_if_null(self, obj):
+    self.append("if (!%s) { %s return NULL; }" % (obj, self.release_arena()))
+  
+  def visit_Alloc(self, expr, in_arena = False):
     elt_t =  expr.elt_type
     nelts = self.fresh_var("npy_intp", "nelts", self.visit_expr(expr.count))
     bytes_per_elt = elt_t.nbytes
     nbytes = self.mul(nelts, bytes_per_elt)#"%s * %d" % (nelts, bytes_per_elt)
-    raw_ptr = "(%s) malloc(%s)" % (type_mappings.to_ctype(expr.type), nbytes)
+    allocator = "parakeet_arena_alloc" if in_arena else "malloc"
+    raw_ptr = "(%s) %s(%s)" % (type_mappings.to_ctype(expr.type), allocator, nbytes)
     struct_type = self.to_ctype(expr.type)
     return self.fresh_var(struct_type, "new_ptr", "{%s, NULL}" % raw_ptr)
     
@@ -356,7 +413,13 @@ class FnCompiler(BaseCompiler):
     return expr.__class__ in (Var, Const, PrimCall, Attribute, TupleProj, Tuple, ArrayView)
   
   def visit_Assign(self, stmt):
-    rhs = self.visit_expr(stmt.rhs)
+    if stmt.lhs.__class__ is Var and stmt.lhs.name in self.arena_allocs:
+      if stmt.rhs.__class__ is Alloc:
+        rhs = self.visit_Alloc(stmt.rhs, in_arena = True)
+      else:
+        rhs = self.visit_AllocArray(stmt.rhs, in_arena = True)
+    else:
+      rhs = self.visit_expr(stmt.rhs)
 
     if stmt.lhs.__class__ is Var:
       lhs = self.visit_expr(stmt.lhs)
@@ -484,17 +547,20 @@ class FnCompiler(BaseCompiler):
   def visit_Return(self, stmt):
     assert not self.return_by_ref, "Returning multiple values by ref not yet implemented: %s" % stmt
     if self.return_void:
-      return "return;"
+      return self.release_arena() + "return;"
     elif isinstance(stmt.value, Tuple):
       # if not returning multiple values by reference, then make a struct for them
       struct_type = self.to_ctype(stmt.value.type)
       result_elts = ", ".join(self.visit_expr(elt) for elt in stmt.value.elts)
       result_value = "{" + result_elts + "}"
       result = self.fresh_var(struct_type, "result", result_value)
-      return "return %s;" % result 
+      return self.release_arena() + "return %s;" % result 
     else:
       v = self.visit_expr(stmt.value)
-      return "return %s;" % v
+      if self.arena_mark is not None:
+        # the returned expression might still read from the memory pool
+        v = self.fresh_var(self.to_ctype(stmt.value.type), "result", v)
+      return self.release_arena() + "return %s;" % v
   
 
   
@@ -618,7 +684,15 @@ class FnCompiler(BaseCompiler):
       self.return_by_ref = False 
     args_str = ", ".join("%s %s" % (t, name) for (t,name) in zip(arg_types,arg_names))
     
-    body_str = self.visit_block(fn.body) 
+    self.arena_allocs = self.find_arena_allocs(fn)
+    if self.arena_allocs:
+      arena_mark_str = self.enter_arena()
+      body_str = arena_mark_str + self.visit_block(fn.body)
+      if self.return_void:
+        # might fall off the end without a return statement 
+        body_str += self.release_arena() 
+    else:
+      body_str = self.visit_block(fn.body) 
     
     if inline:
       attributes = attributes + ["static inline"]
@@ -636,7 +710,10 @@ class FnCompiler(BaseCompiler):
     """ 
     return self.__class__ 
   
-  _flat_compile_cache = {}
+  # settings which change the code generated for a function
+  config_modules = (root_config, config)
+
+  _flat_compile_cache = LRUCache("flat C functions")
   def compile_flat_source(self, parakeet_fn, attributes = [], inline = True):
       
     # make sure compiled source uses consistent names for tuple and array types, 
@@ -651,6 +728,17 @@ class FnCompiler(BaseCompiler):
     if key in self._flat_compile_cache:
       return self._flat_compile_cache[key]
     
+    # functions which only differ in the names of their variables 
+    # can share the C function generated for whichever came first
+    structure = structural_key(parakeet_fn, *self.config_modules)
+    if structure is not None:
+      structure = structure, frozenset(struct_types), self.cache_key, tuple(attributes)
+      if structure in self._flat_compile_cache:
+        mark("codegen", parakeet_fn.name, cached = True, structural = True)
+        result = self._flat_compile_cache[structure]
+        self._flat_compile_cache[key] = result 
+        return result 
+    
     name, sig, src = self.visit_flat_fn(parakeet_fn, attributes = attributes, inline = inline)
     
     result = CompiledFlatFn(
@@ -662,4 +750,6 @@ class FnCompiler(BaseCompiler):
       extra_function_signatures = self.extra_function_signatures,
       declarations = self.declarations)
     self._flat_compile_cache[key] = result
+    if structure is not None:
+      self._flat_compile_cache[structure] = result
     return result
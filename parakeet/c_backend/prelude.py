@@ -0,0 +1,103 @@
+"""
+Precompiled header for the part of every generated module which never
+changes: the Python, NumPy and C library headers. Parsing those takes up
+most of the time gcc spends on a small module, loading the precompiled
+version instead makes compiling it about 40% faster.
+
+gcc only uses a precompiled header built with the same flags (otherwise it
+quietly reads the header's text instead), so each combination of compiler
+and flags gets its own directory cache_dir/pch/<digest>. The first process
+needing one builds it while holding a lock, in a temporary directory which
+then gets renamed into place.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from .. system_info import windows
+import config
+import disk_cache
+from shell_command import CommandFailed, run_cmd
+
+c_headers = ["stdint.h",  "math.h",  "signal.h"]
+core_python_headers = ["Python.h"]
+numpy_headers = ['numpy/arrayobject.h', 'numpy/arrayscalars.h']
+
+python_headers = core_python_headers + numpy_headers
+
+# went to some annoying effort to clean up all the array->flags, &c that have been
+# replaced with PyArray_FLAGS in NumPy 1.7
+global_preprocessor_defs = ["#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION"]
+
+def prelude_lines(headers = python_headers + c_headers):
+  # when compiling with NVCC, other headers get implicitly included
+  # and cause warnings since Python redefines this constant
+  lines = list(global_preprocessor_defs)
+  if config.undef_posix_c_source:
+    lines.append("#undef _XOPEN_SOURCE")
+    lines.append("#undef _POSIX_C_SOURCE")
+  for header in headers:
+    lines.append("#include <%s>" % header)
+  return lines
+
+def prelude_header():
+  """
+  Name and contents of the header file holding the standard prelude, the
+  name changes along with the contents so it can stand in for them
+  in the digests of generated sources
+  """
+  src = "\n".join(prelude_lines()) + "\n"
+  return "parakeet_prelude_%s.h" % hashlib.sha224(src).hexdigest()[:16], src
+
+# (compiler, flags) -> directory of the precompiled header or
+# None if it couldn't be built
+_dirs = {}
+
+def prelude_dir(compiler, compiler_flags, src_extension = ".c"):
+  """
+  Directory holding the precompiled prelude for the given compiler
+  and flags, or None if it isn't available
+  """
+  if not config.precompiled_headers or not config.cache_dir or windows:
+    return None
+  if isinstance(compiler, (list, tuple)):
+    compiler = tuple(compiler)
+  header_name, src = prelude_header()
+  language = "c-header" if src_extension == ".c" else "c++-header"
+  key = (compiler, tuple(compiler_flags), language, header_name)
+  if key in _dirs:
+    return _dirs[key]
+  digest = hashlib.sha224(repr(key)).hexdigest()
+  d = os.path.join(config.cache_dir, "pch", digest)
+  try:
+    if not os.path.exists(d):
+      with disk_cache.FileLock(os.path.join(disk_cache.lock_dir(), "pch_" + digest + ".lock")):
+        if not os.path.exists(d):
+          build_prelude(d, compiler, compiler_flags, language, header_name, src)
+  except (CommandFailed, OSError, IOError):
+    # just compile without it
+    d = None
+  _dirs[key] = d
+  return d
+
+def build_prelude(d, compiler, compiler_flags, language, header_name, src):
+  parent = os.path.dirname(d)
+  disk_cache.ensure_dir(parent)
+  tmp_dir = tempfile.mkdtemp(dir = parent, suffix = ".tmp")
+  try:
+    header_filename = os.path.join(tmp_dir, header_name)
+    with open(header_filename, 'w') as f:
+      f.write(src)
+    if isinstance(compiler, tuple):
+      cmd = list(compiler)
+    else:
+      cmd = [compiler]
+    cmd += compiler_flags
+    cmd += ['-x', language, header_filename, '-o', header_filename + ".gch"]
+    run_cmd(cmd, label = "Precompile headers")
+    os.rename(tmp_dir, d)
+  except:
+    shutil.rmtree(tmp_dir, ignore_errors = True)
+    raise
@@ -1,4 +1,4 @@
-from ..analysis import use_count
+from ..analysis import settings_key, use_count
 from ..syntax import Tuple,  Expr
  
 from ..ndtypes import (
@@ -9,7 +9,13 @@ from ..ndtypes import (
 import type_mappings
 from fn_compiler import FnCompiler
 from compile_util import compile_module_from_source
+from arena import owned_buffer_signature, owned_buffer_source
+from flags import get_opt_flags
+from entry_stats import (counters_name, counters_signature, counters_source, 
+                         stats_fn_name, stats_fn_source)
 from .. import config as root_config 
+from .. caches import LRUCache
+from .. profiling import mark, timed
 import config 
 
 def attr_from_kwargs(obj, kwargs, attr, value = None):
@@ -37,6 +43,12 @@ class PyModuleCompiler(FnCompiler):
     attr_from_kwargs(self, kwargs, 'linker_flag_prefix')  
     attr_from_kwargs(self, kwargs, 'src_extension')
     FnCompiler.__init__(self, module_entry = module_entry, *args, **kwargs)
+    # list of buffers allocated by the entry point which NumPy arrays 
+    # can keep alive after it returns 
+    self.owned_buffers = None 
+    # C variable holding the time the entry point's body started running, 
+    # only used when compiling timing counters into the entry point
+    self.body_start = None 
     
   def unbox_scalar(self, x, t, target = None):
     assert isinstance(t, ScalarT), "Expected scalar type, got %s" % t
@@ -481,7 +493,32 @@ class PyModuleCompiler(FnCompiler):
    
     
   
-  def alloc_array(self, array_t, shape_expr):
+  def own_buffer(self, ptr):
+    """
+    Allocations made directly by the entry point which might escape get 
+    a base object that frees them once no returned array needs them anymore  
+    """
+    if owned_buffer_signature not in self.extra_function_signatures:
+      self.extra_function_signatures.append(owned_buffer_signature)
+      self.extra_functions[owned_buffer_signature] = owned_buffer_source
+    base = "%s.base" % ptr 
+    self.append("%s = parakeet_own_buffer(&%s, %s.raw_ptr);" % (base, self.owned_buffers, ptr))
+    self.return_if_null(base)
+  
+  def return_if_null(self, obj):
+    if self.owned_buffers is None:
+      FnCompiler.return_if_null(self, obj)
+    else:
+      self.append("if (!%s) { %s Py_XDECREF(%s); return NULL; }" % \
+                  (obj, self.release_arena(), self.owned_buffers))
+  
+  def visit_Alloc(self, expr, in_arena = False):
+    ptr = FnCompiler.visit_Alloc(self, expr, in_arena = in_arena)
+    if self.module_entry and not in_arena:
+      self.own_buffer(ptr)
+    return ptr 
+  
+  def alloc_array(self, array_t, shape_expr, in_arena = False):
     if isinstance(shape_expr.type, ScalarT):
       dim = self.visit_expr(shape_expr)
       nelts = dim 
@@ -496,8 +533,11 @@ class PyModuleCompiler(FnCompiler):
     typename = self.to_ctype(array_t)
     result = self.fresh_var(typename, "new_array")
     raw_ptr_t = self.to_ctype(array_t.elt_type) + "*"
-    self.setfield(result, "data.raw_ptr", "(%s) malloc(%s * %s)" % (raw_ptr_t, nelts, bytes_per_elt) )
+    allocator = "parakeet_arena_alloc" if in_arena else "malloc"
+    self.setfield(result, "data.raw_ptr", "(%s) %s(%s * %s)" % (raw_ptr_t, allocator, nelts, bytes_per_elt) )
     self.setfield(result, "data.base", "(PyObject*) NULL")
+    if self.module_entry and not in_arena:
+      self.own_buffer("%s.data" % result)
     self.setfield(result, "offset", "0")
     self.setfield(result, "size", nelts)
     # assume C-order layout
@@ -511,7 +551,7 @@ class PyModuleCompiler(FnCompiler):
     return result 
     
   
-  def visit_AllocArray(self, expr, boxed=False):
+  def visit_AllocArray(self, expr, boxed=False, in_arena = False):
     if boxed:
       shape = self.tuple_to_stack_array(expr.shape)
       t = type_mappings.to_dtype(elt_type(expr.type))
@@ -519,7 +559,7 @@ class PyModuleCompiler(FnCompiler):
     
     if config.debug:
       print "[Debug] Allocating array : %s " % expr.type  
-    return self.alloc_array(expr.type, expr.shape)
+    return self.alloc_array(expr.type, expr.shape, in_arena = in_arena)
      
   def visit_Tuple(self, expr):
     return self.mk_tuple(expr.elts, boxed = False)
@@ -657,11 +697,18 @@ class PyModuleCompiler(FnCompiler):
   
   def visit_Return(self, stmt):
     if self.module_entry:
-      v = self.as_pyobj(stmt.value)
+      if self.body_start is not None:
+        box_start = self.fresh_var("double", "box_start", "parakeet_now()")
+        self.append("%s.body += %s - %s;" % (counters_name, box_start, self.body_start))
+      v = self.fresh_var("PyObject*", "result", "(PyObject*) %s" % self.as_pyobj(stmt.value))
+      if self.body_start is not None:
+        self.append("%s.box += parakeet_now() - %s;" % (counters_name, box_start))
+        self.append("%s.calls++;" % counters_name)
       if config.debug: 
         self.print_pyobj_type(v, "Return type: ")
         self.print_pyobj(v, "Return value: ")
-      return "return (PyObject*) %s;" % v
+      # any returned arrays now hold references to the buffers they need
+      return "%s Py_XDECREF(%s); return %s;" % (self.release_arena(), self.owned_buffers, v)
     else:
       return FnCompiler.visit_Return(self, stmt)
   
@@ -674,6 +721,31 @@ class PyModuleCompiler(FnCompiler):
     return self.pop()
   
   
+  def release_gil(self):
+    """
+    Code to let other Python threads run until the matching acquire_gil, 
+    with the time spent that way added to the entry point's counters 
+    """
+    if self.body_start is None:
+      return "\nPy_BEGIN_ALLOW_THREADS\n"
+    self.nogil_start = self.fresh_name("nogil_start")
+    return "\ndouble %s = parakeet_now();\nPy_BEGIN_ALLOW_THREADS\n" % self.nogil_start
+  
+  def acquire_gil(self):
+    if self.body_start is None:
+      return "\nPy_END_ALLOW_THREADS\n"
+    return "\nPy_END_ALLOW_THREADS\n%s.nogil += parakeet_now() - %s;\n" % \
+      (counters_name, self.nogil_start)
+  
+  def enter_counters(self):
+    """
+    Start timing the entry point, returns the C variable holding the start time 
+    """
+    if counters_signature not in self.extra_function_signatures:
+      self.extra_function_signatures.append(counters_signature)
+      self.extra_functions[counters_signature] = counters_source
+    return self.fresh_var("double", "entry_start", "parakeet_now()")
+  
   def enter_module_body(self):
     """
     Some derived compiler classes might want to use this hook
@@ -696,6 +768,13 @@ class PyModuleCompiler(FnCompiler):
     dummy = self.fresh_name("dummy")
     args = self.fresh_name("args")
     
+    if root_config.collect_stats:
+      entry_start = self.enter_counters()
+    self.owned_buffers = self.fresh_var("PyObject*", "owned_buffers", "NULL")
+    self.arena_allocs = self.find_arena_allocs(fn)
+    if self.arena_allocs:
+      self.append(self.enter_arena())
+    
     if config.debug: 
       self.newline()
       self.printf("\\nStarting %s : %s..." % (c_fn_name, fn.type))
@@ -724,6 +803,9 @@ class PyModuleCompiler(FnCompiler):
 
         self.name_mappings[argname] = var
       
+    if root_config.collect_stats:
+      self.body_start = self.fresh_var("double", "body_start", "parakeet_now()")
+      self.append("%s.unbox += %s - %s;" % (counters_name, self.body_start, entry_start))
 
     self.enter_module_body()
     c_body = self.visit_block(fn.body, push=False)
@@ -732,27 +814,39 @@ class PyModuleCompiler(FnCompiler):
     c_args = "PyObject* %s, PyObject* %s" % (dummy, args) #", ".join("PyObject* %s" % self.name(n) for n in fn.arg_names)
     c_sig = "PyObject* %(c_fn_name)s (%(c_args)s)" % locals() 
     fndef = "%s {\n\n %s}" % (c_sig, c_body)
+    if self.body_start is not None:
+      fndef += stats_fn_source(c_fn_name)
     return c_fn_name, c_sig, fndef 
   
-  _entry_compile_cache = {} 
-  def compile_entry(self, parakeet_fn):  
+  _entry_compile_cache = LRUCache("compiled entry modules")
+  
+  def entry_cache_key(self, parakeet_fn):
     # we include the compiler's class as part of the key
     # since this function might get reused by descendant backends like OpenMP and CUDA
-    key = parakeet_fn.cache_key, self.__class__ 
-    compiled_fn = self._entry_compile_cache.get(key)
-    if compiled_fn: return compiled_fn 
-    
+    # and the settings since functions with the same structure share a cache_key 
+    return parakeet_fn.cache_key, self.__class__, settings_key(self.config_modules)
+  
+  def entry_source(self, parakeet_fn):
+    """
+    Generate the C source of a module entry point for the given function
+    and return the keyword arguments for compile_module_from_source, 
+    so that the actual (slow) compiler invocation can happen elsewhere
+    """
     name, sig, src = self.visit_fn(parakeet_fn)
     
     if config.print_function_source: 
       print "Generated C source for %s: %s" %(name, src)
     ordered_function_sources = [self.extra_functions[extra_sig] for 
                                 extra_sig in self.extra_function_signatures]
-
-    compiled_fn = compile_module_from_source(
-      src, 
+    if self.body_start is not None:
+      entry_names = [name, stats_fn_name(name)]
+    else:
+      entry_names = None
+    return dict(
+      partial_src = src, 
       fn_name = name,
       fn_signature = sig, 
+      entry_names = entry_names, 
       src_extension = self.src_extension,
       extra_objects = set(self.extra_objects),
       extra_function_sources = ordered_function_sources, 
@@ -762,7 +856,20 @@ class PyModuleCompiler(FnCompiler):
       print_source = root_config.print_generated_code, 
       compiler = self.compiler_cmd, 
       compiler_flag_prefix = self.compiler_flag_prefix, 
-      linker_flag_prefix = self.linker_flag_prefix)
+      linker_flag_prefix = self.linker_flag_prefix, 
+      # compiling might happen on another thread, 
+      # which shouldn't see a different optimization level  
+      opt_flags = get_opt_flags())
+  
+  def compile_entry(self, parakeet_fn):  
+    key = self.entry_cache_key(parakeet_fn)
+    compiled_fn = self._entry_compile_cache.get(key)
+    if compiled_fn: 
+      mark("codegen", parakeet_fn.name, cached = True)
+      return compiled_fn 
+    
+    with timed("codegen", parakeet_fn.name, compiler = self.__class__.__name__):
+      source_args = self.entry_source(parakeet_fn)
+    compiled_fn = compile_module_from_source(**source_args)
     self._entry_compile_cache[key]  = compiled_fn
     return compiled_fn
-
@@ -1,4 +1,6 @@
 from prepare_args import prepare_args
+from ..analysis import settings_key
+from ..caches import LRUCache
 from ..transforms.pipeline  import lower_to_loops
 from ..value_specialization import specialize
 from ..config import value_specialization
@@ -6,20 +8,40 @@ from pymodule_compiler import PyModuleCompiler
 
 
 
-_cache = {}
-def run(fn, args):
-  args = prepare_args(args, fn.input_types)
+_cache = LRUCache("c entry points")
+def entry_key(fn):
+  """
+  Key of the compiled entry point for an already specialized function in
+  _cache, which includes the settings since structurally identical 
+  functions get optimized into the same one
+  """
+  return fn.cache_key, settings_key(PyModuleCompiler.config_modules)
 
+def specialize_entry(fn, args, value_specialize = True):
+  """
+  Lower the typed function to loops and specialize it for the 
+  already prepared argument values, the result's cache_key is what
+  the compiled entry point gets stored under in _cache
+  """
   fn = lower_to_loops(fn)
   
-  if value_specialization: 
+  if value_specialization and value_specialize: 
     fn = specialize(fn, args)
+  return fn 
 
-  key = fn.cache_key
+def compile_entry(fn, args):
+  """
+  Return the compiled C entry point (a CompiledPyFn) for the given typed 
+  function, specialized for the already prepared argument values 
+  """
+  fn = specialize_entry(fn, args)
+  key = entry_key(fn)
   if key in _cache:
-    return _cache[key](*args)
+    return _cache[key]
   compiled_fn = PyModuleCompiler().compile_entry(fn)
-  c_fn = compiled_fn.c_fn 
-  _cache[key] = c_fn 
-  return c_fn(*args)
-  
\ No newline at end of file
+  _cache[key] = compiled_fn 
+  return compiled_fn
+
+def run(fn, args):
+  args = prepare_args(args, fn.input_types)
+  return compile_entry(fn, args).c_fn(*args)
@@ -0,0 +1,215 @@
+"""
+Bounded caches for the compiler's memoization tables.
+
+Everything the compiler memoizes (specialized and optimized functions,
+generated C source, loaded entry points) goes into an LRUCache, which
+drops its least recently used entries once it holds more than
+config.max_cache_entries of them. Dropped typed functions and their IR get
+freed once nothing else refers to them, the worst that can happen is that
+some function has to be compiled again.
+
+  parakeet.cache_stats()   : entries, hits, misses, evictions and an
+                             estimate of the memory held by each cache
+  parakeet.clear_caches()  : empty all of them (along with the dispatch
+                             tables of jit functions)
+"""
+
+import heapq
+import sys
+import types
+import weakref
+
+import config
+
+# every cache which is still alive
+_caches = weakref.WeakSet()
+
+class LRUCache(object):
+  """
+  Dictionary which forgets its least recently used entries once it grows
+  past its limit (or config.max_cache_entries if it doesn't have its own).
+  Rather than keeping its entries in order, every lookup stamps the entry
+  with a counter and an overflowing cache drops the quarter of its entries
+  with the oldest stamps in one go.
+
+  Many keys contain the TransformHistory of a function, which keeps
+  changing after the key got stored. Such entries can't be found anymore,
+  so they're dropped along with the old ones (and never deleted by key).
+  """
+  def __init__(self, name, max_entries = None):
+    self.name = name
+    self.max_entries = max_entries
+    # key -> [value, stamp of the last use, hash of the key when stored]
+    self._data = {}
+    self._clock = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    _caches.add(self)
+
+  @property
+  def limit(self):
+    if self.max_entries is not None:
+      return self.max_entries
+    return config.max_cache_entries
+
+  def __len__(self):
+    return len(self._data)
+
+  def __contains__(self, key):
+    if key in self._data:
+      return True
+    self.misses += 1
+    return False
+
+  def __getitem__(self, key):
+    entry = self._data[key]
+    self._clock += 1
+    entry[1] = self._clock
+    self.hits += 1
+    return entry[0]
+
+  def get(self, key, default = None):
+    if key in self:
+      return self[key]
+    return default
+
+  def __setitem__(self, key, value):
+    self._clock += 1
+    self._data[key] = [value, self._clock, hash(key)]
+    limit = self.limit
+    if limit is not None and len(self._data) > limit:
+      self.evict(len(self._data) - (limit * 3) // 4)
+
+  def __delitem__(self, key):
+    del self._data[key]
+
+  def pop(self, key, *default):
+    entry = self._data.pop(key, None)
+    if entry is None:
+      if default:
+        return default[0]
+      raise KeyError(key)
+    return entry[0]
+
+  def evict(self, count):
+    """
+    Drop (at least) the given number of least recently used entries
+    """
+    threshold = heapq.nsmallest(count, (entry[1] for entry in self._data.itervalues()))[-1]
+    live = {}
+    for (key, entry) in self._data.iteritems():
+      if entry[1] > threshold and hash(key) == entry[2]:
+        live[key] = entry
+    self.evictions += len(self._data) - len(live)
+    self._data = live
+
+  def clear(self):
+    self._data.clear()
+
+  def keys(self):
+    return self._data.keys()
+
+  def values(self):
+    return [entry[0] for entry in self._data.itervalues()]
+
+  def items(self):
+    return [(key, entry[0]) for (key, entry) in self._data.iteritems()]
+
+  def itervalues(self):
+    for entry in self._data.itervalues():
+      yield entry[0]
+
+  def iteritems(self):
+    for (key, entry) in self._data.iteritems():
+      yield (key, entry[0])
+
+  def __iter__(self):
+    return iter(self._data)
+
+  def memory_usage(self):
+    """
+    Estimated number of bytes held by the keys and values of this cache
+    (objects shared with other caches get counted by each of them)
+    """
+    return approximate_size(self._data)
+
+  def __str__(self):
+    return "LRUCache(%s, %d entries)" % (self.name, len(self._data))
+
+  def __repr__(self):
+    return str(self)
+
+# shared by everything and never freed along with a cache entry
+_not_counted = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                type, types.ClassType)
+
+def approximate_size(root):
+  """
+  Sum of sys.getsizeof over everything reachable from the given object
+  through containers and instance attributes, leaving out modules,
+  classes, functions, phases and types of Parakeet IR (which are interned)
+  """
+  from ndtypes import Type
+  from transforms.phase import Phase
+  # typed functions refer to the phases which created them, 
+  # don't follow those into the contents of their caches 
+  not_counted = _not_counted + (Type, Phase, LRUCache)
+  seen = set([])
+  total = 0
+  stack = [root]
+  while stack:
+    obj = stack.pop()
+    if id(obj) in seen or isinstance(obj, not_counted):
+      continue
+    seen.add(id(obj))
+    total += sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+      stack.extend(obj.iterkeys())
+      stack.extend(obj.itervalues())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+      stack.extend(obj)
+    else:
+      d = getattr(obj, '__dict__', None)
+      if d is not None:
+        stack.append(d)
+      for c in type(obj).__mro__:
+        for slot in c.__dict__.get('__slots__', ()):
+          if slot not in ('__dict__', '__weakref__') and hasattr(obj, slot):
+            stack.append(getattr(obj, slot))
+  return total
+
+def cache_stats(memory = True):
+  """
+  Dictionary from the name of each cache to its number of entries, limit,
+  hits, misses, evictions and (unless memory is False, since walking
+  everything takes a while) the estimated bytes it holds. Caches sharing
+  a name (such as those of phases created on the fly) get added up.
+  """
+  result = {}
+  for cache in list(_caches):
+    stats = result.get(cache.name)
+    if stats is None:
+      stats = {'entries' : 0, 'limit' : cache.limit, 'hits' : 0, 'misses' : 0,
+               'evictions' : 0}
+      if memory:
+        stats['bytes'] = 0
+      result[cache.name] = stats
+    stats['entries'] += len(cache)
+    stats['hits'] += cache.hits
+    stats['misses'] += cache.misses
+    stats['evictions'] += cache.evictions
+    if memory:
+      stats['bytes'] += cache.memory_usage()
+  return result
+
+def clear_caches():
+  """
+  Forget everything compiled so far, including the entry points
+  the dispatch tables of jit functions hold on to
+  """
+  for cache in list(_caches):
+    cache.clear()
+  from frontend.call_stats import _jit_functions
+  for jit_fn in list(_jit_functions):
+    jit_fn.clear_dispatch()
@@ -59,8 +59,32 @@ opt_verify = False
 # recompile functions for distinct patterns of unit strides and 0 or 1 input values 
 value_specialization = True 
 
+# remember which cached shared object was compiled for each function and 
+# argument signature, so that new processes can skip compilation entirely 
+# (requires the C backend's cache_dir to be set)
+persistent_cache = True
 
 
+
+#####################################
+#              CACHES               #
+#####################################
+
+# most entries any one of the compiler's caches (of specialized functions, 
+# optimized IR, generated C and loaded entry points) holds on to before 
+# dropping the least recently used ones, None lets them grow forever 
+max_cache_entries = 2048
+
+#####################################
+#        RUNTIME STATISTICS         #
+#####################################
+
+# time every call of a jit function served by its dispatch table and 
+# compile counters for the time spent unboxing arguments, running the body, 
+# boxing results and without the GIL into each entry point, all reported 
+# by parakeet.stats() (only affects functions compiled after setting it) 
+collect_stats = False
+
 #####################################
 #            DEBUG OUTPUT           #
 #####################################
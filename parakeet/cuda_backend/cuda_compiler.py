@@ -421,13 +421,13 @@ class CudaCompiler(MulticoreCompiler):
         gpu_value = gpu_values[i]
         self.to_host(host_value, gpu_value, t)
     
-  def visit_Alloc(self, expr):
+  def visit_Alloc(self, expr, in_arena = False):
     assert self.in_host(), "Can't dynamically allocate memory in GPU code"
-    return MulticoreCompiler.visit_Alloc(self, expr)
+    return MulticoreCompiler.visit_Alloc(self, expr, in_arena = in_arena)
   
-  def visit_AllocArray(self, expr):
+  def visit_AllocArray(self, expr, in_arena = False):
     assert self.in_host(), "Can't dynamically allocate memory in GPU code"
-    return MulticoreCompiler.visit_AllocArray(self, expr)
+    return MulticoreCompiler.visit_AllocArray(self, expr, in_arena = in_arena)
 
 
   def use_closure(self, clos):
@@ -8,10 +8,12 @@ import numpy as np
 from dsltools import NestedBlocks, ScopedDict
  
 from .. import config, names, prims, syntax
+from ..caches import LRUCache
 
 from ..names import NameNotFound
 from ..ndtypes import Type
 from ..prims import Prim 
+from ..profiling import timed
 from ..syntax import (Expr, 
                       Assign, If, ForLoop, Return,  
                       Var, PrimCall, Cast,  Select, 
@@ -266,7 +268,7 @@ class AST_Translator(ast.NodeVisitor):
       if is_static_value(value):
         return value_to_syntax(value)
       elif isinstance(value, np.ndarray): 
-        ref = GlobalValueRef(value)
+        ref = GlobalValueRef(value, name)
         return self.local_ref_name(ref, name)
       else:
         # assume that this is a module or object which will have some 
@@ -471,6 +473,9 @@ class AST_Translator(ast.NodeVisitor):
     return res 
     
   def translate_value_call(self, value, positional, keywords_dict= {}, starargs_expr = None):
+    if 'out' in keywords_dict and isinstance(value, (np.ufunc, Prim)):
+      return self.ufunc_with_output(value, positional, keywords_dict)
+    
     if value is sum:
       return mk_reduce_call(build_untyped_prim_fn(prims.add), positional, zero_i24)
     
@@ -522,6 +527,17 @@ class AST_Translator(ast.NodeVisitor):
     fn = translate_function_value(value)
     return Call(fn, ActualArgs(positional, keywords_dict, starargs_expr))
     
+  def ufunc_with_output(self, value, positional, keywords_dict):
+    """
+    Like NumPy's ufuncs, write the result into the array given 
+    as the 'out' argument and then return that array 
+    """
+    keywords_dict = keywords_dict.copy()
+    out = self.assign_to_var(keywords_dict.pop('out'), "out")
+    result = self.translate_value_call(value, positional, keywords_dict)
+    self.assign(Index(out, Slice(none, none, none)), result)
+    return out 
+  
   def visit_Call(self, expr):
     """
     TODO: 
@@ -1006,7 +1022,7 @@ def translate_function_source(source,
 
 # python value of a user-defined function mapped to its
 # untyped representation
-_known_python_functions = {}
+_known_python_functions = LRUCache("translated functions")
 
 # keep track of which functions are being translated at this moment 
 # to check for recursive calls 
@@ -1110,7 +1126,7 @@ def translate_function_value(fn):
     if fn in _known_python_functions:
       return _known_python_functions[fn]
   
-    with _lock:
+    with _lock, timed("frontend", getattr(fn, '__name__', fn)):
       fundef = _translate_function_value(fn)
            
   _known_python_functions[fn] = fundef 
@@ -0,0 +1,140 @@
+"""
+Counters kept by each jit function about how its calls were served,
+collected for all of them by parakeet.stats().
+
+Cache misses, compilations and entry points loaded from the persistent
+cache always get counted since they're rare and expensive anyway. Calls
+served straight from the dispatch table, their run times and the timing
+counters compiled into the entry points themselves only get recorded with
+config.collect_stats, since they're on the fast path.
+"""
+
+import time
+import weakref
+
+from ..c_backend.entry_stats import read_entry_stats
+
+# every jit function created so far which is still alive
+_jit_functions = weakref.WeakSet()
+
+def register(jit_fn):
+  _jit_functions.add(jit_fn)
+
+def signature_string(input_types):
+  return "(%s)" % ", ".join(str(t) for t in input_types)
+
+class CallStats(object):
+  def __init__(self):
+    # calls served from the dispatch table
+    self.hits = 0
+    # entry points loaded from the persistent cache
+    self.persistent_hits = 0
+    # calls which had to go through the compiler, along with
+    # how often that happened for each signature of input types
+    self.misses = 0
+    self.missed_signatures = {}
+    self.compile_time = 0.0
+    # quickly compiled specializations which got hot and were 
+    # recompiled with more optimizations (see c_backend.config)
+    self.hot_recompiles = 0
+    # dispatch key -> [input types, number of calls, total time]
+    self.calls = {}
+    # dispatch key -> (input types, CompiledPyFn)
+    self.compiled = {}
+
+  def record_compile(self, key, input_types, compiled_fn, elapsed, hot = False):
+    self.compile_time += elapsed
+    if hot:
+      self.hot_recompiles += 1
+    else:
+      self.misses += 1
+      sig = signature_string(input_types)
+      self.missed_signatures[sig] = self.missed_signatures.get(sig, 0) + 1
+    if key is not None and compiled_fn is not None:
+      self.compiled[key] = (input_types, compiled_fn)
+
+  def timed_call(self, key, entry, *args):
+    start_t = time.time()
+    result = entry(*args)
+    elapsed = time.time() - start_t
+    self.hits += 1
+    counts = self.calls.get(key)
+    if counts is None:
+      self.calls[key] = [entry.input_types, 1, elapsed]
+    else:
+      counts[1] += 1
+      counts[2] += elapsed
+    return result
+
+  def snapshot(self):
+    """
+    All the counters as a dictionary of plain values. Calls are grouped by
+    the input types of the specialization serving them. The timing counters
+    of an entry point (under 'entry') are shared by every jit function
+    calling the same specialization.
+    """
+    specializations = {}
+    def specialization(input_types):
+      sig = signature_string(input_types)
+      if sig not in specializations:
+        specializations[sig] = {'calls' : 0, 'time' : 0.0}
+      return specializations[sig]
+
+    for (input_types, n_calls, elapsed) in self.calls.itervalues():
+      counts = specialization(input_types)
+      counts['calls'] += n_calls
+      counts['time'] += elapsed
+
+    seen = set([])
+    for (input_types, compiled_fn) in self.compiled.itervalues():
+      if compiled_fn.stats_fn in seen:
+        continue
+      seen.add(compiled_fn.stats_fn)
+      entry_stats = read_entry_stats(compiled_fn)
+      if entry_stats is not None:
+        counts = specialization(input_types)
+        counts['entry'] = merge_stats(counts.get('entry', {}), entry_stats)
+
+    return {
+      'hits' : self.hits,
+      'persistent_hits' : self.persistent_hits,
+      'misses' : self.misses,
+      'compile_time' : self.compile_time,
+      'hot_recompiles' : self.hot_recompiles,
+      'missed_signatures' : dict(self.missed_signatures),
+      'specializations' : specializations,
+    }
+
+def merge_stats(x, y):
+  """
+  Sum the numbers in two (possibly nested) dictionaries of counters
+  """
+  result = dict(x)
+  for (k, v) in y.iteritems():
+    if k not in result:
+      result[k] = v
+    elif isinstance(v, dict):
+      result[k] = merge_stats(result[k], v)
+    else:
+      result[k] = result[k] + v
+  return result
+
+def stats():
+  """
+  Snapshot of the counters of every live jit function which has been 
+  called, keyed by the module and name of the Python function (several 
+  jit wrappers of the same function get added up)
+  """
+  result = {}
+  for jit_fn in list(_jit_functions):
+    call_stats = jit_fn.call_stats
+    if call_stats.hits == call_stats.misses == call_stats.persistent_hits == 0:
+      continue
+    fn = jit_fn.fn
+    name = "%s.%s" % (getattr(fn, '__module__', None), jit_fn.name)
+    snapshot = call_stats.snapshot()
+    if name in result:
+      result[name] = merge_stats(result[name], snapshot)
+    else:
+      result[name] = snapshot
+  return result
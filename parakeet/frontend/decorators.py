@@ -1,17 +1,132 @@
+import time
+from functools import partial
 
-from .. import names 
+from numpy import ndarray, may_share_memory
+
+from .. import config, names, openmp_backend 
+from ..profiling import mark, timed
   
 from .. syntax import (Expr, Var, Const, Return, UntypedFn, FormalArgs, DelayUntilTyped,  
                        const, is_python_constant)
 
-from run_function import run_untyped_fn, run_typed_fn, specialize 
+from ..c_backend import config as c_config
+from ..c_backend.flags import opt_level
+from ..c_backend.prepare_args import prepare_args
+from ..transforms.pipeline import with_output_arg
+from dispatch import (DispatchEntry, QuickDispatchEntry, OutputDispatchEntry, 
+                      dispatch_key, linearize_positions, 
+                      resolve_backend, background_pool, compile_lock, SingleFlight, 
+                      check_output, copy_to_output, result_dim_sources, 
+                      symbolic_result_shape)
+from call_stats import CallStats, register
+import persistent_cache
+from run_function import (run_untyped_fn, run_typed_fn, specialize, 
+                          compile_entry, native_backends) 
+
+# output dispatch entries can be None 
+_not_compiled = object()
 
 class jit(object):
-  def __init__(self, f):
+  """
+  Wrap a Python function so that calling it compiles a specialized 
+  native version for the types of its arguments. 
+  
+  With tiered = True, a call which needs a new specialization starts 
+  compiling it on a background thread and meanwhile runs the original 
+  Python function; the native entry point gets swapped in as soon as it's 
+  ready. The number of calls served by each tier is kept in tier_counts. 
+  Only use tiered mode for functions which also run correctly as plain 
+  Python, since errors from the Python tier are raised to the caller. 
+  
+  The number of threads, schedule kind and chunk size used by the OpenMP 
+  backend's parallel loops can be set here for every call or for a single 
+  call with the _num_threads, _schedule and _chunk_size keywords. Neither 
+  requires recompiling, anything left unset comes from openmp_backend.config. 
+  
+  Passing a preallocated array with the _out keyword makes the call write 
+  its array result into it (and return it) instead of allocating a new one. 
+  The array must already have the result's dtype and shape. 
+  
+  With c_backend.config.tiered_opt_levels, every new specialization first 
+  gets compiled quickly with few optimizations. Those which turn out to be 
+  hot get recompiled with aggressive optimizations on a background thread, 
+  replacing the quick version once they're done (see c_backend.config for 
+  the thresholds). Versions writing into an _out array don't get tiered. 
+  
+  Cache hits and misses get counted in call_stats, see parakeet.stats(). 
+  
+  Calling a jit function from several threads at once is safe. Calls served 
+  from the dispatch table don't take any locks. A call which needs a new 
+  specialization compiles it while holding dispatch.compile_lock, and other 
+  threads missing on the same dispatch key meanwhile wait for that one 
+  compilation instead of starting their own. With config.collect_stats the 
+  per-call counters may miss a few calls made at exactly the same time. 
+  """
+  def __init__(self, f, tiered = False, num_threads = None, schedule = None, chunk_size = None):
     self.f = f
     self.fn = f
     self.untyped = None 
-
+    
+    # map cheap fingerprints of the argument values directly 
+    # to compiled entry points, skipping the frontend on repeated calls 
+    self._dispatch = {}
+    # the same for versions writing their result into an _out array, 
+    # None when the result needs to be computed first and then copied 
+    self._output_dispatch = {}
+    # dispatch keys being compiled right now, other threads 
+    # calling with the same key wait for those
+    self._flights = SingleFlight()
+    
+    # hash of the function's code and everything it refers to, 
+    # used to find entry points compiled by other processes 
+    self._fingerprint = None 
+    self._fingerprint_computed = False 
+    # where to find the nonlocal values, as recorded in the persistent index
+    self._nonlocal_refs = None 
+    
+    self.tiered = tiered 
+    # dispatch keys whose compilation is running in the background 
+    self._pending = {}
+    self.tier_counts = {'python' : 0, 'native' : 0}
+    
+    self.num_threads = num_threads
+    self.schedule = schedule 
+    self.chunk_size = chunk_size 
+    
+    self.call_stats = CallStats()
+    register(self)
+  
+  @property
+  def name(self):
+    return getattr(self.fn, '__name__', str(self.fn))
+  
+  @property
+  def fingerprint(self):
+    if not self._fingerprint_computed:
+      if persistent_cache.index_dir() is not None:
+        self._fingerprint = persistent_cache.fn_fingerprint(self.fn)
+      self._fingerprint_computed = True 
+    return self._fingerprint 
+  
+  def translate(self):
+    if self.untyped is None:
+      import ast_conversion 
+      self.untyped = ast_conversion.translate_function_value(self.fn)
+      if self.fingerprint is not None:
+        persistent_cache.save_nonlocals(self.fn, self.fingerprint, self.untyped)
+    return self.untyped 
+  
+  def nonlocals(self):
+    if self.untyped is None and self.fingerprint is not None:
+      # only read the index once, after that just follow the refs 
+      if self._nonlocal_refs is None:
+        self._nonlocal_refs = persistent_cache.load_nonlocal_refs(self.fingerprint)
+      if self._nonlocal_refs is not None:
+        values = persistent_cache.deref_nonlocals(self.fn, self._nonlocal_refs)
+        if values is not None:
+          return values 
+    return self.translate().python_nonlocals()
+  
   def __call__(self, *args, **kwargs):
     if '_backend' in kwargs:
       backend_name = kwargs['_backend']
@@ -19,12 +134,242 @@ class jit(object):
     else:
       backend_name = None
     
-    if self.untyped is None:
-      import ast_conversion 
-      self.untyped = ast_conversion.translate_function_value(self.fn)
+    num_threads = kwargs.pop('_num_threads', self.num_threads) if kwargs else self.num_threads
+    schedule = kwargs.pop('_schedule', self.schedule) if kwargs else self.schedule
+    chunk_size = kwargs.pop('_chunk_size', self.chunk_size) if kwargs else self.chunk_size
+    out = kwargs.pop('_out', None) if kwargs else None
+    
+    backend_name = resolve_backend(backend_name)
+    if backend_name == 'openmp':
+      openmp_backend.set_options(num_threads, schedule, chunk_size)
+    elif backend_name not in native_backends:
+      with compile_lock:
+        typed_fn, linear_args = specialize(self.translate(), args, kwargs)
+      result = run_typed_fn(typed_fn, linear_args, backend_name)
+      return result if out is None else copy_to_output(out, result)
+      
+    nonlocals = self.nonlocals()
+    if out is not None:
+      return self.call_with_output(out, backend_name, nonlocals, args, kwargs)
+    key = dispatch_key(backend_name, nonlocals, args, kwargs)
+    
+    if key is not None:
+      entry = self._dispatch.get(key)
+      if entry is None and self.fingerprint is not None:
+        entry = persistent_cache.load_entry(self.fingerprint, key)
+        if entry is not None:
+          mark("jit", self.name, cached = True, persistent = True)
+          self.call_stats.persistent_hits += 1
+          self._dispatch[key] = entry 
+      if entry is not None:
+        if self.tiered: 
+          self.tier_counts['native'] += 1
+        if config.collect_stats:
+          return self.call_stats.timed_call(key, entry, nonlocals, args, kwargs)
+        return entry(nonlocals, args, kwargs)
+      
+      if self.tiered and self.compile_in_background(key, nonlocals, args, kwargs):
+        # if the Python version fails we can't retry natively, since it 
+        # might already have modified its inputs 
+        result = self.f(*args, **kwargs)
+        self.tier_counts['python'] += 1 
+        return result 
+    
+      entry = self.entry_for(key, nonlocals, args, kwargs, backend_name)
+      if self.tiered: 
+        self.tier_counts['native'] += 1
+      return entry(nonlocals, args, kwargs)
     
-    typed_fn, linear_args = specialize(self.untyped, args, kwargs)
-    return run_typed_fn(typed_fn, linear_args, backend_name)
+    c_fn, linear_args = self.compile(key, nonlocals, args, kwargs, backend_name)
+    if self.tiered: 
+      self.tier_counts['native'] += 1
+    return c_fn(*linear_args)
+  
+  def entry_for(self, key, nonlocals, args, kwargs, backend_name):
+    """
+    Dispatch entry for the given key, compiled for the given arguments 
+    unless another call already did that. Threads asking for the same key
+    at the same time share a single compilation. 
+    """
+    return self._flights.run(key, self._entry_for, key, nonlocals, args, kwargs, backend_name)
+  
+  def _entry_for(self, key, nonlocals, args, kwargs, backend_name):
+    entry = self._dispatch.get(key)
+    if entry is None:
+      entry = self._compile(key, nonlocals, args, kwargs, backend_name)[2]
+    return entry 
+  
+  def compile(self, key, nonlocals, args, kwargs, backend_name):
+    """
+    Specialize and compile the function for the given arguments, 
+    register the result under the dispatch key (unless it's None) and 
+    return the native entry point along with its prepared arguments
+    """
+    compiled_fn, linear_args, _ = self._compile(key, nonlocals, args, kwargs, backend_name)
+    return compiled_fn.c_fn, linear_args
+  
+  def _compile(self, key, nonlocals, args, kwargs, backend_name, hot = False):
+    """
+    Compile at the default optimization level, or at the quick level when 
+    tiering (with a dispatch entry which promotes itself once it's hot), 
+    or at the hot level 
+    """
+    quick = not hot and key is not None and c_config.tiered_opt_levels
+    with compile_lock, timed("jit", self.name, backend = backend_name):
+      start_t = time.time()
+      untyped = self.translate()
+      typed_fn, linear_args = specialize(untyped, args, kwargs)
+      linear_args = prepare_args(linear_args, typed_fn.input_types)
+      if quick or hot:
+        level = c_config.hot_opt_level if hot else c_config.quick_opt_level
+        with opt_level(level):
+          compiled_fn = compile_entry(typed_fn, linear_args, backend_name)
+      else:
+        compiled_fn = compile_entry(typed_fn, linear_args, backend_name)
+      if key is not None:
+        promote = partial(self.promote, key, backend_name) if quick else None
+        entry = self.add_entry(key, len(nonlocals), len(args), typed_fn.input_types, 
+                               compiled_fn, promote)
+      else:
+        entry = None 
+      self.call_stats.record_compile(key, typed_fn.input_types, compiled_fn, 
+                                     time.time() - start_t, hot = hot)
+    return compiled_fn, linear_args, entry 
+  
+  def promote(self, key, backend_name, nonlocals, args, kwargs):
+    """
+    Recompile a hot specialization with more optimizations on the 
+    background thread, it replaces the quick one in the dispatch 
+    table when it's done  
+    """
+    self._pending[('hot', key)] = \
+      background_pool().apply_async(self._compile, 
+                                    (key, nonlocals, args, kwargs, backend_name, True))
+  
+  def call_with_output(self, out, backend_name, nonlocals, args, kwargs):
+    """
+    Run natively with the result written into the output array, falling back
+    on copying it there when the output overlaps one of the inputs or the 
+    shape of the result can't be checked before running 
+    """
+    values = list(nonlocals)
+    values.extend(args)
+    if kwargs:
+      values.extend(kwargs.itervalues())
+    for x in values:
+      if type(x) is ndarray and may_share_memory(x, out):
+        return copy_to_output(out, self.run_native(backend_name, nonlocals, args, kwargs))
+    key = dispatch_key(backend_name, nonlocals, args + (out,), kwargs)
+    if key is None:
+      entry = self.compile_with_output(key, nonlocals, args, kwargs, out, backend_name)
+    else:
+      entry = self._output_dispatch.get(key, _not_compiled)
+      if entry is _not_compiled:
+        # the same flights as the plain dispatch keys, but tagged 
+        # since the output is just another positional argument there
+        entry = self._flights.run(('out', key), self._output_entry_for, 
+                                  key, nonlocals, args, kwargs, out, backend_name)
+    if entry is None:
+      return copy_to_output(out, self.run_native(backend_name, nonlocals, args, kwargs))
+    if config.collect_stats:
+      return self.call_stats.timed_call(key, entry, nonlocals, args, kwargs, out)
+    return entry(nonlocals, args, kwargs, out)
+  
+  def _output_entry_for(self, key, nonlocals, args, kwargs, out, backend_name):
+    entry = self._output_dispatch.get(key, _not_compiled)
+    if entry is _not_compiled:
+      entry = self.compile_with_output(key, nonlocals, args, kwargs, out, backend_name)
+    return entry 
+  
+  def compile_with_output(self, key, nonlocals, args, kwargs, out, backend_name):
+    """
+    Compile the version of the function which writes its result into an 
+    extra output argument, remember it under the given key (unless it's None)
+    """
+    with compile_lock, timed("jit", self.name, backend = backend_name, output = True):
+      start_t = time.time()
+      untyped = self.translate()
+      typed_fn, linear_args = specialize(untyped, args, kwargs)
+      check_output(out, typed_fn.return_type)
+      result_shape = symbolic_result_shape(typed_fn, linear_args)
+      if result_shape is None:
+        entry = None
+      else:
+        dim_sources = result_dim_sources(result_shape, linear_args)
+        output_fn = with_output_arg(typed_fn)
+        linear_args = prepare_args(list(linear_args) + [out], output_fn.input_types)
+        compiled_fn = compile_entry(output_fn, linear_args, backend_name)
+        keywords = tuple(sorted(kwargs.iterkeys())) if kwargs else ()
+        arg_order = linearize_positions(untyped.args, len(nonlocals), len(args), keywords)
+        entry = OutputDispatchEntry(arg_order, keywords, output_fn.input_types, 
+                                    compiled_fn.c_fn, result_shape, dim_sources)
+      if key is not None:
+        self._output_dispatch[key] = entry
+      self.call_stats.record_compile(key, typed_fn.input_types, 
+                                     compiled_fn if entry is not None else None, 
+                                     time.time() - start_t)
+    return entry 
+  
+  def run_native(self, backend_name, nonlocals, args, kwargs):
+    key = dispatch_key(backend_name, nonlocals, args, kwargs)
+    if key is not None:
+      entry = self._dispatch.get(key)
+      if entry is None:
+        entry = self.entry_for(key, nonlocals, args, kwargs, backend_name)
+      return entry(nonlocals, args, kwargs)
+    c_fn, linear_args = self.compile(key, nonlocals, args, kwargs, backend_name)
+    return c_fn(*linear_args)
+  
+  def compile_in_background(self, key, nonlocals, args, kwargs):
+    """
+    Make sure the entry point for this dispatch key is being compiled
+    on the background thread, return True while that's still in progress 
+    """
+    result = self._pending.get(key)
+    if result is None:
+      result = background_pool().apply_async(self.entry_for, 
+                                             (key, nonlocals, args, kwargs, key[0]))
+      self._pending[key] = result 
+    if not result.ready():
+      return True 
+    # finished (and installed in the dispatch table) or failed, 
+    # either way the caller should go through the normal compile path
+    self._pending.pop(key, None)
+    return False 
+  
+  def wait(self):
+    """
+    Block until all background compilations have finished 
+    """
+    for result in list(self._pending.values()):
+      result.wait()
+  
+  def clear_dispatch(self):
+    """
+    Drop the compiled entry points of this function, so the next 
+    call goes through the compiler (and its caches) again 
+    """
+    self._dispatch.clear()
+    self._output_dispatch.clear()
+    self.call_stats.compiled.clear()
+  
+  def add_entry(self, key, n_nonlocals, n_args, input_types, compiled_fn, promote = None):
+    """
+    Register a compiled entry point in the dispatch table under the given
+    dispatch key and record it in the persistent index. Quickly compiled 
+    entry points come with the function which promotes them once they're 
+    hot, they don't get recorded since they're meant to be replaced.
+    """
+    keywords = key[2]
+    arg_order = linearize_positions(self.translate().args, n_nonlocals, n_args, keywords)
+    if promote is None:
+      entry = DispatchEntry(arg_order, keywords, input_types, compiled_fn.c_fn)
+    else:
+      entry = QuickDispatchEntry(arg_order, keywords, input_types, compiled_fn.c_fn, promote)
+    self._dispatch[key] = entry 
+    if self.fingerprint is not None and promote is None:
+      persistent_cache.save_entry(self.fingerprint, key, entry, compiled_fn)
+    return entry 
 
 
 class macro(object):
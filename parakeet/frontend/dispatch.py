@@ -0,0 +1,322 @@
+import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+from numpy import ndarray
+
+from .. import config
+from ..ndtypes import ArrayT, scalar_types, typeof
+from ..shape_inference import Shape, call_shape_expr, shape as shape_values
+from ..shape_inference.shape_eval import eval_shape
+from ..syntax import ActualArgs
+from ..c_backend import config as c_config
+from ..c_backend.prepare_args import prepare_args
+
+# Python types whose Parakeet type depends only on the type itself, 
+# mapped to the NumPy scalar type with the same Parakeet type 
+_scalar_types = dict((dt.type, dt.type) for dt in scalar_types._dtype_to_parakeet_type)
+_scalar_types.update({bool : np.bool_, int : np.int64, long : np.int64, float : np.float64})
+
+def _small_value(x):
+  """
+  Value specialization only distinguishes 0 and 1 from all other values,
+  so those are the only cases a dispatch key needs to remember
+  """
+  if x == 0:
+    return 0
+  elif x == 1:
+    return 1
+  else:
+    return None
+
+def arg_signature(x):
+  """
+  Cheap fingerprint of a Python value which determines both its Parakeet type
+  and the abstract value used by value specialization. Returns None for any
+  value which can't be fingerprinted without running the frontend.
+  """
+  t = type(x)
+  if t is ndarray:
+    itemsize = x.dtype.itemsize
+    flags = x.flags
+    return (t, x.dtype, x.ndim,
+            flags.c_contiguous, flags.f_contiguous,
+            tuple([_small_value(s / itemsize) for s in x.strides]),
+            tuple([_small_value(d) for d in x.shape]))
+  elif t in _scalar_types:
+    return (_scalar_types[t], _small_value(x))
+  elif t is tuple:
+    elts = []
+    for elt in x:
+      s = arg_signature(elt)
+      if s is None:
+        return None
+      elts.append(s)
+    return (t, tuple(elts))
+  elif x is None:
+    return (t,)
+  else:
+    return None
+
+def dispatch_key(backend, nonlocals, args, kwargs):
+  """
+  Combine the backend name, the keyword names and the fingerprints of all
+  the nonlocal, positional and keyword values into a single hashable key,
+  or return None if any of the values has no cheap fingerprint
+  """
+  sigs = []
+  for x in nonlocals:
+    s = arg_signature(x)
+    if s is None: return None
+    sigs.append(s)
+  for x in args:
+    s = arg_signature(x)
+    if s is None: return None
+    sigs.append(s)
+  if kwargs:
+    keywords = tuple(sorted(kwargs.iterkeys()))
+    for k in keywords:
+      s = arg_signature(kwargs[k])
+      if s is None: return None
+      sigs.append(s)
+  else:
+    keywords = ()
+  return (backend, len(args), keywords, tuple(sigs))
+
+
+def linearize_positions(formals, n_nonlocals, n_args, keywords):
+  """
+  The order in which values get passed to the compiled function only 
+  depends on the number of positional args and the keyword names, 
+  so linearize their positions once instead of their values on every call 
+  """
+  n_positional = n_nonlocals + n_args
+  positions = tuple(range(n_positional))
+  if keywords:
+    keyword_positions = dict((k, n_positional + i) for (i,k) in enumerate(keywords))
+    actuals = ActualArgs(positions, keyword_positions)
+  else:
+    actuals = positions
+  return tuple(formals.linearize_without_defaults(actuals))
+
+class DispatchEntry(object):
+  """
+  Compiled entry point for one argument signature of a jitted function 
+  """
+  
+  __slots__ = ['arg_order', 'keywords', 'input_types', 'c_fn']
+  
+  def __init__(self, arg_order, keywords, input_types, c_fn):
+    self.arg_order = arg_order
+    self.keywords = keywords
+    self.input_types = input_types
+    self.c_fn = c_fn
+  
+  def linearize(self, nonlocals, args, kwargs):
+    values = list(nonlocals)
+    values.extend(args)
+    for k in self.keywords:
+      values.append(kwargs[k])
+    return [values[i] for i in self.arg_order]
+  
+  def __call__(self, nonlocals, args, kwargs):
+    linear_args = self.linearize(nonlocals, args, kwargs)
+    return self.c_fn(*prepare_args(linear_args, self.input_types))
+
+class QuickDispatchEntry(DispatchEntry):
+  """
+  Entry point compiled at a low optimization level, which keeps track of 
+  how often it's called and for how long. Once it gets hot it calls 
+  promote (only once) with the arguments of that call, which should 
+  arrange for an optimized version to replace it. 
+  """
+  
+  __slots__ = ['calls', 'elapsed', 'promote']
+  
+  def __init__(self, arg_order, keywords, input_types, c_fn, promote):
+    DispatchEntry.__init__(self, arg_order, keywords, input_types, c_fn)
+    self.calls = 0
+    self.elapsed = 0.0
+    self.promote = promote 
+  
+  def __call__(self, nonlocals, args, kwargs):
+    start_t = time.time()
+    result = DispatchEntry.__call__(self, nonlocals, args, kwargs)
+    self.elapsed += time.time() - start_t
+    self.calls += 1
+    if self.promote is not None and \
+       (self.calls >= c_config.hot_call_threshold or 
+        self.elapsed >= c_config.hot_time_threshold):
+      promote = self.promote
+      self.promote = None
+      promote(nonlocals, args, kwargs)
+    return result 
+
+class OutputDispatchEntry(DispatchEntry):
+  """
+  Compiled entry point which writes its result into an output array passed 
+  after all the other arguments. Since the generated code trusts the output 
+  to be big enough, its shape is checked against the result's symbolic shape 
+  on every call.
+  """
+  
+  __slots__ = ['result_shape', 'dim_sources']
+  
+  def __init__(self, arg_order, keywords, input_types, c_fn, result_shape, dim_sources):
+    DispatchEntry.__init__(self, arg_order, keywords, input_types, c_fn)
+    self.result_shape = result_shape
+    self.dim_sources = dim_sources
+  
+  def expected_shape(self, linear_args):
+    if self.dim_sources is None:
+      return eval_shape(self.result_shape, linear_args)
+    dims = []
+    for (i, d) in self.dim_sources:
+      if i is None:
+        dims.append(d)
+      elif d is None:
+        dims.append(linear_args[i])
+      else:
+        dims.append(linear_args[i].shape[d])
+    return tuple(dims)
+  
+  def __call__(self, nonlocals, args, kwargs, out):
+    linear_args = self.linearize(nonlocals, args, kwargs)
+    expected_shape = self.expected_shape(linear_args)
+    if out.shape != expected_shape:
+      raise ValueError("Output array has shape %s but the result's shape is %s" % 
+                       (out.shape, expected_shape))
+    linear_args.append(out)
+    self.c_fn(*prepare_args(linear_args, self.input_types))
+    return out 
+
+def check_output(out, result_t):
+  """
+  Make sure an output array given with _out can hold results of type result_t
+  """
+  if type(out) is not ndarray:
+    raise TypeError("Output must be an array, got %s" % type(out))
+  if result_t.__class__ is not ArrayT:
+    raise TypeError("Can only write array results into an output array, not %s" % result_t)
+  if out.dtype != result_t.dtype() or out.ndim != result_t.rank:
+    raise TypeError("Output array of type %s can't hold result of type %s" % 
+                    (typeof(out), result_t))
+
+def symbolic_result_shape(typed_fn, linear_args):
+  """
+  Shape of the typed function's result in terms of its inputs, 
+  or None if the result shape can't be computed from them 
+  """
+  try:
+    shape = call_shape_expr(typed_fn)
+    eval_shape(shape, linear_args)
+  except Exception:
+    return None
+  if shape.__class__ is not Shape:
+    return None 
+  return shape 
+
+def result_dim_sources(shape, linear_args):
+  """
+  Most result shapes just copy dimensions of the inputs, in which case 
+  return where each dimension comes from as (argument position, axis) pairs 
+  (with axis None for scalar arguments and position None for constants),
+  which is much cheaper to check than evaluating the symbolic shape 
+  """
+  # the same order in which eval_shape numbers the inputs
+  flat_positions = []
+  for (i, x) in enumerate(linear_args):
+    if type(x) is ndarray:
+      flat_positions.extend((i, d) for d in xrange(x.ndim))
+    elif type(x) is tuple:
+      return None 
+    else:
+      flat_positions.append((i, None))
+  sources = []
+  for dim in shape.dims:
+    if dim.__class__ is shape_values.Var:
+      sources.append(flat_positions[dim.num])
+    elif dim.__class__ is shape_values.Const:
+      sources.append((None, dim.value))
+    else:
+      return None 
+  return sources 
+
+def copy_to_output(out, result):
+  """
+  Slow path for _out, when the result has already been computed elsewhere
+  """
+  check_output(out, typeof(result))
+  if out.shape != result.shape:
+    raise ValueError("Output array has shape %s but the result's shape is %s" % 
+                     (out.shape, result.shape))
+  out[...] = result
+  return out 
+
+def resolve_backend(backend_name):
+  if backend_name is None:
+    return config.backend
+  return backend_name
+
+# The frontend, the optimization pipeline and the backends share lots of 
+# unsynchronized state (fresh name counters, the caches of phases and 
+# entry points, the stack of phase names being profiled), so they aren't 
+# safe to run from multiple threads at once: all specialization and 
+# compilation holds this lock. Running compiled code doesn't need it, and
+# neither do calls served from a dispatch table, which only read a dict. 
+compile_lock = threading.RLock()
+
+class _Flight(object):
+  __slots__ = ['done', 'value', 'exc_info']
+  
+  def __init__(self):
+    self.done = threading.Event()
+    self.value = None
+    self.exc_info = None
+
+class SingleFlight(object):
+  """
+  Runs at most one computation per key at a time: the first thread asking 
+  for a key runs it and any other thread asking for the same key meanwhile 
+  waits for it to finish, getting the same result (or exception). Threads
+  asking for different keys don't wait on each other. 
+  """
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._flights = {}
+  
+  def run(self, key, fn, *args):
+    with self._lock:
+      flight = self._flights.get(key)
+      owner = flight is None 
+      if owner:
+        flight = _Flight()
+        self._flights[key] = flight 
+    if not owner:
+      flight.done.wait()
+      if flight.exc_info is not None:
+        exc_type, exc_value, tb = flight.exc_info
+        raise exc_type, exc_value, tb
+      return flight.value 
+    try:
+      flight.value = fn(*args)
+    except:
+      flight.exc_info = sys.exc_info()
+      raise 
+    finally:
+      with self._lock:
+        del self._flights[key]
+      flight.done.set()
+    return flight.value 
+
+_background_pool = None
+def background_pool():
+  """
+  Single worker thread used for compiling entry points in the background
+  """
+  global _background_pool
+  if _background_pool is None:
+    _background_pool = ThreadPool(1)
+  return _background_pool
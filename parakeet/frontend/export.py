@@ -0,0 +1,188 @@
+import os
+
+from .. import c_backend, openmp_backend
+from ..c_backend import PyModuleCompiler
+from ..c_backend.compile_util import (create_module_source, compile_extension_module,
+                                      python_headers)
+from ..c_backend.prepare_args import prepare_args
+from ..openmp_backend import MulticoreCompiler
+
+import ast_conversion
+from decorators import jit
+from dispatch import compile_lock, resolve_backend
+from persistent_cache import encode_type
+from precompile import _example_args
+from run_function import specialize
+
+_backends = {
+  'c' : (c_backend, PyModuleCompiler),
+  'openmp' : (openmp_backend, MulticoreCompiler),
+}
+
+_shim_template = '''"""
+Prebuilt Parakeet kernels for %(exported_names)s.
+Generated by parakeet.export, don't edit.
+"""
+import imp
+import os
+
+import numpy as np
+
+_kernels = imp.load_dynamic(%(ext_name)r,
+  os.path.join(os.path.dirname(os.path.abspath(__file__)), %(ext_filename)r))
+
+# exported function name -> encoded argument types -> C entry point name
+_entries = %(entries)r
+
+_scalar_dtypes = {bool : np.dtype('bool'), int : np.dtype('int64'),
+                  long : np.dtype('int64'), float : np.dtype('float64')}
+
+def _encode(x):
+  if isinstance(x, np.ndarray):
+    return ('array', x.dtype.str, x.ndim)
+  elif type(x) in _scalar_dtypes:
+    return ('scalar', _scalar_dtypes[type(x)].str)
+  elif isinstance(x, np.generic):
+    return ('scalar', x.dtype.str)
+  elif type(x) is tuple:
+    return ('tuple', tuple(_encode(elt) for elt in x))
+  elif x is None:
+    return ('none',)
+  raise TypeError("Unsupported argument %%s : %%s" %% (x, type(x)))
+
+def _prepare(x, encoded):
+  if encoded[0] == 'scalar':
+    return np.dtype(encoded[1]).type(x)
+  elif encoded[0] == 'tuple':
+    return tuple(_prepare(elt, elt_t) for (elt, elt_t) in zip(x, encoded[1]))
+  return x
+
+def _call(name, args):
+  key = tuple(_encode(arg) for arg in args)
+  entry_name = _entries[name].get(key)
+  if entry_name is None:
+    raise TypeError("No exported specialization of %%s for argument types %%s, available: %%s" %%
+                    (name, key, sorted(_entries[name].keys())))
+  c_fn = getattr(_kernels, entry_name)
+  return c_fn(*[_prepare(arg, t) for (arg, t) in zip(args, key)])
+%(wrappers)s
+'''
+
+_wrapper_template = '''
+def %(name)s(*args):
+  return _call(%(name)r, args)
+'''
+
+def _python_name(fn):
+  if isinstance(fn, jit):
+    fn = fn.fn
+  return fn.__name__
+
+def _rename_entry(entry_kwargs, new_name):
+  """
+  Give the generated module entry point a name that's unique within
+  the exported module
+  """
+  old_sig = entry_kwargs['fn_signature']
+  new_sig = old_sig.replace(entry_kwargs['fn_name'], new_name, 1)
+  src = entry_kwargs['partial_src'].replace(old_sig, new_sig, 1)
+  return src, new_sig
+
+def export(module_name, specs, output_dir = '.', backend = None):
+  """
+  Compile every requested specialization into a single extension module
+  along with a generated Python module of the given name which dispatches
+  calls on the argument types. Each element of specs is a tuple
+  (fn, signature1, signature2, ...) where each signature is a sequence of
+  Parakeet types or example values.
+
+  The generated code doesn't depend on Parakeet or a C compiler, but since
+  the specializations can't check their assumptions about particular values,
+  they're compiled without value specialization. Parallel loops of exported
+  OpenMP code take their thread count and schedule from OMP_NUM_THREADS and
+  OMP_SCHEDULE.
+
+  Returns the filename of the generated Python module.
+  """
+  backend = resolve_backend(backend)
+  assert backend in _backends, \
+    "Can only export code from the C or OpenMP backends, not %s" % backend
+  backend_module, Compiler = _backends[backend]
+
+  entries = {}
+  entry_names = []
+  entry_sources = []
+  function_sources = []
+  declarations = []
+  extra_objects = set([])
+  compile_flags = []
+  link_flags = []
+  entry_kwargs = None
+
+  with compile_lock:
+    for spec in specs:
+      fn, signatures = spec[0], spec[1:]
+      name = _python_name(fn)
+      assert name not in entries, "Function %s exported more than once" % name
+      entries[name] = {}
+      untyped = fn.translate() if isinstance(fn, jit) else \
+                ast_conversion.translate_function_value(fn)
+      assert len(untyped.python_nonlocals()) == 0, \
+        "Can't export %s since it depends on global or closure values" % name
+      for arg_types in signatures:
+        args = _example_args(arg_types)
+        typed_fn, linear_args = specialize(untyped, args)
+        assert len(linear_args) == len(args), \
+          "Exported signatures must supply every argument of %s" % name
+        linear_args = prepare_args(linear_args, typed_fn.input_types)
+        entry_fn = backend_module.specialize_entry(typed_fn, linear_args,
+                                                   value_specialize = False)
+        entry_kwargs = Compiler().entry_source(entry_fn)
+
+        entry_name = "%s_%d" % (name, len(entries[name]))
+        src, _ = _rename_entry(entry_kwargs, entry_name)
+        key = tuple(encode_type(t) for t in typed_fn.input_types)
+        entries[name][key] = entry_name
+        entry_names.append(entry_name)
+        entry_sources.append(src)
+        # helper functions and struct types have process-wide unique names,
+        # so anything shared between entry points only needs to appear once
+        for fn_src in entry_kwargs['extra_function_sources']:
+          if fn_src not in function_sources: function_sources.append(fn_src)
+        for decl in entry_kwargs['declarations']:
+          if decl not in declarations: declarations.append(decl)
+        extra_objects.update(entry_kwargs['extra_objects'])
+        for flag in entry_kwargs['extra_compile_flags']:
+          if flag not in compile_flags: compile_flags.append(flag)
+        for flag in entry_kwargs['extra_link_flags']:
+          if flag not in link_flags: link_flags.append(flag)
+  assert entry_kwargs is not None, "Nothing to export"
+
+  ext_name = "_%s_kernels" % module_name
+  full_src = create_module_source("\n\n".join(entry_sources), None,
+                                  extra_headers = python_headers,
+                                  declarations = declarations,
+                                  extra_function_sources = function_sources,
+                                  module_name = ext_name,
+                                  entry_names = entry_names)
+  shared_name = compile_extension_module(
+    full_src, ext_name, output_dir,
+    src_extension = entry_kwargs['src_extension'],
+    extra_objects = extra_objects,
+    extra_compile_flags = compile_flags,
+    extra_link_flags = link_flags,
+    compiler = entry_kwargs['compiler'],
+    compiler_flag_prefix = entry_kwargs['compiler_flag_prefix'],
+    linker_flag_prefix = entry_kwargs['linker_flag_prefix'])
+
+  names = [_python_name(spec[0]) for spec in specs]
+  wrappers = "".join(_wrapper_template % {'name' : name} for name in names)
+  shim_src = _shim_template % dict(exported_names = ", ".join(names),
+                                   ext_name = ext_name,
+                                   ext_filename = os.path.basename(shared_name),
+                                   entries = entries,
+                                   wrappers = wrappers)
+  shim_filename = os.path.join(output_dir, module_name + ".py")
+  with open(shim_filename, 'w') as f:
+    f.write(shim_src)
+  return shim_filename
@@ -0,0 +1,308 @@
+"""
+On-disk index from (function fingerprint, argument signature, backend,
+compiler settings, Parakeet version) to the cached shared object built
+for that specialization, which lets a fresh interpreter load and call
+a compiled entry point without translating, optimizing or compiling anything.
+"""
+
+import cPickle
+import hashlib
+import imp
+import os
+import sys
+import types
+
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+
+from .. import config, package_info
+from ..c_backend import config as c_config, disk_cache
+from ..ndtypes import (ScalarT, ArrayT, TupleT, NoneT, NoneType,
+                       make_array_type, make_tuple_type)
+from ..ndtypes.scalar_types import from_dtype
+from dispatch import DispatchEntry
+from python_ref import GlobalValueRef, ClosureCellRef
+
+# modules whose contents we trust to stay the same for a given
+# Parakeet/NumPy/Python version, so only their names are fingerprinted
+_stable_modules = set(['numpy', 'math', 'parakeet', '__builtin__', 'operator'])
+
+class Unfingerprintable(Exception):
+  def __init__(self, value):
+    self.value = value
+
+  def __str__(self):
+    return "Can't fingerprint %s : %s" % (self.value, type(self.value))
+
+def _code_objects(code):
+  yield code
+  for c in code.co_consts:
+    if isinstance(c, types.CodeType):
+      for nested in _code_objects(c):
+        yield nested
+
+def _is_static_scalar(v):
+  return v is None or isinstance(v, (bool, int, long, float, str, np.generic))
+
+def _value_fingerprint(v, attr_names, seen):
+  t = type(v)
+  if _is_static_scalar(v) or t is np.dtype:
+    return repr((t, v))
+  elif t is tuple:
+    return "(%s)" % ",".join(_value_fingerprint(elt, attr_names, seen) for elt in v)
+  elif t is np.ndarray:
+    # array values get passed to the compiled code as arguments
+    return repr((t, v.dtype, v.ndim))
+  elif t is types.ModuleType:
+    root = v.__name__.split(".")[0]
+    if root in _stable_modules or not hasattr(v, '__file__'):
+      return "module:" + v.__name__
+    # for user modules we have to look at any attributes which might get used
+    parts = ["module:" + v.__name__]
+    for name in sorted(attr_names):
+      if name in v.__dict__ and not isinstance(v.__dict__[name], types.ModuleType):
+        parts.append("%s=%s" % (name, _value_fingerprint(v.__dict__[name], attr_names, seen)))
+    return ";".join(parts)
+  elif t is types.FunctionType:
+    module_name = getattr(v, '__module__', None) or ""
+    if module_name.split(".")[0] in _stable_modules:
+      return "function:%s.%s" % (module_name, v.__name__)
+    return "function:" + _fn_fingerprint(v, seen)
+  elif hasattr(v, 'fn') and isinstance(getattr(v, 'fn'), types.FunctionType):
+    # jit and macro wrappers
+    return "%s(%s)" % (t.__name__, _value_fingerprint(v.fn, attr_names, seen))
+  elif isinstance(v, (types.BuiltinFunctionType, np.ufunc, type, types.ClassType)):
+    return "builtin:%s.%s" % (getattr(v, '__module__', None), v.__name__)
+  else:
+    raise Unfingerprintable(v)
+
+def _fn_fingerprint(fn, seen):
+  if id(fn) in seen:
+    return seen[id(fn)]
+  # in case of recursion, refer back to the function by name
+  seen[id(fn)] = "recursive:%s" % fn.__name__
+  code = fn.func_code
+  h = hashlib.sha224()
+  attr_names = set([])
+  for c in _code_objects(code):
+    h.update(c.co_code)
+    h.update(repr((c.co_name, c.co_names, c.co_varnames, c.co_freevars, c.co_cellvars)))
+    h.update(repr([(type(k), k) for k in c.co_consts if not isinstance(k, types.CodeType)]))
+    attr_names.update(c.co_names)
+  fn_globals = fn.func_globals
+  for name in sorted(attr_names):
+    if name in fn_globals:
+      h.update("%s=%s;" % (name, _value_fingerprint(fn_globals[name], attr_names, seen)))
+  for v in (fn.func_defaults or ()):
+    h.update("default=%s;" % _value_fingerprint(v, attr_names, seen))
+  for cell in (fn.func_closure or ()):
+    h.update("cell=%s;" % _value_fingerprint(cell.cell_contents, attr_names, seen))
+  result = h.hexdigest()
+  seen[id(fn)] = result
+  return result
+
+def fn_fingerprint(fn):
+  """
+  Hash of a Python function's code along with everything it can see in its
+  globals, defaults and closure cells, or None if any of those values
+  can't be fingerprinted
+  """
+  while not isinstance(fn, types.FunctionType) and hasattr(fn, 'fn'):
+    fn = fn.fn
+  if not isinstance(fn, types.FunctionType):
+    return None
+  try:
+    return _fn_fingerprint(fn, {})
+  except Unfingerprintable:
+    return None
+
+def _compiler_settings():
+  settings = []
+  for module in (config, c_config):
+    for name in sorted(dir(module)):
+      value = getattr(module, name)
+      if name.startswith('_') or not _is_static_scalar(value):
+        continue
+      settings.append((module.__name__, name, value))
+  from ..openmp_backend import config as openmp_config
+  settings.append(('openmp', openmp_config.collapse_nested_loops))
+  return settings
+
+_source_stamp = None
+def parakeet_stamp():
+  """
+  The Parakeet version along with the sizes and modification times of all
+  its source files, so that stale entries don't survive edits to the compiler
+  """
+  global _source_stamp
+  if _source_stamp is None:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha224(package_info.__version__)
+    h.update(sys.version)
+    h.update(np.__version__)
+    for (dirpath, dirnames, filenames) in sorted(os.walk(root)):
+      dirnames.sort()
+      for filename in sorted(filenames):
+        if filename.endswith(".py"):
+          stat = os.stat(os.path.join(dirpath, filename))
+          h.update("%s:%d:%d;" % (filename, stat.st_size, stat.st_mtime))
+    _source_stamp = h.hexdigest()
+  return _source_stamp
+
+def index_dir():
+  if not config.persistent_cache or not c_config.cache_dir:
+    return None
+  return os.path.join(c_config.cache_dir, "index")
+
+def _index_filename(*key_parts):
+  d = index_dir()
+  if d is None:
+    return None
+  digest = hashlib.sha224(repr(key_parts)).hexdigest()
+  return os.path.join(d, digest + ".pickle")
+
+def _load(filename):
+  if filename is None or not os.path.exists(filename):
+    return None
+  try:
+    with open(filename, 'rb') as f:
+      return cPickle.load(f)
+  except Exception:
+    # corrupt or incompatible entries just count as misses
+    return None
+
+def _save(filename, value):
+  if filename is None:
+    return
+  d = os.path.dirname(filename)
+  disk_cache.ensure_dir(d)
+  # write to a temporary file first so that no other process
+  # ever sees a partially written entry
+  tmp = NamedTemporaryFile(dir = d, suffix = ".tmp", delete = False)
+  try:
+    cPickle.dump(value, tmp, cPickle.HIGHEST_PROTOCOL)
+    tmp.flush()
+    os.fsync(tmp.fileno())
+    tmp.close()
+    os.rename(tmp.name, filename)
+  except Exception:
+    tmp.close()
+    if os.path.exists(tmp.name):
+      os.remove(tmp.name)
+    raise
+
+def encode_type(t):
+  if isinstance(t, ScalarT):
+    return ('scalar', t.dtype.str)
+  elif isinstance(t, ArrayT):
+    return ('array', t.elt_type.dtype.str, t.rank)
+  elif isinstance(t, TupleT):
+    return ('tuple', tuple(encode_type(elt_t) for elt_t in t.elt_types))
+  elif isinstance(t, NoneT):
+    return ('none',)
+  else:
+    raise Unfingerprintable(t)
+
+def decode_type(encoded):
+  tag = encoded[0]
+  if tag == 'scalar':
+    return from_dtype(np.dtype(encoded[1]))
+  elif tag == 'array':
+    return make_array_type(from_dtype(np.dtype(encoded[1])), encoded[2])
+  elif tag == 'tuple':
+    return make_tuple_type([decode_type(elt) for elt in encoded[1]])
+  else:
+    assert tag == 'none', "Unknown encoded type %s" % (encoded,)
+    return NoneType
+
+def _encode_refs(fn, untyped):
+  """
+  Describe how to find each of the untyped function's nonlocal values
+  starting from the Python function object
+  """
+  encoded = []
+  cells = list(fn.func_closure or ())
+  for ref in (untyped.python_refs or ()):
+    if isinstance(ref, GlobalValueRef) and ref.name is not None and \
+       fn.func_globals.get(ref.name) is ref.value:
+      encoded.append(('global', ref.name))
+    elif isinstance(ref, ClosureCellRef) and any(ref.cell is c for c in cells):
+      idx = [i for (i,c) in enumerate(cells) if c is ref.cell][0]
+      encoded.append(('cell', idx))
+    else:
+      return None
+  return tuple(encoded)
+
+def _deref(fn, encoded_refs):
+  values = []
+  for (kind, where) in encoded_refs:
+    if kind == 'global':
+      values.append(fn.func_globals[where])
+    else:
+      values.append(fn.func_closure[where].cell_contents)
+  return values
+
+def _python_fn(fn):
+  while not isinstance(fn, types.FunctionType) and hasattr(fn, 'fn'):
+    fn = fn.fn
+  return fn
+
+def load_nonlocal_refs(fingerprint):
+  """
+  Fetch the recorded description of where a function's nonlocal values live, 
+  or return None if its nonlocals were never recorded 
+  """
+  return _load(_index_filename('refs', fingerprint, parakeet_stamp()))
+
+def deref_nonlocals(fn, encoded_refs):
+  """
+  Look up the current nonlocal values of a Python function without
+  translating it, or return None if they can't be found anymore
+  """
+  try:
+    return _deref(_python_fn(fn), encoded_refs)
+  except (KeyError, IndexError, ValueError):
+    return None
+
+def save_nonlocals(fn, fingerprint, untyped):
+  encoded_refs = _encode_refs(_python_fn(fn), untyped)
+  if encoded_refs is not None:
+    _save(_index_filename('refs', fingerprint, parakeet_stamp()), encoded_refs)
+
+def _entry_filename(fingerprint, key):
+  return _index_filename('entry', fingerprint, key,
+                         _compiler_settings(), parakeet_stamp())
+
+def load_entry(fingerprint, key):
+  """
+  Look for a shared object compiled for this function and dispatch key
+  by an earlier process and, if it's still on disk, load its entry point
+  """
+  filename = _entry_filename(fingerprint, key)
+  record = _load(filename)
+  if record is None:
+    return None
+  shared_filename, fn_name, arg_order, keywords, encoded_types = record
+  # the module might have been pruned from the cache since
+  if not disk_cache.touch(shared_filename):
+    return None
+  try:
+    module = imp.load_dynamic(fn_name, shared_filename)
+  except ImportError:
+    return None
+  c_fn = getattr(module, fn_name)
+  input_types = tuple(decode_type(t) for t in encoded_types)
+  return DispatchEntry(arg_order, keywords, input_types, c_fn)
+
+def save_entry(fingerprint, key, entry, compiled_fn):
+  shared_filename = compiled_fn.shared_filename
+  if not shared_filename or not os.path.exists(shared_filename):
+    return
+  try:
+    encoded_types = tuple(encode_type(t) for t in entry.input_types)
+  except Unfingerprintable:
+    return
+  record = (os.path.abspath(shared_filename), compiled_fn.fn_name,
+            entry.arg_order, entry.keywords, encoded_types)
+  _save(_entry_filename(fingerprint, key), record)
@@ -0,0 +1,121 @@
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from .. import c_backend, openmp_backend
+from ..c_backend import PyModuleCompiler
+from ..c_backend.compile_util import compile_module_from_source
+from ..c_backend.prepare_args import prepare_args
+from ..ndtypes import Type, ScalarT, ArrayT, TupleT, NoneT
+from ..openmp_backend import MulticoreCompiler
+
+from decorators import jit
+from dispatch import compile_lock, dispatch_key, resolve_backend
+from run_function import specialize
+
+_backends = {
+  'c' : (c_backend, PyModuleCompiler),
+  'openmp' : (openmp_backend, MulticoreCompiler),
+}
+
+def example_value(t):
+  """
+  Construct a Python value of the given Parakeet type which looks like the
+  common case to value specialization: arrays are C-contiguous and
+  no dimension or scalar is 0 or 1
+  """
+  if isinstance(t, ScalarT):
+    return t.dtype.type(2)
+  elif isinstance(t, ArrayT):
+    return np.empty((2,) * t.rank, dtype = t.elt_type.dtype)
+  elif isinstance(t, TupleT):
+    return tuple(example_value(elt_t) for elt_t in t.elt_types)
+  elif isinstance(t, NoneT):
+    return None
+  else:
+    assert False, "Can't construct example value of type %s" % t
+
+def _example_args(arg_types):
+  return [example_value(x) if isinstance(x, Type) else x for x in arg_types]
+
+def _compile_and_register(compile_fn, register, *args, **kwargs):
+  """
+  Runs on a worker thread: any failure, including in the bookkeeping 
+  afterward, ends up in the AsyncResult instead of killing the pool's 
+  result handler thread (which would leave every other get() hanging)
+  """
+  compiled_fn = compile_fn(*args, **kwargs)
+  with compile_lock:
+    register(compiled_fn)
+  return compiled_fn
+
+def _already_compiled(compiled_fn):
+  return compiled_fn
+
+def precompile(specs, workers = None, backend = None):
+  """
+  Compile many specializations at once. Each element of specs is a pair
+  (fn, args) where args may contain Parakeet types or example values.
+  The Python side of the pipeline runs right away on the calling thread,
+  the C compiler invocations run on a pool of worker threads.
+
+  Returns a list of multiprocessing AsyncResult objects (one per spec) whose
+  get() method returns the CompiledPyFn or raises whatever went wrong. 
+  As each compilation finishes, the backend's cache and (for jit functions) 
+  the dispatch table get filled in.
+  """
+  backend = resolve_backend(backend)
+  assert backend in _backends, \
+    "Can only precompile for the C or OpenMP backends, not %s" % backend
+  backend_module, Compiler = _backends[backend]
+  if workers is None:
+    workers = multiprocessing.cpu_count()
+
+  pool = ThreadPool(workers)
+  results = []
+  # don't submit the same compilation twice if the specs overlap
+  pending = {}
+  for (fn, arg_types) in specs:
+    args = _example_args(arg_types)
+    with compile_lock:
+      if isinstance(fn, jit):
+        untyped = fn.translate()
+      else:
+        untyped = fn
+      typed_fn, linear_args = specialize(untyped, args)
+      linear_args = prepare_args(linear_args, typed_fn.input_types)
+      entry_fn = backend_module.specialize_entry(typed_fn, linear_args)
+    cache_key = backend_module.run_function.entry_key(entry_fn)
+
+    def finished(compiled_fn,
+                 fn = fn, args = args, cache_key = cache_key,
+                 entry_cache_key = Compiler().entry_cache_key(entry_fn),
+                 input_types = typed_fn.input_types):
+      backend_module.run_function._cache[cache_key] = compiled_fn
+      Compiler._entry_compile_cache[entry_cache_key] = compiled_fn
+      if isinstance(fn, jit):
+        nonlocals = fn.nonlocals()
+        key = dispatch_key(backend, nonlocals, args, {})
+        if key is not None:
+          fn.add_entry(key, len(nonlocals), len(args), input_types, compiled_fn)
+
+    if cache_key in backend_module.run_function._cache:
+      result = pool.apply_async(_compile_and_register, 
+                                (_already_compiled, finished, 
+                                 backend_module.run_function._cache[cache_key]))
+    elif cache_key in pending:
+      result = pending[cache_key]
+      if isinstance(fn, jit):
+        # still need a dispatch entry for this jit function
+        result = pool.apply_async(_compile_and_register, (result.get, finished))
+    else:
+      with compile_lock:
+        compile_kwargs = Compiler().entry_source(entry_fn)
+      result = pool.apply_async(_compile_and_register, 
+                                (compile_module_from_source, finished), 
+                                compile_kwargs)
+      pending[cache_key] = result
+    results.append(result)
+  pool.close()
+  return results
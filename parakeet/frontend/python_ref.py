@@ -8,8 +8,10 @@ class Ref(object):
     pass
 
 class GlobalValueRef(Ref):
-  def __init__(self, value):
+  def __init__(self, value, name = None):
     self.value = value 
+    # name of the global variable the value was read from, if any 
+    self.name = name 
     
   def deref(self):
     return self.value 
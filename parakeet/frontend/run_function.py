@@ -6,8 +6,10 @@ from ..transforms import pipeline
 
 from .. import c_backend
 from .. import openmp_backend 
+from ..c_backend.prepare_args import prepare_args as prepare_arg_values
 
 import ast_conversion
+from dispatch import compile_lock
 
 # get types of all inputs
 def _typeof(arg):
@@ -53,12 +55,12 @@ def specialize(untyped, args, kwargs = {}, optimize = False):
   
   # propagate types through function representation and all
   # other functions it calls
-   
-  typed_fn = type_inference.specialize(untyped, arg_types)
-  if optimize: 
-    from .. transforms.pipeline import normalize 
-    # apply high level optimizations 
-    typed_fn = normalize.apply(typed_fn)
+  with compile_lock: 
+    typed_fn = type_inference.specialize(untyped, arg_types)
+    if optimize: 
+      from .. transforms.pipeline import normalize 
+      # apply high level optimizations 
+      typed_fn = normalize.apply(typed_fn)
   return typed_fn, linear_args 
 
    
@@ -73,11 +75,14 @@ def run_typed_fn(fn, args, backend = None):
   if backend is None:
     backend = config.backend
   
-  if backend == 'c':
-    return c_backend.run(fn, args)
-   
-  elif backend == 'openmp':
-    return openmp_backend.run(fn, args)
+  if backend in native_backends:
+    # only compiling needs the lock, other threads 
+    # can keep going while the native code runs 
+    args = prepare_arg_values(args, expected_types)
+    compiled_fn = compile_entry(fn, args, backend)
+    if backend == 'openmp':
+      openmp_backend.set_options()
+    return compiled_fn.c_fn(*args)
   
   elif backend == 'cuda':
     # only selectively import cuda_backend since it required PyCUDA
@@ -88,8 +93,9 @@ def run_typed_fn(fn, args, backend = None):
     from ..llvm_backend.llvm_context import global_context
     from ..llvm_backend import generic_value_to_python 
     from ..llvm_backend import ctypes_to_generic_value, compile_fn 
-    lowered_fn = pipeline.lowering.apply(fn)
-    llvm_fn = compile_fn(lowered_fn).llvm_fn
+    with compile_lock:
+      lowered_fn = pipeline.lowering.apply(fn)
+      llvm_fn = compile_fn(lowered_fn).llvm_fn
 
     ctypes_inputs = [t.from_python(v) 
                    for (v,t) 
@@ -103,12 +109,33 @@ def run_typed_fn(fn, args, backend = None):
 
   elif backend == "interp":
     from .. import interp 
-    fn = pipeline.loopify(fn)
+    with compile_lock:
+      fn = pipeline.loopify(fn)
     return interp.eval_fn(fn, args)
   
   else:
     assert False, "Unknown backend %s" % backend 
 
+# backends which compile a typed function into a callable entry point
+native_backends = ('c', 'openmp')
+
+def compile_entry(fn, args, backend = None):
+  """
+  Compile the typed function with one of the native backends and return the
+  CompiledPyFn of its entry point, which expects argument values already 
+  converted by prepare_args 
+  """
+  if backend is None:
+    backend = config.backend
+  
+  with compile_lock:
+    if backend == 'c':
+      return c_backend.compile_entry(fn, args)
+    elif backend == 'openmp':
+      return openmp_backend.compile_entry(fn, args)
+    else:
+      assert False, "Backend %s doesn't produce a native entry point" % backend 
+
 def run_untyped_fn(fn, args, kwargs = None, backend = None):
   assert isinstance(fn, UntypedFn)
   if kwargs is None:
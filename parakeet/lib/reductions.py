@@ -8,7 +8,7 @@ from .. frontend import translate_function_value
 from .. syntax import Reduce, Const 
 from ..syntax.helpers import none, false, true, one_i32, zero_i32, zero_i24
  
-from adverbs import reduce
+from adverbs import reduce, ireduce
 from builtins import builtin_and, builtin_or
 from parakeet.syntax.delay_until_typed import DelayUntilTyped
 
@@ -69,11 +69,11 @@ def mean(x, axis = None):
 
 @jit 
 def cumsum(x, axis = None):
-  return scan(prims.add, x, axis = axis)
+  return scan(prims.add, x, init = 0, axis = axis)
 
 @jit 
 def cumprod(x, axis = None):
-  return scan(prims.multiply, x, axis = axis)
+  return scan(prims.multiply, x, init = 1, axis = axis)
 
 @jit 
 def vdot(x,y):
@@ -88,27 +88,19 @@ def argmax(x):
   Currently assumes axis=None
   TODO: 
     - Support axis arguments
-    - use IndexReduce instead of explicit loop
+  """
+  def argmax_map(i):
+    return i, x[i]
   
-      def argmax_map(curr_idx):
-        return curr_idx, x[curr_idx]
+  # prefer the accumulated (earlier) index on ties, like NumPy, 
+  # which also keeps the combiner associative
+  def argmax_combine((i1, v1), (i2, v2)):
+    if v2 > v1:
+      return (i2, v2)
+    else:
+      return (i1, v1)
   
-      def argmax_combine((i1,v1), (i2,v2)):
-        if v1 > v2:
-          return (i1,v1)
-        else:
-          return (i2,v2)
-    
-      return ireduce(combine=argmin_combine, shape=x.shape, map_fn=argmin_map, init = (0,x[0]))
-  """
-  bestval = x[0]
-  bestidx = 0
-  for i in xrange(1, len(x)):
-    currval = x[i]
-    if currval > bestval:
-      bestval = currval
-      bestidx = i
-  return bestidx 
+  return ireduce(argmax_map, argmax_combine, shape = len(x), init = (0, x[0]))[0]
 
 @jit
 def argmin(x):
@@ -116,26 +108,16 @@ def argmin(x):
   Currently assumes axis=None
   TODO: 
     - Support axis arguments
-    - use IndexReduce instead of explicit loop
+  """
+  def argmin_map(i):
+    return i, x[i]
   
-      def argmin_map(curr_idx):
-        return curr_idx, x[curr_idx]
+  def argmin_combine((i1, v1), (i2, v2)):
+    if v2 < v1:
+      return (i2, v2)
+    else:
+      return (i1, v1)
   
-      def argmin_combine((i1,v1), (i2,v2)):
-        if v1 < v2:
-          return (i1,v1)
-        else:
-          return (i2,v2)
-    
-      return ireduce(combine=argmin_combine, shape=x.shape, map_fn=argmin_map, init = (0,x[0]))
-  """
-  bestval = x[0]
-  bestidx = 0
-  for i in xrange(1, len(x)):
-    currval = x[i]
-    if currval < bestval:
-      bestval = currval
-      bestidx = i
-  return bestidx 
+  return ireduce(argmin_map, argmin_combine, shape = len(x), init = (0, x[0]))[0] 
 
 
@@ -71,6 +71,10 @@ function_mappings = {
   np.prod : lib.prod, 
   np.mean : lib.mean, 
   
+  # SCANS 
+  np.cumsum : lib.cumsum, 
+  np.cumprod : lib.cumprod, 
+  
   
   np.abs : prims.abs, 
 
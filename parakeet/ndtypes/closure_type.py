@@ -1,4 +1,5 @@
 import ctypes
+from .. caches import LRUCache
 from core_types import Type, IncompatibleTypes, StructT, ImmutableT
 from scalar_types import  Int64
 import type_conv 
@@ -24,7 +25,8 @@ class ClosureT(StructT, ImmutableT):
     self.arg_types = arg_types 
     self._hash = hash( (fn,) + arg_types)
   
-    self.specializations = {}
+    # typed versions of the function keyed by the types of its arguments 
+    self.specializations = LRUCache("closure specializations")
 
   def children(self):
     return self.arg_types
@@ -65,7 +67,9 @@ class ClosureT(StructT, ImmutableT):
     else:
       raise IncompatibleTypes(self, other)
 
-_closure_type_cache = {}
+# dropping a closure type also drops the typed specializations of its
+# function, an equal one gets created the next time it's needed
+_closure_type_cache = LRUCache("closure types")
 def make_closure_type(fn, closure_arg_types = []):
   closure_arg_types = tuple(closure_arg_types)
   key = (fn, closure_arg_types)
@@ -1,2 +1,3 @@
 from multicore_compiler import MulticoreCompiler
-from run_function import run 
\ No newline at end of file
+from run_function import run, compile_entry, specialize_entry
+from runtime import set_options
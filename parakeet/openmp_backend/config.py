@@ -1,2 +1,14 @@
 collapse_nested_loops = True
+
+# Defaults for how parallel loops get run, these are set through the OpenMP 
+# runtime before each call so changing them doesn't require recompiling. 
+# Any of them can also be overridden per jit function or per call. 
+
+# one of 'static', 'dynamic', 'guided' or 'auto' 
 schedule = 'static'
+
+# iterations handed to a thread at a time, None lets OpenMP decide 
+chunk_size = None 
+
+# None uses all the threads OpenMP would by default (OMP_NUM_THREADS or every core) 
+num_threads = None 
@@ -1,5 +1,3 @@
-import multiprocessing 
-
 from .. import prims 
 from ..syntax import Expr, Tuple, Assign, Return, Var, PrimCall 
 from ..syntax.helpers import get_fn, return_type
@@ -10,6 +8,8 @@ import config
 
 class MulticoreCompiler(PyModuleCompiler):
   
+  config_modules = PyModuleCompiler.config_modules + (config,)
+  
   def __init__(self, depth = 0, *args, **kwargs):
     self.depth = depth
     self.seen_parfor = None 
@@ -26,8 +26,10 @@ class MulticoreCompiler(PyModuleCompiler):
             for i in xrange(count)]
        
   def visit_NumCores(self, expr):
-    # by default we're running sequentially 
-    return "%d" % multiprocessing.cpu_count()
+    # ask the OpenMP runtime rather than baking in the core count, 
+    # so the thread count can be changed without recompiling 
+    self.add_decl("int omp_get_max_threads(void)")
+    return "omp_get_max_threads()"
   
   def tuple_to_var_list(self, expr):
     assert isinstance(expr, Expr)
@@ -105,14 +107,16 @@ class MulticoreCompiler(PyModuleCompiler):
     self.depth -= 1
 
   def omp_pragma(self, n_loops, private_vars, reduce_op = None, reduce_vars = None):
+    # the schedule kind and chunk size get set through the OpenMP runtime 
+    # before each call (see runtime.set_options) 
     if config.collapse_nested_loops:
-      omp = "#pragma omp parallel for private(%s) schedule(%s)" % \
-        (", ".join(private_vars), config.schedule)
+      omp = "#pragma omp parallel for private(%s) schedule(runtime)" % \
+        ", ".join(private_vars)
       if n_loops > 1:
         omp += " collapse(%d)" % n_loops
     else:
-      omp = "#pragma omp parallel for private(%s) schedule(%s)" % \
-          (private_vars[0], config.schedule)
+      omp = "#pragma omp parallel for private(%s) schedule(runtime)" % \
+          private_vars[0]
     
     if reduce_op:
       omp += " reduction (%s:%s)" % (reduce_op, ", ".join(reduce_vars))
@@ -129,8 +133,8 @@ class MulticoreCompiler(PyModuleCompiler):
     self.exit_parfor()
     
     if self.depth == 0:  
-      release_gil = "\nPy_BEGIN_ALLOW_THREADS\n"
-      acquire_gil = "\nPy_END_ALLOW_THREADS\n" 
+      release_gil = self.release_gil()
+      acquire_gil = self.acquire_gil()
       omp = self.omp_pragma(len(loop_vars), private_vars)
       return release_gil + omp + loops + acquire_gil    
     else:
@@ -198,19 +202,26 @@ class MulticoreCompiler(PyModuleCompiler):
        
     
       
-  def visit_IndexReduce(self, expr):
+  def can_combine_partials(self, expr, acc_t):
     """
-    For now, just use a sequential implementation for reductions
+    Partial results of an arbitrary reduction or scan can only be computed 
+    separately and then merged if the combiner accepts its own output on 
+    both sides, which requires the accumulator and elements to have the same type 
     """
+    elt_t = return_type(expr.fn)
+    combine_input_types = get_fn(expr.combine).input_types 
+    return elt_t == acc_t and \
+      len(combine_input_types) >= 2 and \
+      all(t == acc_t for t in combine_input_types[-2:]) and \
+      return_type(expr.combine) == acc_t
+  
+  def visit_IndexReduce(self, expr):
     bounds = self.tuple_to_var_list(expr.shape)
     n_vars = len(bounds)
     acc = self.fresh_var(expr.type, "acc", self.visit_expr(expr.init))
     # try to get a simple primitive to use as the OpenMP combiner
-    # if this isn't possible then run the loops sequentially
-    #
-    # TODO: instead of falling back on sequential execution 
-    # use complex combiners by generating one 
-    # accumulator value per thread and then combining those
+    # if this isn't possible then accumulate one partial result per thread 
+    # and combine those afterward  
     combine_prim = self.get_binop_prim(expr.combine)
     if combine_prim is prims.add:
       omp_reduce_op = "+"
@@ -222,9 +233,13 @@ class MulticoreCompiler(PyModuleCompiler):
       omp_reduce_op = "||"
     else:
       omp_reduce_op = None 
- 
-    loop_vars = self.loop_vars(n_vars)
+    
     assert expr.init is not None, "Accumulator required but not given"
+    if not omp_reduce_op and self.depth == 0 and self.can_combine_partials(expr, expr.type):
+      self.parallel_reduce(expr, bounds, acc)
+      return acc 
+    
+    loop_vars = self.loop_vars(n_vars)
     elt = self.fresh_var(return_type(expr.fn), "elt")
     if omp_reduce_op: self.enter_parfor()
     body, private_vars = self.build_loop_body(expr.fn, loop_vars, target_name = elt)
@@ -239,22 +254,110 @@ class MulticoreCompiler(PyModuleCompiler):
       self.exit_parfor()
 
     if omp_reduce_op and self.depth == 0:
-      release_gil = "\nPy_BEGIN_ALLOW_THREADS\n"
-      acquire_gil = "\nPy_END_ALLOW_THREADS\n" 
+      release_gil = self.release_gil()
+      acquire_gil = self.acquire_gil()
       omp = self.omp_pragma(len(loop_vars), private_vars, 
                             reduce_op = omp_reduce_op, 
                             reduce_vars = [acc])
       loops = release_gil + omp + loops + acquire_gil    
     self.append(loops)
     return acc 
-    
-  def visit_IndexScan(self, expr):
+  
+  def parallel_reduce(self, expr, bounds, acc):
     """
-    For now, just use a sequential implementation for scans
+    Split the outermost loop into one contiguous chunk per core, reduce each 
+    chunk into its own partial result (starting from the chunk's first element
+    so we don't need an identity value) and then merge neighboring partials 
+    pairwise in a tree. Since the partials stay in their original order, 
+    the combiner only has to be associative, not commutative. 
     """
+    n_chunks = self.fresh_var("int64_t", "n_chunks", self.visit_NumCores(None))
+    acc_t = self.to_ctype(expr.type)
+    partials = self.fresh_name("partials")
+    self.append("%s %s[%s];" % (acc_t, partials, n_chunks))
+    has_partial = self.fresh_name("has_partial")
+    self.append("int %s[%s];" % (has_partial, n_chunks))
+    
+    chunk = self.fresh_var("int64_t", "chunk")
+    start = self.fresh_var("int64_t", "start")
+    stop = self.fresh_var("int64_t", "stop")
+    started = self.fresh_var("int", "started")
+    partial = self.fresh_var(expr.type, "partial")
+    elt = self.fresh_var(expr.type, "elt")
+    loop_vars = self.loop_vars(len(bounds))
+    
+    self.enter_parfor()
+    body, private_vars = self.build_loop_body(expr.fn, loop_vars, target_name = elt)
+    combine_name, combine_closure_args, _ = self.get_fn_info(expr.combine)
+    self.exit_parfor()
+    
+    def combine(x, y):
+      return "%s(%s)" % (combine_name, ", ".join(tuple(combine_closure_args) + (x, y)))
+    
+    body += """
+      if (%(started)s) { %(partial)s = %(combined)s; }
+      else { %(partial)s = %(elt)s; %(started)s = 1; }
+    """ % dict(started = started, partial = partial, elt = elt, 
+               combined = combine(partial, elt))
+    inner_loops = self.build_loops(loop_vars[1:], bounds[1:], body)
+    outer_var = loop_vars[0]
+    outer_bound = bounds[0]
+    private_vars = private_vars + [start, stop, started, partial, elt]
+    
+    step = self.fresh_var("int64_t", "step")
+    left = self.fresh_var("int64_t", "left")
+    
+    release_gil = self.release_gil()
+    acquire_gil = self.acquire_gil()
+    self.append("""
+      %(release_gil)s
+      #pragma omp parallel for private(%(private)s) schedule(static)
+      for (%(chunk)s = 0; %(chunk)s < %(n_chunks)s; ++%(chunk)s) {
+        %(start)s = (%(outer_bound)s * %(chunk)s) / %(n_chunks)s;
+        %(stop)s = (%(outer_bound)s * (%(chunk)s + 1)) / %(n_chunks)s;
+        %(started)s = 0;
+        for (%(outer_var)s = %(start)s; %(outer_var)s < %(stop)s; ++%(outer_var)s) {
+          %(inner_loops)s
+        }
+        %(has_partial)s[%(chunk)s] = %(started)s;
+        if (%(started)s) { %(partials)s[%(chunk)s] = %(partial)s; }
+      }
+      %(acquire_gil)s
+      
+      for (%(step)s = 1; %(step)s < %(n_chunks)s; %(step)s *= 2) {
+        for (%(left)s = 0; %(left)s + %(step)s < %(n_chunks)s; %(left)s += 2 * %(step)s) {
+          if (!%(has_partial)s[%(left)s + %(step)s]) { continue; }
+          if (%(has_partial)s[%(left)s]) { 
+            %(partials)s[%(left)s] = %(tree_combined)s; 
+          } else {
+            %(partials)s[%(left)s] = %(partials)s[%(left)s + %(step)s];
+            %(has_partial)s[%(left)s] = 1;
+          }
+        }
+      }
+      if (%(has_partial)s[0]) { %(acc)s = %(final_combined)s; }
+    """ % dict(private = ", ".join(private_vars), 
+               release_gil = release_gil, acquire_gil = acquire_gil, 
+               chunk = chunk, n_chunks = n_chunks, 
+               start = start, stop = stop, started = started, 
+               outer_var = outer_var, outer_bound = outer_bound, 
+               inner_loops = inner_loops, 
+               has_partial = has_partial, partials = partials, partial = partial, 
+               step = step, left = left, acc = acc, 
+               tree_combined = combine("%s[%s]" % (partials, left), 
+                                       "%s[%s + %s]" % (partials, left, step)), 
+               final_combined = combine(acc, "%s[0]" % partials)))
+    
+  def visit_IndexScan(self, expr):
     assert isinstance(expr.type, ArrayT), "Expected output of Scan to be an array"
+    assert expr.init is not None, "Accumulator required but not given"
     
     bounds = self.tuple_to_var_list(expr.shape)
+    if self.depth == 0 and len(bounds) == 1 and \
+       self.can_combine_partials(expr, expr.init.type):
+      return self.parallel_scan(expr, bounds[0])
+    
+    # otherwise fall back on a sequential scan 
     n_vars = len(bounds)
     
     combine_name, combine_closure_args, _ = self.get_fn_info(expr.combine)
@@ -263,8 +366,6 @@ class MulticoreCompiler(PyModuleCompiler):
     
     result = self.alloc_array(expr.type, expr.shape)
     
-    assert expr.init is not None, "Accumulator required but not given"
-    
     elt_t = return_type(expr.fn) 
     assert isinstance(elt_t, ScalarT), "Scans of non-scalar values (%s) not yet implemented" % elt_t
     elt = self.fresh_var(elt_t, "elt")
@@ -283,6 +384,105 @@ class MulticoreCompiler(PyModuleCompiler):
                         return_stmt = True)
     self.append(self.build_loops(loop_vars, bounds, body))
     return result
+  
+  def parallel_scan(self, expr, bound):
+    """
+    Blocked scan in three phases: every core reduces its own contiguous chunk, 
+    the chunk totals get scanned sequentially (starting from the initial 
+    accumulator) to find the value each chunk starts from, and finally 
+    every core scans its chunk again from that value, emitting each element. 
+    Reducing rather than scanning in the first pass means we don't need 
+    a temporary array of accumulators. With only one chunk the first 
+    pass is skipped. 
+    """
+    result = self.alloc_array(expr.type, expr.shape)
+    acc_t = expr.init.type 
+    acc = self.fresh_var(acc_t, "acc", self.visit_expr(expr.init))
+    
+    n_chunks = self.fresh_var("int64_t", "n_chunks", self.visit_NumCores(None))
+    acc_ctype = self.to_ctype(acc_t)
+    totals = self.fresh_name("chunk_totals")
+    self.append("%s %s[%s];" % (acc_ctype, totals, n_chunks))
+    has_total = self.fresh_name("has_total")
+    self.append("int %s[%s];" % (has_total, n_chunks))
+    
+    chunk = self.fresh_var("int64_t", "chunk")
+    start = self.fresh_var("int64_t", "start")
+    stop = self.fresh_var("int64_t", "stop")
+    started = self.fresh_var("int", "started")
+    partial = self.fresh_var(acc_t, "partial")
+    elt = self.fresh_var(acc_t, "elt")
+    i = self.loop_vars(1)[0]
+    
+    self.enter_parfor()
+    elt_stmts, private_vars = self.build_loop_body(expr.fn, [i], target_name = elt)
+    combine_name, combine_closure_args, _ = self.get_fn_info(expr.combine)
+    emit_name, emit_closure_args, _ = self.get_fn_info(expr.emit)
+    self.exit_parfor()
+    
+    def combine(x, y):
+      return "%s(%s)" % (combine_name, ", ".join(tuple(combine_closure_args) + (x, y)))
+    emitted = "%s(%s)" % (emit_name, ", ".join(tuple(emit_closure_args) + (partial,)))
+    store = self.setidx(result, [i], emitted, full_array = True, return_stmt = True)
+    private_vars = private_vars + [start, stop, started, partial, elt]
+    
+    release_totals_gil = self.release_gil()
+    acquire_totals_gil = self.acquire_gil()
+    release_scan_gil = self.release_gil()
+    acquire_scan_gil = self.acquire_gil()
+    self.append("""
+      // with a single chunk there's nothing to precompute
+      if (%(n_chunks)s > 1) {
+      %(release_totals_gil)s
+      #pragma omp parallel for private(%(private)s) schedule(static)
+      for (%(chunk)s = 0; %(chunk)s < %(n_chunks)s; ++%(chunk)s) {
+        %(start)s = (%(bound)s * %(chunk)s) / %(n_chunks)s;
+        %(stop)s = (%(bound)s * (%(chunk)s + 1)) / %(n_chunks)s;
+        %(started)s = 0;
+        for (%(i)s = %(start)s; %(i)s < %(stop)s; ++%(i)s) {
+          %(elt_stmts)s
+          if (%(started)s) { %(partial)s = %(combine_elt)s; }
+          else { %(partial)s = %(elt)s; %(started)s = 1; }
+        }
+        %(has_total)s[%(chunk)s] = %(started)s;
+        if (%(started)s) { %(totals)s[%(chunk)s] = %(partial)s; }
+      }
+      %(acquire_totals_gil)s
+      }
+      
+      // replace each chunk's total with the accumulator it has to start from
+      for (%(chunk)s = 0; %(chunk)s < %(n_chunks)s; ++%(chunk)s) {
+        %(partial)s = %(acc)s;
+        if (%(n_chunks)s > 1 && %(has_total)s[%(chunk)s]) { %(acc)s = %(combine_total)s; }
+        %(totals)s[%(chunk)s] = %(partial)s;
+      }
+      
+      %(release_scan_gil)s
+      #pragma omp parallel for private(%(private)s) schedule(static)
+      for (%(chunk)s = 0; %(chunk)s < %(n_chunks)s; ++%(chunk)s) {
+        %(start)s = (%(bound)s * %(chunk)s) / %(n_chunks)s;
+        %(stop)s = (%(bound)s * (%(chunk)s + 1)) / %(n_chunks)s;
+        %(partial)s = %(totals)s[%(chunk)s];
+        for (%(i)s = %(start)s; %(i)s < %(stop)s; ++%(i)s) {
+          %(elt_stmts)s
+          %(partial)s = %(combine_elt)s;
+          %(store)s
+        }
+      }
+      %(acquire_scan_gil)s
+    """ % dict(private = ", ".join(private_vars), 
+               release_totals_gil = release_totals_gil, 
+               acquire_totals_gil = acquire_totals_gil, 
+               release_scan_gil = release_scan_gil, 
+               acquire_scan_gil = acquire_scan_gil, 
+               chunk = chunk, n_chunks = n_chunks, bound = bound, 
+               start = start, stop = stop, started = started, i = i, 
+               elt_stmts = elt_stmts, elt = elt, partial = partial, 
+               has_total = has_total, totals = totals, acc = acc, 
+               combine_elt = combine(partial, elt), 
+               combine_total = combine(acc, "%s[%s]" % (totals, chunk)), 
+               store = store))
+    return result 
     
   def visit_Map(self, expr):
     assert False, "Map should have been lowered into ParFor by now: %s" % expr 
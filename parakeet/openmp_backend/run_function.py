@@ -1,4 +1,6 @@
 from .. import config 
+from ..analysis import settings_key
+from ..caches import LRUCache
 
 from ..c_backend.prepare_args import prepare_args  
 from ..transforms.pipeline import lower_to_adverbs  
@@ -6,19 +8,44 @@ from ..value_specialization import specialize
 
 
 from multicore_compiler import MulticoreCompiler 
+from runtime import set_options
 
-_cache = {}
-def run(fn, args):
-  args = prepare_args(args, fn.input_types)
+_cache = LRUCache("openmp entry points")
+def entry_key(fn):
+  """
+  Key of the compiled entry point for an already specialized function in
+  _cache, which includes the settings since structurally identical 
+  functions get optimized into the same one
+  """
+  return fn.cache_key, settings_key(MulticoreCompiler.config_modules)
+
+def specialize_entry(fn, args, value_specialize = True):
+  """
+  Lower the typed function (keeping its parallel adverbs) and specialize it 
+  for the already prepared argument values, the result's cache_key is what
+  the compiled entry point gets stored under in _cache
+  """
   fn = lower_to_adverbs.apply(fn)
-  if config.value_specialization:
+  if config.value_specialization and value_specialize:
     fn = specialize(fn, python_values = args)
-  key = fn.cache_key 
+  return fn 
+
+def compile_entry(fn, args):
+  """
+  Return the compiled OpenMP entry point (a CompiledPyFn) for the given 
+  typed function, specialized for the already prepared argument values 
+  """
+  fn = specialize_entry(fn, args)
+  key = entry_key(fn)
   if key in _cache:
-    return _cache[key](*args)
+    return _cache[key]
   else:
     compiled_fn = MulticoreCompiler().compile_entry(fn)
-    c_fn = compiled_fn.c_fn 
-    _cache[key] = c_fn 
-    return c_fn(*args)
-  
\ No newline at end of file
+    _cache[key] = compiled_fn 
+    return compiled_fn
+
+def run(fn, args):
+  args = prepare_args(args, fn.input_types)
+  compiled_fn = compile_entry(fn, args)
+  set_options()
+  return compiled_fn.c_fn(*args)
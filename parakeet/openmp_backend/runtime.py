@@ -0,0 +1,77 @@
+import threading
+
+from ..c_backend.compile_util import compile_module_from_source
+
+import config
+
+# values of OpenMP's omp_sched_t
+schedule_kinds = {'static' : 1, 'dynamic' : 2, 'guided' : 3, 'auto' : 4}
+_schedule_names = dict((kind, name) for (name, kind) in schedule_kinds.items())
+
+_setter_name = "parakeet_omp_set_options"
+_setter_signature = "PyObject* %s(PyObject* dummy, PyObject* args)" % _setter_name
+_setter_src = """
+static int parakeet_default_num_threads = 0;
+
+%(signature)s {
+  long num_threads, kind, chunk_size;
+  omp_sched_t old_kind;
+  int old_chunk_size, old_num_threads;
+  if (!PyArg_ParseTuple(args, "lll", &num_threads, &kind, &chunk_size)) {
+    return NULL;
+  }
+  old_num_threads = omp_get_max_threads();
+  omp_get_schedule(&old_kind, &old_chunk_size);
+  // remember what OpenMP would have used so we can go back to it
+  if (parakeet_default_num_threads == 0) {
+    parakeet_default_num_threads = old_num_threads;
+  }
+  omp_set_num_threads(num_threads > 0 ? (int) num_threads : parakeet_default_num_threads);
+  // a chunk size below 1 gives the default for that kind of schedule
+  omp_set_schedule((omp_sched_t) kind, (int) chunk_size);
+  return Py_BuildValue("(iii)", old_num_threads, (int) old_kind, old_chunk_size);
+}
+""" % {'signature' : _setter_signature}
+
+_setter = None
+_setter_lock = threading.Lock()
+
+def _get_setter():
+  """
+  The setter lives in its own small extension module, linked against the
+  same OpenMP runtime as the generated code, so it only has to be compiled
+  once (and after that comes out of the module cache)
+  """
+  global _setter
+  if _setter is None:
+    with _setter_lock:
+      if _setter is None:
+        compiled = compile_module_from_source(_setter_src, _setter_name,
+                                              fn_signature = _setter_signature,
+                                              extra_headers = ["omp.h"],
+                                              extra_compile_flags = ["-fopenmp"],
+                                              extra_link_flags = ["-fopenmp"])
+        _setter = compiled.c_fn
+  return _setter
+
+def set_options(num_threads = None, schedule = None, chunk_size = None):
+  """
+  Set the thread count, schedule kind and chunk size used by parallel loops
+  of compiled OpenMP code which subsequently runs on the calling thread.
+  Anything left as None falls back to the defaults in openmp_backend.config.
+  Returns the (num_threads, schedule, chunk_size) that were in effect before. 
+  """
+  if num_threads is None: num_threads = config.num_threads
+  if schedule is None: schedule = config.schedule
+  if chunk_size is None: chunk_size = config.chunk_size
+  assert schedule in schedule_kinds, \
+    "Unknown OpenMP schedule '%s', expected one of %s" % (schedule, sorted(schedule_kinds))
+  assert num_threads is None or num_threads > 0, \
+    "Number of threads must be positive, got %s" % (num_threads,)
+  assert chunk_size is None or chunk_size > 0, \
+    "Chunk size must be positive, got %s" % (chunk_size,)
+  old_num_threads, old_kind, old_chunk_size = \
+    _get_setter()(num_threads or 0, schedule_kinds[schedule], chunk_size or 0)
+  # OpenMP implementations may add their own flags to the schedule kind
+  old_schedule = _schedule_names.get(old_kind & 0xff, old_kind)
+  return old_num_threads, old_schedule, old_chunk_size
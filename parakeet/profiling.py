@@ -0,0 +1,249 @@
+"""
+Timing tree of the work done while compiling, collected with
+
+  with parakeet.profile_compile() as profile:
+    f(x)
+  print profile
+  profile.save_chrome_trace("compile.json")
+
+Each event has a category (see below), a name, its start and end time and
+the events nested inside of it. Work served from a cache or skipped
+altogether shows up as an event without any duration and with 'cached' or
+'skipped' among its args, cache hits on a function which only has the
+same structure as the one compiled before it also have 'structural'.
+
+  jit                   : compiling one specialization of a jit function
+  frontend              : translating Python source into untyped IR
+  type_inference        : specializing untyped IR for argument types
+  phase                 : one Phase of the optimization pipeline
+  transform             : a single Transform within a phase
+  value_specialization  : specializing for unit strides and 0/1 values
+  codegen               : generating C source
+  compile, link         : running the C compiler and linker
+  load                  : loading the compiled shared object
+"""
+
+import json
+import os
+import threading
+import time
+
+class Event(object):
+  def __init__(self, category, name, args, thread_id, parent = None):
+    self.category = category
+    # phases and transforms only get converted to strings when asked for,
+    # to keep the cost of profiling out of the timings
+    self._name = name
+    self.args = args
+    self.thread_id = thread_id
+    self.parent = parent
+    self.children = []
+    self.start = time.time()
+    self.end = None
+
+  @property
+  def name(self):
+    return str(self._name)
+
+  @property
+  def duration(self):
+    if self.end is None:
+      return 0.0
+    return self.end - self.start
+
+  @property
+  def self_time(self):
+    """
+    Time not accounted for by any nested event
+    """
+    return self.duration - sum(child.duration for child in self.children)
+
+  def walk(self):
+    yield self
+    for child in self.children:
+      for event in child.walk():
+        yield event
+
+  def __str__(self):
+    args = ", ".join("%s = %s" % (k, v) for (k, v) in sorted(self.args.iteritems()))
+    return "%s %s (%s) %0.4fs" % (self.category, self.name, args, self.duration)
+
+  def __repr__(self):
+    return str(self)
+
+  def format_tree(self, indent = ""):
+    lines = [indent + str(self)]
+    for child in self.children:
+      lines.append(child.format_tree(indent + "  "))
+    return "\n".join(lines)
+
+class CompileProfile(object):
+  """
+  Events recorded while the profile was active, nested by what was
+  running at the time on each thread
+  """
+  def __init__(self):
+    self.roots = []
+    self._open = {}
+    self._lock = threading.Lock()
+    self.start = time.time()
+    self.end = None
+
+  def begin(self, category, name, args):
+    thread_id = threading.current_thread().ident
+    stack = self._open.setdefault(thread_id, [])
+    parent = stack[-1] if stack else None
+    event = Event(category, name, args, thread_id, parent)
+    if parent is None:
+      with self._lock:
+        self.roots.append(event)
+    else:
+      parent.children.append(event)
+    stack.append(event)
+    return event
+
+  def finish(self, event):
+    event.end = time.time()
+    stack = self._open[event.thread_id]
+    # events can only be left in order, but check in case a
+    # nested one never got finished because of an exception
+    while stack:
+      if stack.pop() is event:
+        break
+
+  def events(self, category = None, name = None):
+    result = []
+    for root in self.roots:
+      for event in root.walk():
+        if (category is None or event.category == category) and \
+           (name is None or event.name == name):
+          result.append(event)
+    return result
+
+  def total_time(self, category):
+    """
+    Time spent in events of the given category, not counting
+    events of the same category nested within each other twice
+    """
+    total = 0.0
+    for event in self.events(category):
+      parent = event.parent
+      while parent is not None and parent.category != category:
+        parent = parent.parent
+      if parent is None:
+        total += event.duration
+    return total
+
+  def summary(self):
+    """
+    Dictionary from each category to the number of its events, how many
+    of them were cache hits (of which how many were structural) or
+    skipped and their total time
+    """
+    result = {}
+    for root in self.roots:
+      for event in root.walk():
+        if event.category not in result:
+          result[event.category] = {'count' : 0, 'cached' : 0, 'structural' : 0,
+                                    'skipped' : 0,
+                                    'time' : self.total_time(event.category)}
+        counts = result[event.category]
+        counts['count'] += 1
+        if event.args.get('cached'):
+          counts['cached'] += 1
+        if event.args.get('structural'):
+          counts['structural'] += 1
+        if event.args.get('skipped'):
+          counts['skipped'] += 1
+    return result
+
+  def to_chrome_trace(self):
+    """
+    The events in the Trace Event Format read by chrome://tracing and
+    Perfetto, with times in microseconds since the start of the profile
+    """
+    pid = os.getpid()
+    trace_events = []
+    for root in self.roots:
+      for event in root.walk():
+        trace_event = {
+          'name' : event.name,
+          'cat' : event.category,
+          'ts' : (event.start - self.start) * 1e6,
+          'pid' : pid,
+          'tid' : event.thread_id,
+          'args' : dict((k, str(v)) for (k, v) in event.args.iteritems()),
+        }
+        if event.end is None or event.end == event.start:
+          trace_event['ph'] = 'i'
+          trace_event['s'] = 't'
+        else:
+          trace_event['ph'] = 'X'
+          trace_event['dur'] = event.duration * 1e6
+        trace_events.append(trace_event)
+    return {'traceEvents' : trace_events, 'displayTimeUnit' : 'ms'}
+
+  def save_chrome_trace(self, filename):
+    with open(filename, 'w') as f:
+      json.dump(self.to_chrome_trace(), f)
+
+  def __str__(self):
+    return "\n".join(root.format_tree() for root in self.roots)
+
+  def __repr__(self):
+    return str(self)
+
+# profiles which are currently collecting events, the innermost last
+_active_profiles = []
+
+class timed(object):
+  """
+  Record the enclosed block as an event of the active profile,
+  costs next to nothing when no profile is active
+  """
+  __slots__ = ('profile', 'event')
+
+  def __init__(self, category, name, **args):
+    if _active_profiles:
+      self.profile = _active_profiles[-1]
+      self.event = self.profile.begin(category, name, args)
+    else:
+      self.profile = self.event = None
+
+  def __enter__(self):
+    return self.event
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if self.event is not None:
+      if exc_type is not None:
+        self.event.args['error'] = exc_type.__name__
+      self.profile.finish(self.event)
+    return False
+
+def mark(category, name, **args):
+  """
+  Record an event which took no time, such as a cache hit
+  """
+  if _active_profiles:
+    profile = _active_profiles[-1]
+    event = profile.begin(category, name, args)
+    profile.finish(event)
+    event.end = event.start
+
+class profile_compile(object):
+  """
+  Context manager collecting a CompileProfile of everything
+  compiled while it's active
+  """
+  def __init__(self):
+    self.profile = None
+
+  def __enter__(self):
+    self.profile = CompileProfile()
+    _active_profiles.append(self.profile)
+    return self.profile
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    _active_profiles.remove(self.profile)
+    self.profile.end = time.time()
+    return False
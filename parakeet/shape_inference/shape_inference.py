@@ -1,5 +1,6 @@
 
 from .. import syntax, prims 
+from ..caches import LRUCache
 from ..analysis import OffsetAnalysis, SyntaxVisitor
 from ..ndtypes import  ArrayT, ScalarT, SliceT, TupleT, NoneT
 from ..syntax import unwrap_constant, Expr  
@@ -803,7 +804,7 @@ class ShapeInference(SyntaxVisitor):
     self.visit_block(stmt.body)
     
     
-_shape_env_cache = {}
+_shape_env_cache = LRUCache("shape environments")
 def shape_env(typed_fn):
   key = typed_fn.cache_key
   
@@ -816,7 +817,7 @@ def shape_env(typed_fn):
   _shape_env_cache[key] = env
   return env
 
-_shape_cache = {}
+_shape_cache = LRUCache("shapes")
 def call_shape_expr(typed_fn):
   key = typed_fn.cache_key
   if key in _shape_cache:
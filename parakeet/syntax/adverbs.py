@@ -1,10 +1,13 @@
-from dsltools import Node 
 from expr import Expr
-  
+from node import Node 
 
 
-class Adverb(Expr, Node):
-  _members = ['fn', 'output', 'type', 'source_info']
+class Adverb(Expr):
+  __slots__ = ('fn', 'output')
+  
+  # unlike other expressions adverbs are hashed by their fields 
+  def __hash__(self):
+    return Node.__hash__(self)
   
   def node_init(self):
     assert self.fn, "Can't construct adverb %s without a function argument" % self 
@@ -17,31 +20,34 @@ class Accumulative(Expr):
   """
   Adverbs such as Reduce and Scan which carry an accumulated value and require a
   'combine' function to merge the accumulators resulting from parallel
-  sub-computations.
+  sub-computations. 
+  
+  The 'combine' and 'init' fields are stored by the adverbs using this mixin.
   """
-  _members = ['combine', 'init']
+  __slots__ = ()
   
 class HasEmit(Expr):
   """
-  Common base class for Scan, IndexScan, and whatever other sorts of scans can be dreamed up
+  Common base class for Scan, IndexScan, and whatever other sorts of scans can be dreamed up,
+  the 'emit' field is stored by the adverbs using this mixin. 
   """
-  _members = ['emit']
+  __slots__ = ()
   
   
 
 class IndexAdverb(Adverb):
-  _members = ['shape', 'start_index']
+  __slots__ = ('shape', 'start_index')
   
   
 class IndexMap(IndexAdverb):
   """
   Map from each distinct index in the shape to a value 
   """
-  pass 
+  __slots__ = ()
 
 
 class IndexAccumulative(IndexAdverb, Accumulative):
-  pass 
+  __slots__ = ('combine', 'init')
   
 class IndexReduce(IndexAccumulative):
   """
@@ -49,14 +55,14 @@ class IndexReduce(IndexAccumulative):
   element values, whereas 'combine' takes pairs of element 
   values and combines them. 
   """
-  pass 
+  __slots__ = ()
 
     
 class IndexScan(IndexAccumulative, HasEmit):
-  pass 
+  __slots__ = ('emit',)
   
 class DataAdverb(Adverb):
-  _members = ['args', 'axis']
+  __slots__ = ('args', 'axis')
 
   def fn_to_str(self, fn):
     if hasattr(fn, 'name'):
@@ -82,18 +88,20 @@ class DataAdverb(Adverb):
     return repr(self)
 
 class Map(DataAdverb):
-  pass 
+  __slots__ = ()
 
 class OuterMap(DataAdverb):
-  pass 
+  __slots__ = ()
 
 
 
 class DataAccumulative(DataAdverb, Accumulative):
-  pass 
+  __slots__ = ('combine', 'init')
 
 
 class Reduce(DataAccumulative):
+  __slots__ = ()
+  
   def __repr__(self):
     return "Reduce(axis = %s, args = (%s), type = %s, init = %s, map_fn = %s, combine = %s)" % \
         (self.axis,
@@ -104,6 +112,8 @@ class Reduce(DataAccumulative):
          self.fn_to_str(self.combine))
 
 class Scan(DataAccumulative, HasEmit):
+  __slots__ = ('emit',)
+  
   def __repr__(self):
     s = "%s(axis = %s, args = {%s}, type = %s, " \
         % (self.node_type(), self.axis,
@@ -117,32 +127,44 @@ class Scan(DataAccumulative, HasEmit):
           self.fn_to_str(self.emit))
     return s
 
-class Filter(DataAdverb):
+class HasPred(Expr):
+  """
+  Common base class for adverbs which skip the elements for which the 
+  'pred' function isn't True, the 'pred' field is stored by the adverbs 
+  using this mixin.
+  """
+  __slots__ = ()
+
+class Filter(DataAdverb, HasPred):
   """
   Applies 'fn' to each element of the arguments and 
   returns indices where 'pred' is True for the 
   element values
   """
-  _members = ['pred']
+  __slots__ = ('pred',)
   
 
-class IndexFilter(IndexAdverb, Filter):
-  pass 
+class IndexFilter(IndexAdverb, HasPred):
+  __slots__ = ('pred',)
 
 
-class FilterReduce(Reduce, Filter):
+class FilterReduce(Reduce, HasPred):
   """
   Like a normal reduce but skips some elements if they don't pass
   the predicate 'pred'
   """
-  pass  
+  __slots__ = ('pred',)
   
   
 class IndexFilterReduce(FilterReduce):
-  pass 
+  __slots__ = ()
 
 class Tiled(object):
-  _members = ['axes', 'fixed_tile_size']
+  """
+  The 'axes' and 'fixed_tile_size' fields are stored by the adverbs using 
+  this mixin.
+  """
+  __slots__ = ()
 
   def __repr__(self):
     s = "%s(axes = %s, args = (%s), type=%s, fn = %s)" % \
@@ -153,12 +175,14 @@ class Tiled(object):
     return s
 
 class TiledMap(Tiled, Map):
-  pass
+  __slots__ = ('axes', 'fixed_tile_size')
 
 class TiledOuterMap(Tiled, OuterMap):
-  pass
+  __slots__ = ('axes', 'fixed_tile_size')
 
 class TiledReduce(Tiled, Reduce):
+  __slots__ = ('axes', 'fixed_tile_size')
+  
   def __repr__(self):
     s = ("%s(axes = %s, args = {%s}, type = %s, init = %s, map_fn = %s, combine = %s)") % \
         (self.node_type(), self.axes,
@@ -171,6 +195,8 @@ class TiledReduce(Tiled, Reduce):
     return s
 
 class TiledScan(Tiled, Scan):
+  __slots__ = ('axes', 'fixed_tile_size')
+  
   def __repr__(self):
     s = "%s(axes = %s, args = {%s}, type = %s, " \
         % (self.node_type(), self.axes,
@@ -186,7 +212,7 @@ class TiledScan(Tiled, Scan):
 
   
 class Conv(Adverb):
-  _members = ['x', 'window_shape']
+  __slots__ = ('x', 'window_shape')
   
   def __repr__(self):
     return "Conv(fn = %s, x = %s, window_shape=%s)" % \
@@ -196,12 +222,12 @@ class Conv(Adverb):
       return repr(self)
 
 class ConvBorderFn(Conv):
-  _members = ['border_fn']
+  __slots__ = ('border_fn',)
   
 class ConvBorderValue(Conv):
-  _members = ['border_value']
+  __slots__ = ('border_value',)
   
 class ConvPadding(Conv):
-  _members = ['fill_value']
+  __slots__ = ('fill_value',)
   
   
\ No newline at end of file
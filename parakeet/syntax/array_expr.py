@@ -6,6 +6,8 @@ class ArrayExpr(SeqExpr):
   Common base class for first-order array operations 
   that don't change the underlying data 
   """
+  __slots__ = ()
+
   def __init__(self, array, type = None, source_info = None):
     self.array = array 
     self.type = type 
@@ -15,6 +17,8 @@ class ArrayExpr(SeqExpr):
     yield self.array 
 
 class Array(ArrayExpr):
+  __slots__ = ('elts',)
+
   def __init__(self, elts, type = None, source_info = None):
     self.elts = tuple(elts) 
     self.type = type 
@@ -30,6 +34,8 @@ class Array(ArrayExpr):
     return hash(self.elts)
 
 class Slice(ArrayExpr):
+  __slots__ = ('start', 'stop', 'step')
+
   def __init__(self, start, stop, step, type = None, source_info = None):
     self.start = start 
     self.stop = stop 
@@ -62,6 +68,8 @@ class Slice(ArrayExpr):
     return hash((self.start, self.stop, self.step))
 
 class ConstArray(ArrayExpr):
+  __slots__ = ('shape', 'value')
+
   def __init__(self, shape, value, type = None, source_info = None):
     self.shape = shape 
     self.value = value 
@@ -77,6 +85,8 @@ class DiagonalArray(ArrayExpr):
   Build a zero array with a filled value on its diagonal 
   Use this to implement np.diag, np.eye 
   """
+  __slots__ = ('shape', 'value', 'offset')
+
   def __init__(self, shape, value, offset = None, type = None, source_info = None):
     self.shape = shape 
     self.value = value 
@@ -100,13 +110,14 @@ class ExtractDiagonal(ArrayExpr):
   """
   Go from an n-d input array to 1-d vector of diagonal elements
   """ 
-  pass 
+  __slots__ = ('array',)
 
 class ConstArrayLike(ArrayExpr):
   """
   Create an array with the same shape as the first arg, but with all values set
   to the second arg
   """
+  __slots__ = ('array', 'value')
 
   def __init__(self, array, value, type = None, source_info = None):
     self.array = array 
@@ -119,6 +130,8 @@ class ConstArrayLike(ArrayExpr):
     yield self.value   
 
 class Range(ArrayExpr):
+  __slots__ = ('start', 'stop', 'step')
+
   def __init__(self, start, stop, step, type = None, source_info = None):
     self.start = start 
     self.stop = stop 
@@ -138,6 +151,8 @@ class Range(ArrayExpr):
 
 class AllocArray(ArrayExpr):
   """Allocate an unfilled array of the given shape and type"""
+  __slots__ = ('shape', 'elt_type', 'order')
+
   def __init__(self, shape, elt_type, type = None, order = "C", source_info = None):
     # TODO: support a 'fill' field 
     self.shape = shape 
@@ -159,6 +174,8 @@ class AllocArray(ArrayExpr):
 
 class ArrayView(ArrayExpr):
   """Create a new view on already allocated underlying data"""
+  __slots__ = ('data', 'shape', 'strides', 'offset', 'size')
+
   def __init__(self, data, shape, strides, offset, size, type = None, source_info = None):
     self.data = data 
     self.shape = shape 
@@ -180,6 +197,8 @@ class ArrayView(ArrayExpr):
     yield self.size
 
 class Ravel(ArrayExpr):
+  __slots__ = ('array',)
+
   def children(self):
     return (self.array,)
 
@@ -187,6 +206,8 @@ class Ravel(ArrayExpr):
     return "Ravel(%s)" % self.array 
 
 class Reshape(ArrayExpr):
+  __slots__ = ('array', 'shape')
+
   def __init__(self, array, shape, type = None, source_info = None):
     self.array = array 
     self.shape = shape 
@@ -202,16 +223,21 @@ class Reshape(ArrayExpr):
     return "Reshape(%s, %s)" % (self.array, self.shape)
 
 class Shape(ArrayExpr):
-  
+  __slots__ = ('array',)
+
   def __str__(self):
     return "Shape(%s)" % self.array 
   
 class Strides(ArrayExpr):
+  __slots__ = ('array',)
+
   def __str__(self):
     return "Strides(%s)" % self.array 
   
     
 class Transpose(ArrayExpr):
+  __slots__ = ('array',)
+
   def children(self):
     yield self.array
   
@@ -219,6 +245,8 @@ class Transpose(ArrayExpr):
     return "%s.T" % self.array 
   
 class Tile(ArrayExpr):
+  __slots__ = ('array', 'reps')
+
   def __init__(self, array, reps, type = None, source_info = None):
     self.array = array 
     self.reps = reps 
@@ -237,8 +265,12 @@ class Where(ArrayExpr):
   """
   Return the non-zero indices of the array
   """
-  def __init__(self, array):
+  __slots__ = ('array',)
+
+  def __init__(self, array, type = None, source_info = None):
     self.array = array 
+    self.type = type 
+    self.source_info = source_info 
     
   def __str__(self):
     return "Where(%s)" % self.array 
@@ -251,9 +283,13 @@ class Compress(ArrayExpr):
   """
   Slice into array 'data' at positions where 'condition' is True
   """ 
-  def __init__(self, condition, data):
+  __slots__ = ('condition', 'data')
+
+  def __init__(self, condition, data, type = None, source_info = None):
     self.condition = condition 
     self.data = data 
+    self.type = type 
+    self.source_info = source_info 
   
   def __str__(self):
     return "Compress(%s, %s)" % (self.condition, self.data)
@@ -7,6 +7,8 @@ class DelayUntilTyped(Expr):
   Once the list of values has been annotated with locally inferred types, 
   pass them to the given function to construct a final expression 
   """
+  __slots__ = ('values', 'keywords', 'fn')
+
   def __init__(self, values, keywords, fn, source_info = None):
     """
     No need for a 'type' argument since the user-supplied function 
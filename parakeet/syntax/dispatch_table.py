@@ -0,0 +1,51 @@
+from node import Node
+
+def node_classes():
+  """
+  Every syntax node class defined so far
+  """
+  result = []
+  stack = [Node]
+  while stack:
+    c = stack.pop()
+    for subclass in c.__subclasses__():
+      if subclass not in result:
+        result.append(subclass)
+        stack.append(subclass)
+  return result
+
+def _resolve(visitor_class, prefix, node_class):
+  method = getattr(visitor_class, prefix + node_class.__name__, None)
+  return getattr(method, 'im_func', method)
+
+class DispatchTable(type):
+  """
+  Metaclass for visitors whose methods are named after the node classes
+  they handle (transform_Var, visit_ForLoop, ...).
+
+  For every prefix in a visitor class's _dispatch_prefixes this builds a
+  dictionary from node classes to the plain functions handling them (or
+  None) when the visitor class gets created, stored in the class attribute
+  named by handler_table(prefix). Visiting a node then costs one dictionary
+  lookup instead of building a method name and searching the class
+  hierarchy for it. Node classes defined after the visitor get resolved the
+  first time find_handler sees them.
+  """
+  def __init__(cls, name, bases, dct):
+    type.__init__(cls, name, bases, dct)
+    all_nodes = node_classes()
+    for prefix in cls._dispatch_prefixes:
+      table = dict((c, _resolve(cls, prefix, c)) for c in all_nodes)
+      setattr(cls, handler_table(prefix), table)
+
+def handler_table(prefix):
+  return "_%smethods" % prefix
+
+def find_handler(visitor_class, prefix, node_class):
+  """
+  Slow path for node classes which aren't in the visitor's table yet
+  """
+  table = getattr(visitor_class, handler_table(prefix))
+  if node_class not in table:
+    table[node_class] = _resolve(visitor_class, prefix, node_class)
+  return table[node_class]
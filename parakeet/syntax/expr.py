@@ -1,21 +1,22 @@
-from dsltools import Node 
-
 from .. ndtypes import NoneT
 
-class Expr(object):
-  # _members = ['type', 'source_info']
+from node import Node 
+
+class Expr(Node):
+  __slots__ = ('type', 'source_info')
+  _annotations = ('type', 'source_info')
+  
+  # expressions which don't define their own hash are hashed by identity 
+  __hash__ = object.__hash__
   
   def __str__(self):
-    fields = ["%s = %s" % (k,v) for (k,v) in self.__dict__.iteritems()]
+    fields = ["%s = %s" % (k, getattr(self, k, None)) 
+              for k in self.members() + self._annotations]
     return "%s(%s)" % (self.__class__.__name__, ", ".join(fields))
   
   def __repr__(self):
     return str(self)
   
-  @classmethod
-  def node_type(cls):
-    return cls.__name__
-  
   def children(self):
     for v in self.itervalues():
       if v and isinstance(v, Expr):
@@ -41,6 +42,8 @@ class Expr(object):
     return hash(elts)
    
 class Const(Expr):
+  __slots__ = ('value',)
+
   def __init__(self, value, type = None, source_info = None):
     self.value = value 
     self.type = type 
@@ -75,18 +78,14 @@ class Const(Expr):
            self.type != other.type
 
 class Var(Expr):
+  __slots__ = ('name',)
+
   def __init__(self, name, type = None, source_info = None):
     assert name is not None 
     self.name = name
     self.type = type 
     self.source_info = source_info 
 
-  # it's possible to speed things up a little
-  # by by-passing the Node construct 
-  #_members = ['name']
-  #def node_init(self):
-  #  assert self.name is not None
-    
   def short_str(self):
     return self.name
 
@@ -119,6 +118,8 @@ class Var(Expr):
     return ()
 
 class Attribute(Expr):
+  __slots__ = ('value', 'name')
+
   def __init__(self, value, name, type = None, source_info = None):
     self.value = value 
     self.name = name 
@@ -142,6 +143,8 @@ class Attribute(Expr):
 
 class Closure(Expr):
   """Create a closure which points to a global fn with a list of partial args"""
+  __slots__ = ('fn', 'args')
+
   def __init__(self, fn, args, type = None, source_info = None):
     self.fn = fn 
     self.args = args 
@@ -168,6 +171,8 @@ class Closure(Expr):
     return hash((self.fn, tuple(self.args)))
 
 class Call(Expr):
+  __slots__ = ('fn', 'args')
+
   def __init__(self, fn, args, type = None, source_info = None):
     self.fn = fn 
     self.args = args 
@@ -201,14 +206,14 @@ class PrimCall(Expr):
   """
   Call a primitive function, the "prim" field should be a prims.Prim object
   """
+  __slots__ = ('prim', 'args')
+
   def __init__(self, prim, args, type = None, source_info = None):
     self.prim = prim 
     self.args = args 
     self.type = type 
     self.source_info = source_info 
     
-  #_members = ['prim', 'args']
-  
   def _arg_str(self, i):
     arg = self.args[i]
     if arg.__class__ is PrimCall:
@@ -266,6 +271,8 @@ class PrimCall(Expr):
 
 
 class ClosureElt(Expr):
+  __slots__ = ('closure', 'index')
+
   def __init__(self, closure, index, type = None, source_info = None):
     self.closure = closure 
     self.index = index 
@@ -282,6 +289,8 @@ class ClosureElt(Expr):
     return hash((self.closure, self.index))
 
 class Cast(Expr):
+  __slots__ = ('value',)
+
   def __init__(self, value, type, source_info = None):
     self.value = value 
     self.type = type 
@@ -297,6 +306,8 @@ class Cast(Expr):
     return "Cast(%s : %s)" % (self.value, self.type) 
 
 class Select(Expr):
+  __slots__ = ('cond', 'true_value', 'false_value')
+
   def __init__(self, cond, true_value, false_value, type = None, source_info = None):
     self.cond = cond 
     self.true_value = true_value 
@@ -304,8 +315,6 @@ class Select(Expr):
     self.type = type 
     self.source_info = source_info 
     
-  # _members = ['cond', 'true_value', 'false_value']
-  
   def __hash__(self):
     return hash((self.cond, self.true_value, self.false_value))
   
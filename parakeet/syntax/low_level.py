@@ -6,6 +6,7 @@ class Struct(Expr):
   Eventually all non-scalar data should be transformed to be created with this
   syntax node, signifying explicit struct allocation
   """
+  __slots__ = ('args',)
 
   def __init__(self, args, type = None, source_info = None):
     self.args = tuple(args)
@@ -25,6 +26,7 @@ class Struct(Expr):
 
 class Alloc(Expr):
   """Allocates a block of data, returns a pointer"""
+  __slots__ = ('elt_type', 'count')
   
   def __init__(self, elt_type, count, type = None, source_info = None):
     self.elt_type = elt_type 
@@ -43,6 +45,8 @@ class Alloc(Expr):
 
 class Free(Expr):
   """Free a manually allocated block of memory"""
+  __slots__ = ('value',)
+
   def __init__(self, value, type = None, source_info = None):
     self.value = value 
     self.type = type 
@@ -58,13 +62,13 @@ class Free(Expr):
     return hash(self.value)
   
 class NumCores(Expr):
-  
   """
   Degree of available parallelism, 
   varies depending on backend and how
   ParFor is actually being mapped 
   to executing threads/thread blocks/etc..
   """
+  __slots__ = ()
   
   def __str__(self):
     return "NUM_CORES"
@@ -88,6 +92,8 @@ class SourceExpr(Expr):
   should only be used from within a backend that knows what
   the target code should look like 
   """
+  __slots__ = ('text',)
+
   def __init__(self, text, type = None, source_info = None):
     self.text = text 
     self.type = type 
@@ -102,6 +108,8 @@ class SourceStmt(Stmt):
   should only be used from within a backend that knows what
   the target code should look like 
   """
+  __slots__ = ('text', 'type')
+
   def __init__(self, text, type = None, source_info = None):
     self.text = text 
     self.type = type 
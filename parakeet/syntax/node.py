@@ -0,0 +1,88 @@
+class Node(object):
+  """
+  Common base of expressions and statements.
+
+  Every class lists the fields it adds in __slots__, so nodes don't carry
+  a per-instance __dict__ and the complete field list of a class comes from
+  walking its hierarchy once. Classes which only get mixed into others
+  declare empty __slots__ and leave storing their fields to the classes
+  using them, since Python can't combine two bases which both lay out slots.
+
+  Annotations such as the type and source location aren't counted among
+  the fields, transformations carry them across separately.
+  """
+  __slots__ = ()
+  _annotations = ()
+
+  @classmethod
+  def members(cls):
+    fields = cls.__dict__.get('_fields')
+    if fields is None:
+      fields = []
+      for c in cls.__mro__:
+        for name in c.__dict__.get('__slots__', ()):
+          if name not in fields and name not in cls._annotations:
+            fields.append(name)
+      fields = tuple(fields)
+      cls._fields = fields
+      cls._node_inits = [c.__dict__['node_init'] for c in reversed(cls.__mro__)
+                         if 'node_init' in c.__dict__]
+    return fields
+
+  def iteritems(self):
+    for k in self.members():
+      yield (k, getattr(self, k, None))
+
+  def itervalues(self):
+    for k in self.members():
+      yield getattr(self, k, None)
+
+  def __init__(self, *args, **kwargs):
+    """
+    Fields can be given positionally (in the order of members(),
+    followed by the annotations) or by name, anything left out is None
+    """
+    fields = self.members()
+    names = fields + self._annotations
+    assert len(args) <= len(names), \
+      "Too many arguments for %s, expected %s" % (self.node_type(), names)
+    for (name, value) in zip(names, args):
+      setattr(self, name, value)
+    for name in names[len(args):]:
+      setattr(self, name, kwargs.pop(name, None))
+    assert len(kwargs) == 0, \
+      "Keyword arguments %s not recognized for %s, expected %s" % \
+      (kwargs.keys(), self.node_type(), names)
+    for node_init in self._node_inits:
+      node_init(self)
+
+  def __hash__(self):
+    hash_values = []
+    for v in self.itervalues():
+      if isinstance(v, list):
+        v = tuple(v)
+      hash_values.append(v)
+    return hash(tuple(hash_values))
+
+  def eq_members(self, other):
+    for (k,v) in self.iteritems():
+      if getattr(other, k) != v:
+        return False
+    return True
+
+  def __eq__(self, other):
+    return other.__class__ is self.__class__ and self.eq_members(other)
+
+  def __ne__(self, other):
+    return not self == other
+
+  @classmethod
+  def node_type(cls):
+    return cls.__name__
+
+  def __str__(self):
+    member_strings = ["%s = %s" % (k, v) for (k, v) in self.iteritems()]
+    return "%s(%s)" % (self.node_type(), ", ".join(member_strings))
+
+  def __repr__(self):
+    return self.__str__()
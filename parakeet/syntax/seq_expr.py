@@ -1,6 +1,8 @@
 from expr import Expr 
 
 class SeqExpr(Expr):
+  __slots__ = ()
+
   def __init__(self, value, type = None, source_info = None):
     self.value = value 
     self.type = type 
@@ -10,9 +12,11 @@ class SeqExpr(Expr):
     yield self.value 
 
 class Enumerate(SeqExpr):
-  pass 
+  __slots__ = ('value',)
   
 class Zip(SeqExpr):
+  __slots__ = ('values',)
+
   def __init__(self, values, type = None, source_info = None):
     self.values = tuple(values) 
     self.type = type 
@@ -22,7 +26,7 @@ class Zip(SeqExpr):
     return self.values
 
 class Len(SeqExpr):
-  pass 
+  __slots__ = ('value',)
   
 class Index(SeqExpr):
   """
@@ -30,6 +34,8 @@ class Index(SeqExpr):
     - make all user-defined indexing check_negative=True by default 
     - implement backend logic for lowering check_negative 
   """
+  __slots__ = ('value', 'index', 'check_negative')
+
   def __init__(self, value, index, check_negative = None, type = None, source_info = None):
     self.value = value 
     self.index = index 
@@ -1,8 +1,9 @@
 from expr import Expr 
-from dsltools import Node
+from node import Node
 
 class Stmt(Node):
-  _members = ['source_info']
+  __slots__ = ('source_info',)
+  _annotations = ('source_info',)
 
 def block_to_str(stmts):
   body_str = '\n'
@@ -18,7 +19,7 @@ def phi_nodes_to_str(phi_nodes):
   return whole.replace("\n", "\n    ")
 
 class Assign(Stmt):
-  _members = ['lhs', 'rhs']
+  __slots__ = ('lhs', 'rhs')
 
   def __str__(self):
     if hasattr(self.lhs, 'type') and self.lhs.type:
@@ -29,14 +30,14 @@ class Assign(Stmt):
 class ExprStmt(Stmt):
   """Run an expression without binding any new variables"""
 
-  _members = ['value']
+  __slots__ = ('value',)
 
   def __str__(self):
     assert self.value is not None
     return "ExprStmt(%s)" % self.value
 
 class Comment(Stmt):
-  _members = ['text']
+  __slots__ = ('text',)
 
   def __str__(self):
     s = "#"
@@ -49,13 +50,13 @@ class Comment(Stmt):
 
 
 class Return(Stmt):
-  _members = ['value']
+  __slots__ = ('value',)
 
   def __str__(self):
     return "Return %s" % self.value
 
 class If(Stmt):
-  _members = ['cond', 'true', 'false', 'merge']
+  __slots__ = ('cond', 'true', 'false', 'merge')
 
   def __str__(self):
     s = "if %s:" % self.cond
@@ -80,7 +81,7 @@ class While(Stmt):
   [(new_var1, (old_var1,old_var2)]
   """
 
-  _members = ['cond', 'body', 'merge']
+  __slots__ = ('cond', 'body', 'merge')
 
   def __repr__(self):
     s = "while %s:\n  "  % self.cond
@@ -101,7 +102,7 @@ class ForLoop(Stmt):
   So, here we have the stately and ancient for loop.  All hail its glory.
   """
 
-  _members = ['var', 'start', 'stop', 'step', 'body', 'merge']
+  __slots__ = ('var', 'start', 'stop', 'step', 'body', 'merge')
     
   def __str__(self):
     s = "for %s in range(%s, %s, %s):" % \
@@ -117,7 +118,7 @@ class ForLoop(Stmt):
   
   
 class ParFor(Stmt):
-  _members = ['fn', 'bounds', 'read_only', 'write_only']
+  __slots__ = ('fn', 'bounds', 'read_only', 'write_only')
 
   def __str__(self):
     return "ParFor(fn = %s, bounds = %s)" % (self.fn, self.bounds)
@@ -128,14 +129,14 @@ class ParFor(Stmt):
 #
 
 class SetIndex(Stmt):
-  _members = ['array', 'index', 'value']
+  __slots__ = ('array', 'index', 'value')
   
   def __str__(self):
     return "%s[%s] = %s" % (self.array, self.index, self.value)
   
 
 class SetAttr(Stmt):
-  _members = ['struct', 'attr', 'value']
+  __slots__ = ('struct', 'attr', 'value')
 
   def node_init(self):
     assert isinstance(self.struct, Expr)
@@ -146,5 +147,5 @@ class SetAttr(Stmt):
     return "%s.%s = %s" % (self.struct, self.attr, self.value)
   
 class PrintString(Stmt):
-  _members = ['text']
+  __slots__ = ('text',)
   
\ No newline at end of file
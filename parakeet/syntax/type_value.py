@@ -6,6 +6,8 @@ class TypeValue(Expr):
   """
   Value materialization of a type 
   """
+  __slots__ = ('type_value',)
+
   def __init__(self, type_value, type = None, source_info = None):
     self.type_value = type_value
      
@@ -14,5 +16,6 @@ class TypeValue(Expr):
     assert type.type is not None 
     
     self.type = type 
+    self.source_info = source_info 
      
     
\ No newline at end of file
@@ -1,3 +1,4 @@
+import weakref
 
 from ..ndtypes import make_closure_type
 from expr import Expr
@@ -16,7 +17,9 @@ class UntypedFn(Expr):
   'parakeet_nonlocals'
   """
     
-  registry = {}
+  # untyped functions by name, for closure types which only refer to
+  # them by name (doesn't keep them alive by itself)
+  registry = weakref.WeakValueDictionary()
 
   def __init__(self, name, args, body, 
                python_refs = None, 
@@ -5,7 +5,6 @@ from .. syntax import (TypedFn, Var, Const, Attribute, Index, PrimCall,
                        Map, Reduce, Scan, IndexMap, IndexReduce, IndexScan, 
                        UntypedFn )      
 from transform import Transform 
-from parakeet.syntax.delay_until_typed import DelayUntilTyped
 
 class CloneFunction(Transform):
   """
@@ -99,10 +98,8 @@ class CloneFunction(Transform):
      
     else:
       args = {}  
-      for k,v in expr.__dict__.iteritems():
-        args[k] = self.transform_if_expr(v)
-      if c is DelayUntilTyped and 'type' in args:
-        del args['type']
+      for k in c.members():
+        args[k] = self.transform_if_expr(getattr(expr, k))
       return c(**args)
   
   def transform_Assign(self, stmt):
@@ -147,8 +144,10 @@ class CloneFunction(Transform):
                   read_only = stmt.read_only, write_only = stmt.write_only)
   
   def pre_apply(self, old_fn):
+    # the type and source_info annotations live in slots rather than 
+    # in the function's __dict__, the type gets recomputed by TypedFn 
     new_fundef_args = old_fn.__dict__.copy()
-    del new_fundef_args['type']
+    new_fundef_args['source_info'] = old_fn.source_info
     # new_fundef_args = dict([(m, getattr(old_fn, m)) for m in old_fn._members])
     # create a fresh function with a distinct name and the
     # transformed body and type environment
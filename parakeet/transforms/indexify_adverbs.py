@@ -4,7 +4,7 @@ import itertools
 from .. import names 
 from ..builder import build_fn 
 from ..ndtypes import Int64, repeat_tuple, NoneType, ScalarT, TupleT, ArrayT 
-from ..syntax import (ParFor, IndexReduce, IndexScan, Index, Map, OuterMap, Var, Const, Expr)
+from ..syntax import (ParFor, IndexMap, IndexReduce, IndexScan, Index, Map, OuterMap, Var, Const, Expr)
 from ..syntax.helpers import get_types, none, zero_i64 
 from ..syntax.adverb_helpers import max_rank_arg, max_rank 
 from transform import Transform
@@ -314,7 +314,7 @@ class IndexifyAdverbs(Transform):
     self.insert_parfor(index_fn, bounds, n_read_only = len(args), n_write_only = 1)
     return output 
   
-  def transform_OuterMap(self, expr):
+  def transform_OuterMap(self, expr, output = None):
     args = self.transform_expr_list(expr.args)
     axes = self.normalize_axes(args, expr.axis)
     
@@ -326,7 +326,8 @@ class IndexifyAdverbs(Transform):
     first_values = [self.slice_along_axis(arg, axis, zero) 
                     for (arg,axis) in zip(args, axes)]
     # self.create_output_array(fn, inner_args, outer_shape, name)
-    output =  self.create_output_array(fn, first_values, outer_shape)
+    if output is None:
+      output = self.create_output_array(fn, first_values, outer_shape)
 
     loop_body = self.indexify_fn(fn, axes, args, 
                                  cartesian_product = True, 
@@ -513,6 +514,10 @@ class IndexifyAdverbs(Transform):
         return None 
       elif rhs_class is OuterMap:
         self.transform_OuterMap(stmt.rhs, output = stmt.lhs)
+        return None
+      elif rhs_class is IndexMap:
+        self.transform_IndexMap(stmt.rhs, output = stmt.lhs)
+        return None
     return Transform.transform_Assign(self, stmt)
 
   
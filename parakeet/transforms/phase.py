@@ -1,6 +1,9 @@
 from itertools import izip 
 
 from .. import config
+from .. analysis.structural_key import structural_key
+from .. caches import LRUCache
+from .. profiling import mark, timed
 
 from .. syntax import TypedFn
 from clone_function import CloneFunction
@@ -16,7 +19,7 @@ def apply_transforms(fn, transforms,
     return fn 
   if phase_name: name_stack.append("{" + phase_name + " :: " + fn.name +  "}")
   for T in transforms:
-    t = T() if type(T) == type else T
+    t = T() if isinstance(T, type) else T
     
     if isinstance(t, Transform):
       name_stack.append(str(t))
@@ -24,9 +27,14 @@ def apply_transforms(fn, transforms,
         print "-- %s" % ("->".join(name_stack),)
       
     elif isinstance(t, Phase) and t.should_skip(fn) and not t.depends_on:
+      mark("phase", t, fn = fn.name, skipped = True)
       continue 
 
-    fn = t.apply(fn)
+    if isinstance(t, Transform):
+      with timed("transform", t, fn = fn.name):
+        fn = t.apply(fn)
+    else:
+      fn = t.apply(fn)
 
     assert fn is not None, "%s transformed fn into None" % T
 
@@ -54,8 +62,15 @@ class Phase(object):
                post_apply = None,
                memoize = True,
                name = None, 
-               recursive = True):
-    self.cache = {}
+               recursive = True, 
+               structural = False):
+    # a phase which works on a copy can also hand out its results to
+    # functions which only differ in the names of their variables, 
+    # keyed by the structure of the function it was applied to 
+    # (see analysis.structural_key) 
+    assert not structural or (copy and memoize), \
+      "Only memoized phases working on a copy can share results by structure"
+    self.structural = structural 
     if not isinstance(transforms, (tuple, list)):
       transforms = [transforms]
     self.transforms = transforms
@@ -82,6 +97,9 @@ class Phase(object):
     self.name = name
     self.recursive = recursive 
     self._hash = hash(str(self))
+    self.cache = LRUCache("phase %s" % self)
+    if structural:
+      self.structural_cache = LRUCache("phase %s (structural)" % self)
 
   def __str__(self):
     if self.name:
@@ -89,7 +107,7 @@ class Phase(object):
     else:
       names = []
       for t in self.transforms:
-        if type(t) == type:
+        if isinstance(t, type):
           names.append(t.__name__)
         else:
           names.append(str(t))
@@ -145,36 +163,52 @@ class Phase(object):
       if fn.created_by is self:
         return fn
       elif self in fn.transform_history:
+        mark("phase", self, fn = fn.name, skipped = True)
         return fn   
       elif original_key in self.cache:
+        mark("phase", self, fn = fn.name, cached = True)
         return self.cache[original_key] 
     
-    if self.depends_on and run_dependencies:
-      fn = apply_transforms(fn, self.depends_on)
-    
-    if self.copy:
-      fn = CloneFunction(parent_transform = self, rename = self.rename).apply(fn)
-      if fn.cache_key  in self.cache:
-        print "Warning: Typed function %s (key = %s) already registered, encountered while cloning before %s" % \
-        (fn.name, fn.cache_key, self)
-    
-    if self.recursive:
-      fn = RecursiveApply(self).apply(fn)
+    structure = None 
+    if self.structural:
+      structure = structural_key(fn, config)
+      if structure is not None and structure in self.structural_cache:
+        mark("phase", self, fn = fn.name, cached = True, structural = True)
+        result = self.structural_cache[structure]
+        self.cache[original_key] = result 
+        return result 
       
-    if not self.should_skip(fn):
-      fn = apply_transforms(fn, self.transforms, 
-                           cleanup = self.cleanup, 
-                           phase_name = str(self), 
-                           transform_history = fn.transform_history)
-    
-      if self.post_apply:
-        new_fn = self.post_apply(fn)
-        if new_fn.__class__ is TypedFn:
-          fn = new_fn
-
+    with timed("phase", self, fn = fn.name) as event:
+      if self.depends_on and run_dependencies:
+        fn = apply_transforms(fn, self.depends_on)
+      
+      if self.copy:
+        fn = CloneFunction(parent_transform = self, rename = self.rename).apply(fn)
+        if fn.cache_key  in self.cache:
+          print "Warning: Typed function %s (key = %s) already registered, encountered while cloning before %s" % \
+          (fn.name, fn.cache_key, self)
+      
+      if self.recursive:
+        fn = RecursiveApply(self).apply(fn)
+        
+      if not self.should_skip(fn):
+        fn = apply_transforms(fn, self.transforms, 
+                             cleanup = self.cleanup, 
+                             phase_name = str(self), 
+                             transform_history = fn.transform_history)
+      
+        if self.post_apply:
+          new_fn = self.post_apply(fn)
+          if new_fn.__class__ is TypedFn:
+            fn = new_fn
+      elif event is not None:
+        event.args['skipped'] = True
+  
     fn.transform_history.add(self)
       
     if self.memoize:
       self.cache[original_key] = fn
       self.cache[fn.cache_key] = fn
+      if structure is not None:
+        self.structural_cache[structure] = fn
     return fn
@@ -1,4 +1,5 @@
 from .. import config 
+from ..caches import LRUCache
 from ..analysis import (contains_adverbs, contains_calls, contains_loops, 
                         contains_structs, contains_array_operators)
 
@@ -31,6 +32,7 @@ from shape_elim import ShapeElimination
 from simplify import Simplify
 from simplify_array_operators import SimplifyArrayOperators
 from specialize_fn_args import SpecializeFnArgs
+from write_to_output import WriteToOutput
 
 ####################################
 #                                  #
@@ -136,10 +138,25 @@ high_level_optimizations = Phase([
                                  name = "HighLevelOpts", 
                                  copy = True, 
                                  memoize = True, 
+                                 structural = True, 
                                  cleanup = [Simplify, DCE])
 
 
 
+_output_fns = LRUCache("output arg functions")
+def with_output_arg(fn):
+  """
+  Version of a function returning an array which instead writes its result 
+  into an extra output argument. Rewriting it after the high level 
+  optimizations means the adverb computing the result is already fused and
+  can be indexified to write directly into the output. 
+  """
+  key = fn.cache_key
+  if key not in _output_fns:
+    _output_fns[key] = WriteToOutput().apply(high_level_optimizations.apply(fn))
+  return _output_fns[key]
+
+
 copy_elim = Phase(CopyElimination, 
                   config_param = 'opt_copy_elimination', 
                   memoize = False)
@@ -286,6 +303,7 @@ lower_to_loops = Phase([loopify, lowering, final_optimizations],
                        copy = True, 
                        recursive = True, 
                        memoize = True, 
+                       structural = True, 
                        depends_on = optimize_indexified_code, 
                        )
 lower_to_adverbs = Phase([lowering, final_optimizations], 
@@ -293,4 +311,5 @@ lower_to_adverbs = Phase([lowering, final_optimizations],
                          copy = True, 
                          recursive = True, 
                          memoize = True, 
+                         structural = True, 
                          depends_on = optimize_indexified_code,)
\ No newline at end of file
@@ -3,10 +3,8 @@ import time
 from .. import config
 from .. analysis import verify
 from .. builder import Builder  
-from .. syntax import (Expr, If, Assign, While, Return, ExprStmt, ForLoop, Comment, ParFor, 
-                       Var, Tuple, Index, Attribute, Const, PrimCall, Struct, Alloc, Cast,  
-                       TupleProj, Slice, ArrayView, Call, TypedFn,  AllocArray, Len, UntypedFn,  
-                       Map, Reduce) 
+from .. syntax import Expr 
+from .. syntax.dispatch_table import DispatchTable, find_handler
 
 transform_timings = {}
 transform_counts = {}
@@ -24,6 +22,9 @@ if config.print_transform_timings:
   atexit.register(print_timings)
 
 class Transform(Builder):
+  __metaclass__ = DispatchTable
+  _dispatch_prefixes = ("transform_", "transform_lhs_")
+
   def __init__(self, verify=config.opt_verify,
                      reverse=False,
                      require_types=True):
@@ -71,11 +72,11 @@ class Transform(Builder):
 
   def find_method(self, expr, prefix = "transform_"):
     assert expr, "Expected expression but got %s" % expr 
-    method_name = prefix + expr.__class__.__name__
-    if hasattr(self, method_name):
-      return getattr(self, method_name)
-    else:
+    fn = find_handler(self.__class__, prefix, expr.__class__)
+    if fn is None:
       return None
+    else:
+      return fn.__get__(self, self.__class__)
 
   """
   Common cases for expression transforms: we don't need to create a method for
@@ -268,52 +269,12 @@ class Transform(Builder):
     """Dispatch on the node type and call the appropriate transform method"""
 
     expr_class = expr.__class__
-    if expr_class is Var:
-      result = self.transform_Var(expr)
-    elif expr_class is Const:
-      result = self.transform_Const(expr)
-    elif expr_class is Tuple:
-      result = self.transform_Tuple(expr)
-    elif expr_class is TupleProj:
-      result = self.transform_TupleProj(expr)
-    elif expr_class is Index:
-      result = self.transform_Index(expr)
-    elif expr_class is Slice:
-      result = self.transform_Slice(expr)
-    elif expr_class is Attribute:
-      result = self.transform_Attribute(expr)
-    elif expr_class is PrimCall:
-      result = self.transform_PrimCall(expr)
-    elif expr_class is Struct:
-      result = self.transform_Struct(expr)
-    elif expr_class is AllocArray:
-      result = self.transform_AllocArray(expr)
-    elif expr_class is Alloc:
-      result = self.transform_Alloc(expr)
-    elif expr_class is Cast:
-      result = self.transform_Cast(expr)
-    elif expr_class is ArrayView:
-      result = self.transform_ArrayView(expr)
-    elif expr_class is TypedFn:
-      result = self.transform_TypedFn(expr)
-    elif expr_class is UntypedFn:
-      result = self.transform_UntypedFn(expr)
-    elif expr_class is Call:
-      result = self.transform_Call(expr)
-    elif expr_class is Map:
-      result = self.transform_Map(expr)
-    elif expr_class is Reduce:
-      result = self.transform_Reduce(expr)
-    elif expr_class is Len:
-      result = self.transform_Len(expr)
-    else:
-      method = self.find_method(expr, "transform_")
-      if method:
-        result = method(expr)
-
-      else:
-        assert False, "Unsupported expr %s" % (expr,)
-        result = self.transform_generic_expr(expr)
+    try:
+      method = self._transform_methods[expr_class]
+    except KeyError:
+      method = find_handler(self.__class__, "transform_", expr_class)
+    assert method is not None, "Unsupported expr %s" % (expr,)
+    result = method(self, expr)
     if result is None:
       return expr 
     else:
@@ -341,22 +302,14 @@ class Transform(Builder):
     """
 
     lhs_class = lhs.__class__
-    if lhs_class is Var:
-      return self.transform_lhs_Var(lhs)
-    elif lhs_class is Tuple:
-      return self.transform_lhs_Tuple(lhs)
-    elif lhs_class is Index:
-      return self.transform_lhs_Index(lhs)
-    elif lhs_class is Attribute:
-      return self.transform_lhs_Attribute(lhs)
-
-    lhs_method = self.find_method(lhs, prefix = "transform_lhs_")
-    if lhs_method:
-      return lhs_method(lhs)
-
-    method = self.find_method(lhs, prefix = "transform_")
+    try:
+      method = self._transform_lhs_methods[lhs_class]
+    except KeyError:
+      method = find_handler(self.__class__, "transform_lhs_", lhs_class)
+    if method is None:
+      method = find_handler(self.__class__, "transform_", lhs_class)
     assert method, "Unknown expression of type %s" % lhs_class
-    return method(lhs)
+    return method(self, lhs)
 
   def transform_expr_list(self, exprs):
     return [self.transform_expr(e) for e in exprs]
@@ -426,26 +379,13 @@ class Transform(Builder):
     return stmt 
   
   def transform_stmt(self, stmt):
-    
     stmt_class = stmt.__class__
-    if stmt_class is Assign:
-      return self.transform_Assign(stmt)
-    elif stmt_class is ForLoop:
-      return self.transform_ForLoop(stmt)
-    elif stmt_class is While:
-      return self.transform_While(stmt)
-    elif stmt_class is If:
-      return self.transform_If(stmt)
-    elif stmt_class is Return:
-      return self.transform_Return(stmt)
-    elif stmt_class is ExprStmt:
-      return self.transform_ExprStmt(stmt)
-    elif stmt_class is ParFor:
-      return self.transform_ParFor(stmt)
-    elif stmt_class is Comment:
-      return self.transform_Comment(stmt)
-    else:
-      assert False, "Unexpected statement %s" % stmt_class
+    try:
+      method = self._transform_methods[stmt_class]
+    except KeyError:
+      method = find_handler(self.__class__, "transform_", stmt_class)
+    assert method is not None, "Unexpected statement %s" % stmt_class
+    return method(self, stmt)
 
   def transform_block(self, stmts):
     
@@ -0,0 +1,54 @@
+from .. import names
+from ..ndtypes import ArrayT, NoneType, make_fn_type
+from ..syntax import Assign, IndexMap, Map, OuterMap, Return, Var
+from ..syntax.typed_fn import TransformHistory
+from ..syntax.helpers import none, slice_none
+
+from clone_function import CloneFunction
+
+class WriteToOutput(CloneFunction):
+  """
+  Copy a function which returns an array into a version which takes an extra
+  output argument, writes the value it would have returned into that array
+  and returns nothing.
+
+  When the returned array comes straight out of an adverb which knows how to
+  write to a given location, the adverb writes directly into the output and
+  the allocation of the result disappears.
+  """
+
+  def __init__(self):
+    CloneFunction.__init__(self, rename = True)
+
+  def pre_apply(self, old_fn):
+    output_t = old_fn.return_type
+    assert output_t.__class__ is ArrayT, \
+      "Can only write results into an output array, not %s" % output_t
+    new_fn = CloneFunction.pre_apply(self, old_fn)
+    output_name = names.fresh("output")
+    new_fn.arg_names = tuple(new_fn.arg_names) + (output_name,)
+    new_fn.input_types = new_fn.input_types + (output_t,)
+    new_fn.return_type = NoneType
+    new_fn.type = make_fn_type(new_fn.input_types, NoneType)
+    new_fn.type_env[output_name] = output_t
+    # keep the phases which already ran from running again, since 
+    # Simplify would pull the adverb back out of the output assignment 
+    new_fn.transform_history = TransformHistory(old_fn.transform_history.transforms)
+    self.output = Var(output_name, type = output_t)
+    return new_fn
+
+  def transform_Return(self, stmt):
+    value = self.transform_expr(stmt.value)
+    block = self.blocks.top()
+    if value.__class__ is Var and len(block) > 0:
+      # in SSA form nothing else can use a value
+      # which gets assigned right before it's returned
+      prev = block[-1]
+      if prev.__class__ is Assign and prev.lhs.__class__ is Var and \
+         prev.lhs.name == value.name and \
+         prev.rhs.__class__ in (Map, OuterMap, IndexMap):
+        block.pop()
+        value = prev.rhs
+    full_slice = [slice_none] * self.output.type.rank
+    self.setidx(self.output, full_slice, value)
+    return Return(none)
@@ -1,6 +1,8 @@
 from itertools import izip 
 
 from .. import config, names,  prims, syntax
+from .. caches import LRUCache
+from .. profiling import timed
 
 from ..builder import mk_prim_fn 
 from ..ndtypes import (Type, 
@@ -33,7 +35,7 @@ class TypeInferenceError(Exception):
     self.msg = msg
     self.expr = expr 
 
-_invoke_type_cache = {}
+_invoke_type_cache = LRUCache("invoke result types")
 def invoke_result_type(fn, arg_types):
   if fn.__class__ is TypedFn:
     assert isinstance(arg_types, (list, tuple))
@@ -515,7 +517,8 @@ def specialize(fn, arg_types, return_type = None):
   
   full_arg_types = arg_types.prepend_positional(closure_t.arg_types)
   fundef = _get_fundef(closure_t.fn)
-  typed =  _specialize(fundef, full_arg_types, return_type)
+  with timed("type_inference", fundef.name, types = full_arg_types):
+    typed =  _specialize(fundef, full_arg_types, return_type)
   closure_t.specializations[key] = typed
 
   if config.print_specialized_function:
@@ -611,7 +614,11 @@ def specialize_Scan(map_fn, combine_fn, emit_fn, array_types, axes,  init_type =
       specialize_Reduce(map_fn, combine_fn, array_types, axes, init_type)
   typed_emit_fn = specialize(emit_fn, [acc_type])
   elt_result_t = typed_emit_fn.return_type
-  result_t = increase_adverb_output_rank(array_types, axes, elt_result_t)
+  if all(axis is None for axis in axes):
+    # scanning across all the elements flattens them, like np.cumsum 
+    result_t = array_type.increase_rank(elt_result_t, 1)
+  else:
+    result_t = increase_adverb_output_rank(array_types, axes, elt_result_t)
   return result_t, typed_map_fn, typed_combine_fn, typed_emit_fn
 
 def specialize_OuterMap(fn, array_types, axes):
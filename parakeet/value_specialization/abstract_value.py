@@ -47,7 +47,7 @@ class Array(AbstractValue):
   # mark known strides with integer constants 
   # and all others as unknown
   
-  __slots__ = ['strides', 'shape', 'offset' '_hash']
+  __slots__ = ['strides', 'shape', 'offset', '_hash']
   
   def __init__(self, strides, shape = unknown, offset = unknown):
     self.strides = strides
@@ -56,14 +56,19 @@ class Array(AbstractValue):
     self._hash = hash(self.shape) + hash(self.offset) + hash(self.strides.elts) + 1
   
   def __str__(self):
-    return "Array(strides = %s)" % self.strides
+    # the string gets used to name specialized functions, so it has 
+    # to include everything which affects the specialized code  
+    return "Array(strides = %s, shape = %s, offset = %s)" % \
+      (self.strides, self.shape, self.offset)
   
   def __hash__(self):
     return self._hash 
   
   def __eq__(self, other):
     return other.__class__ is Array and \
-      self.strides == other.strides
+      self.strides == other.strides and \
+      self.shape == other.shape and \
+      self.offset == other.offset 
 
 
 class Struct(AbstractValue):
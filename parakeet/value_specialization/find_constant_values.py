@@ -1,6 +1,7 @@
 
 import numpy as np 
 
+from .. caches import LRUCache
 from .. ndtypes import ArrayT, TupleT   
 from .. syntax import TypedFn, Var
 from ..analysis import SyntaxVisitor
@@ -17,7 +18,7 @@ def bind_list(arg_names, abstract_values):
     env[name] = abstract_value
   return env 
 
-_cache = {}
+_cache = LRUCache("constant values")
 def symbolic_call(fn, symbolic_inputs):
   key = fn.cache_key, tuple(symbolic_inputs)
   if key in _cache:
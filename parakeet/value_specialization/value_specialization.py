@@ -2,6 +2,8 @@ import numpy as np
 from numpy import ndarray 
 
 from .. import syntax 
+from .. caches import LRUCache
+from .. profiling import mark, timed
 from .. syntax.helpers import const 
 from ..transforms  import Transform, Simplify, Phase, DCE 
 
@@ -114,19 +116,21 @@ def from_python(python_value):
 def from_python_list(python_values):
   return tuple([from_python(v) for v in python_values]) 
 
-_cache = {}
+_cache = LRUCache("value specializations")
 def specialize_abstract_values(fn, abstract_values):
   key = (fn.cache_key, abstract_values)
   if key in _cache:
+    mark("value_specialization", fn.name, cached = True)
     return _cache[key]
   if any(has_small_const(v) for v in abstract_values):
-    specializer = ValueSpecializer(abstract_values)
-    transforms = Phase([specializer, Simplify, DCE],
-                        memoize = False, 
-                        copy = True, 
-                        name = "StrideSpecialization for %s" % (abstract_values,), 
-                        recursive = False)
-    new_fn = transforms.apply(fn)
+    with timed("value_specialization", fn.name, values = abstract_values):
+      specializer = ValueSpecializer(abstract_values)
+      transforms = Phase([specializer, Simplify, DCE],
+                          memoize = False, 
+                          copy = True, 
+                          name = "StrideSpecialization for %s" % (abstract_values,), 
+                          recursive = False)
+      new_fn = transforms.apply(fn)
   else:
     new_fn = fn
   _cache[key] = new_fn
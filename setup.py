@@ -37,6 +37,9 @@ setup(
                   'parakeet.test' : './test',
                   'parakeet.examples' : './examples', 
                 },
+    entry_points={
+      'console_scripts' : ['parakeet-cache = parakeet.c_backend.disk_cache:main'],
+    },
     install_requires=[
       'numpy>=1.7',       
       'dsltools',
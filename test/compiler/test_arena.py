@@ -0,0 +1,107 @@
+import numpy as np
+
+import parakeet
+from parakeet import jit, specialize, c_backend
+from parakeet.c_backend import config as c_config
+from parakeet.c_backend.prepare_args import prepare_args
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def compiled_source(fn, args):
+  typed_fn, linear_args = specialize(fn, args)
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  return c_backend.compile_entry(typed_fn, linear_args).src
+
+def temp_sum(x):
+  y = x + 1
+  y[0] = 3.0
+  return np.sum(y)
+
+def loop_temps(x, n):
+  total = 0.0
+  for i in range(n):
+    y = x * i
+    y[1] = 0
+    total += np.sum(y)
+  return total
+
+x = np.arange(100, dtype = 'float64')
+
+def test_temporaries_use_arena():
+  assert "parakeet_arena_alloc(" in compiled_source(temp_sum, [x])
+  assert "parakeet_arena_alloc(" in compiled_source(loop_temps, [x, 3])
+
+def test_temporaries_results():
+  f = jit(temp_sum)
+  g = jit(loop_temps)
+  y = x + 1
+  y[0] = 3.0
+  for _ in xrange(100):
+    expect_eq(f(x), np.sum(y))
+  expected = sum(np.sum(np.where(np.arange(100) == 1, 0, x * i)) for i in range(5))
+  for _ in xrange(100):
+    expect_eq(g(x, 5), expected)
+
+def test_large_temporaries():
+  # bigger than a single chunk of the pool
+  f = jit(temp_sum)
+  big = np.random.randn(c_config.arena_chunk_bytes / 4)
+  y = big + 1
+  y[0] = 3.0
+  expect_eq(f(big), np.sum(y))
+  expect_eq(f(x), np.sum(x + 1) - 1 + 3.0)
+
+def add_one(x):
+  return x + 1
+
+def test_returned_arrays_survive():
+  f = jit(add_one)
+  results = [f(x * i) for i in xrange(50)]
+  for i, result in enumerate(results):
+    expect_eq(result, x * i + 1)
+
+def same_array_twice(x):
+  y = x * 2
+  return y, y
+
+def test_shared_buffer_returned_twice():
+  f = jit(same_array_twice)
+  for _ in xrange(10):
+    a, b = f(x)
+    del a 
+    expect_eq(b, x * 2)
+
+def loop_temps_without_arena(x, n):
+  total = 0.0
+  for i in range(n):
+    y = x * i
+    y[1] = 0
+    total += np.sum(y)
+  return total
+
+def test_arena_disabled():
+  # compiled code is cached in memory without regard to the config, 
+  # so use a function which isn't compiled anywhere else 
+  old_value = c_config.arena_allocation
+  c_config.arena_allocation = False
+  try:
+    src = compiled_source(loop_temps_without_arena, [x, 2])
+    assert "parakeet_arena_alloc(" not in src, \
+      "Didn't expect memory pool to be used when it's disabled"
+  finally:
+    c_config.arena_allocation = old_value
+
+def row_temp(row):
+  y = row * 2
+  return np.sum(y[::-1] * row)
+
+def row_sums(m):
+  return parakeet.each(row_temp, m)
+
+def test_parallel_temporaries():
+  m = np.random.randn(50, 30)
+  expected = np.array([row_temp(r) for r in m])
+  for backend in ('c', 'openmp'):
+    expect_eq(jit(row_sums)(m, _backend = backend), expected)
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,71 @@
+import gc
+import weakref
+
+import numpy as np
+
+import parakeet
+from parakeet import config, jit
+from parakeet.caches import LRUCache
+from parakeet.frontend import ast_conversion
+from parakeet.frontend.run_function import specialize
+from parakeet.syntax.typed_fn import TransformHistory
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def test_lru_eviction():
+  cache = LRUCache("test lru", max_entries = 4)
+  for i in xrange(4):
+    cache[i] = str(i)
+  # using the first entry keeps it around
+  assert cache[0] == "0"
+  cache[4] = "4"
+  assert len(cache) <= 4, cache.items()
+  assert 0 in cache and 4 in cache, cache.items()
+  assert 1 not in cache
+  assert cache.evictions > 0
+  expect_eq(cache.hits, 1)
+
+def test_mutated_keys_dropped():
+  cache = LRUCache("test mutated keys")
+  history = TransformHistory()
+  cache["a"] = 1
+  cache[("f", history)] = 2
+  cache["b"] = 3
+  history.add("SomePhase")
+  # only "a" is old enough, the other entry goes since it can't be found
+  cache.evict(1)
+  assert cache.keys() == ["b"], cache.keys()
+
+def cached_scale(x):
+  return x * 3 + 1
+
+def test_clear_caches_frees_functions():
+  persistent = config.persistent_cache
+  config.persistent_cache = False
+  try:
+    f = jit(cached_scale)
+    x = np.arange(4.0)
+    expect_eq(f(x), x * 3 + 1)
+    untyped = ast_conversion.translate_function_value(cached_scale)
+    typed_fn, _ = specialize(untyped, [x])
+    ref = weakref.ref(typed_fn)
+    del typed_fn
+    parakeet.clear_caches()
+    gc.collect()
+    assert ref() is None, "Expected typed function to be freed"
+    stats = parakeet.cache_stats(memory = False)
+    expect_eq(stats["closure specializations"]["entries"], 0)
+    expect_eq(f(x), x * 3 + 1)
+  finally:
+    config.persistent_cache = persistent
+
+def test_cache_stats():
+  jit(cached_scale)(np.arange(3))
+  stats = parakeet.cache_stats()
+  for name in ("translated functions", "value specializations"):
+    assert name in stats, stats.keys()
+    assert stats[name]["entries"] > 0
+    assert stats[name]["bytes"] > 0
+    expect_eq(stats[name]["limit"], config.max_cache_entries)
+
+if __name__ == '__main__':
+  run_local_tests()
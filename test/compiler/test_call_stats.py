@@ -0,0 +1,88 @@
+import numpy as np
+
+import parakeet
+from parakeet import jit
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def without_persistent_cache(f, *args, **kwargs):
+  # entry points compiled by earlier runs would get counted as
+  # persistent hits instead of misses
+  persistent = parakeet.config.persistent_cache
+  parakeet.config.persistent_cache = False
+  try:
+    return f(*args, **kwargs)
+  finally:
+    parakeet.config.persistent_cache = persistent
+
+def with_stats(f, *args, **kwargs):
+  collect_stats = parakeet.config.collect_stats
+  parakeet.config.collect_stats = True
+  try:
+    return without_persistent_cache(f, *args, **kwargs)
+  finally:
+    parakeet.config.collect_stats = collect_stats
+
+def fn_stats(f):
+  return parakeet.stats()["%s.%s" % (__name__, f.fn.__name__)]
+
+def stats_add(x, y):
+  return x + y
+
+def test_hits_and_entry_counters():
+  f = jit(stats_add)
+  x = np.arange(10.0)
+  for _ in xrange(4):
+    with_stats(f, x, x)
+  stats = fn_stats(f)
+  expect_eq(stats['misses'], 1)
+  expect_eq(stats['hits'], 3)
+  assert stats['compile_time'] > 0
+  specializations = stats['specializations']
+  expect_eq(len(specializations), 1)
+  counts = specializations.values()[0]
+  expect_eq(counts['calls'], 3)
+  assert counts['time'] > 0
+  entry = counts['entry']
+  expect_eq(entry['calls'], 4)
+  for field in ('unbox', 'body', 'box'):
+    assert entry[field] >= 0, entry
+  expect_eq(entry['nogil'], 0.0)
+
+def stats_scale(x):
+  return x * 2
+
+def test_missed_signatures():
+  f = jit(stats_scale)
+  # lists have no cheap signature, so every call goes through the compiler
+  for _ in xrange(3):
+    f([1, 2, 3])
+  without_persistent_cache(f, np.arange(3.0))
+  stats = fn_stats(f)
+  expect_eq(stats['misses'], 4)
+  missed = stats['missed_signatures']
+  expect_eq(len(missed), 2)
+  expect_eq(sorted(missed.values()), [1, 3])
+  # without collect_stats calls served from the dispatch table aren't counted
+  without_persistent_cache(f, np.arange(3.0))
+  expect_eq(fn_stats(f)['hits'], 0)
+
+def stats_sum(x):
+  return np.sum(x)
+
+def test_openmp_nogil():
+  f = jit(stats_sum)
+  x = np.arange(1000.0)
+  expect_eq(with_stats(f, x, _backend = 'openmp'), np.sum(x))
+  entry = fn_stats(f)['specializations'].values()[0]['entry']
+  expect_eq(entry['calls'], 1)
+  assert entry['nogil'] > 0, entry
+
+def stats_never_called(x):
+  return x
+
+def test_uncalled_functions_left_out():
+  f = jit(stats_never_called)
+  assert "%s.stats_never_called" % __name__ not in parakeet.stats()
+
+if __name__ == '__main__':
+  run_local_tests()
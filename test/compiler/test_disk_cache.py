@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from parakeet import jit
+from parakeet.c_backend import config as c_config, disk_cache, prelude
+from parakeet.c_backend.system_info import shared_extension
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+class temp_cache_dir(object):
+  def __enter__(self):
+    self.old_dir = c_config.cache_dir
+    self.old_max_bytes = c_config.cache_max_bytes
+    self.old_pch = c_config.precompiled_headers
+    c_config.cache_dir = tempfile.mkdtemp(prefix = "parakeet_cache_test")
+    return c_config.cache_dir
+
+  def __exit__(self, *exc_info):
+    shutil.rmtree(c_config.cache_dir)
+    c_config.cache_dir = self.old_dir
+    c_config.cache_max_bytes = self.old_max_bytes
+    c_config.precompiled_headers = self.old_pch
+    prelude._dirs.clear()
+    return False
+
+def slow_build(cache_dir):
+  c_config.cache_dir = cache_dir
+  built = []
+  def build():
+    # take long enough that every process misses before the first is done
+    time.sleep(0.5)
+    f = tempfile.NamedTemporaryFile(suffix = shared_extension, delete = False)
+    f.write("x" * 1000)
+    f.close()
+    built.append(f.name)
+    return f.name
+  cached_name = disk_cache.module_filename("slow_build", "abc")
+  filename, cached = disk_cache.fetch_or_build(cached_name, build)
+  with open(filename) as f:
+    size = len(f.read())
+  return (len(built), cached, size)
+
+def test_single_builder_across_processes():
+  with temp_cache_dir() as d:
+    pool = Pool(6)
+    try:
+      results = pool.map(slow_build, [d] * 6)
+    finally:
+      pool.close()
+      pool.join()
+    expect_eq(sum(n_built for (n_built, _, _) in results), 1)
+    expect_eq(sum(1 for (_, cached, _) in results if not cached), 1)
+    for (_, _, size) in results:
+      expect_eq(size, 1000)
+    leftovers = [name for name in os.listdir(d) if name.endswith(".tmp")]
+    expect_eq(leftovers, [])
+
+def fake_module(name, size, age):
+  filename = disk_cache.module_filename(name, "0")
+  with open(filename, 'w') as f:
+    f.write("x" * size)
+  t = time.time() - age
+  os.utime(filename, (t, t))
+  return filename
+
+def test_prune_least_recently_used():
+  with temp_cache_dir():
+    oldest = fake_module("oldest", 100, 300)
+    old = fake_module("old", 100, 200)
+    recent = fake_module("recent", 100, 100)
+    # using a module makes it the most recently used one
+    disk_cache.touch(oldest)
+    expect_eq(disk_cache.prune(250), 100)
+    assert os.path.exists(oldest) and os.path.exists(recent)
+    assert not os.path.exists(old)
+    expect_eq(disk_cache.stats()['modules'], 2)
+    expect_eq(disk_cache.main(['prune', '0']), 0)
+    expect_eq(disk_cache.cached_modules(), [])
+
+def test_cache_command():
+  with temp_cache_dir():
+    fake_module("listed", 10, 0)
+    expect_eq(disk_cache.main(['list']), 0)
+    expect_eq(disk_cache.main(['stats']), 0)
+    expect_eq(disk_cache.main(['frobnicate']), 2)
+
+def cached_axpy(a, x, y):
+  return a * x + y
+
+def test_compiled_modules_get_cached():
+  with temp_cache_dir() as d:
+    x = np.arange(10.0)
+    expect_eq(jit(cached_axpy)(2.0, x, x), 3 * x)
+    names = [name for name in os.listdir(d) if name.endswith(shared_extension)]
+    assert len(names) > 0, "Expected compiled module in %s" % d
+    # everything but the module itself stays under the cap
+    c_config.cache_max_bytes = 0
+    expect_eq(jit(cached_axpy)(2, x, x), 3 * x)
+    expect_eq(len(disk_cache.cached_modules()), 1)
+
+def cached_scale(x):
+  return x * 3.5
+
+def test_precompiled_prelude():
+  x = np.arange(10.0)
+  for precompiled in (False, True):
+    with temp_cache_dir() as d:
+      c_config.precompiled_headers = precompiled
+      compiled = jit(cached_scale)
+      expect_eq(compiled(x), x * 3.5)
+      (_, compiled_fn) = compiled.call_stats.compiled.values()[0]
+      uses_prelude = compiled_fn.src.startswith('#include "parakeet_prelude_')
+      expect_eq(uses_prelude, precompiled)
+      expect_eq(os.path.exists(os.path.join(d, "pch")), precompiled)
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,48 @@
+import numpy as np 
+
+from parakeet import jit 
+from parakeet.testing_helpers import run_local_tests, expect_eq 
+
+def add(x, y, z = 1):
+  return x + y + z 
+
+def test_dispatch_scalars():
+  f = jit(add)
+  for (x,y) in [(3, 4.0), (0, 1), (1, 0), (True, 2), (np.float32(2), 5)]:
+    expect_eq(f(x,y), add(x,y))
+    # second call should hit the dispatch table 
+    expect_eq(f(x,y), add(x,y))
+  assert len(f._dispatch) == 5, "Expected 5 dispatch entries, got %d" % len(f._dispatch)
+
+def test_dispatch_keywords():
+  f = jit(add)
+  expect_eq(f(1.5, 2.5), add(1.5, 2.5))
+  expect_eq(f(1.5, 2.5, z = 3), add(1.5, 2.5, z = 3))
+  expect_eq(f(1.5, y = 2.5), add(1.5, y = 2.5))
+  expect_eq(f(z = 10, y = 2.5, x = 1.5), add(1.5, 2.5, 10))
+  expect_eq(f(z = 10, y = 2.5, x = 1.5), add(1.5, 2.5, 10))
+
+def test_dispatch_strides():
+  f = jit(add)
+  x = np.arange(12, dtype='float64')
+  for v in [x, x[::2], x[::-1], x.reshape(3,4)[:, 1], x[:1], x[:0]]:
+    expect_eq(f(v, v), add(v, v))
+    expect_eq(f(v, v), add(v, v))
+  y = np.arange(12, dtype='int32').reshape(3,4)
+  for v in [y, y.T, y[:, ::2], y[:1, :]]:
+    expect_eq(f(v, v, 0), add(v, v, 0))
+    expect_eq(f(v, v, 0), add(v, v, 0))
+
+def first_minus_min(x):
+  return x[0] - np.min(x)
+
+def test_dispatch_small_shapes():
+  # a length-1 array gets a specialization with the loop removed, 
+  # which mustn't be reused for longer arrays 
+  f = jit(first_minus_min)
+  for n in [1, 2, 3, 15]:
+    x = np.random.randn(n)
+    expect_eq(f(x), first_minus_min(x))
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,45 @@
+from parakeet.analysis.syntax_visitor import SyntaxVisitor
+from parakeet.syntax import Const, Expr, Tuple, Var
+from parakeet.testing_helpers import run_local_tests, expect_eq
+from parakeet.transforms.transform import Transform
+
+class RenameVars(Transform):
+  def transform_Var(self, expr):
+    return Var(expr.name + "_renamed", type = expr.type)
+
+def test_transform_table():
+  assert RenameVars._transform_methods[Var] is RenameVars.__dict__['transform_Var']
+  # subclasses don't share their tables with the base class
+  assert Transform._transform_methods[Var] is Transform.__dict__['transform_Var']
+
+def test_transform_dispatch():
+  result = RenameVars().transform_expr(Tuple((Var("x"), Const(1))))
+  assert result.elts[0].name == "x_renamed", result.elts[0].name
+  expect_eq(result.elts[1].value, 1)
+
+class CollectNames(SyntaxVisitor):
+  def __init__(self):
+    SyntaxVisitor.__init__(self)
+    self.names = []
+
+  def visit_Var(self, expr):
+    self.names.append(expr.name)
+
+class Wrapper(Expr):
+  """
+  Node class defined after the visitors
+  """
+  __slots__ = ('value',)
+
+  def children(self):
+    yield self.value
+
+def test_node_defined_later():
+  assert Wrapper not in CollectNames._visit_methods
+  visitor = CollectNames()
+  visitor.visit_expr(Wrapper(Var("y")))
+  assert visitor.names == ["y"], visitor.names
+  assert CollectNames._visit_methods[Wrapper] is None
+
+if __name__ == '__main__':
+  run_local_tests()
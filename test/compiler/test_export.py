@@ -0,0 +1,46 @@
+import imp
+import shutil
+import tempfile
+
+import numpy as np 
+
+import parakeet 
+from parakeet import jit, Float64, Int64, make_array_type
+from parakeet.testing_helpers import run_local_tests, expect_eq 
+
+def axpy(a, x, y):
+  return a * x + y 
+
+def total(x):
+  return sum(x)
+
+def test_export():
+  output_dir = tempfile.mkdtemp()
+  try:
+    vec_t = make_array_type(Float64, 1)
+    mat_t = make_array_type(Float64, 2)
+    shim = parakeet.export("exported_kernels", 
+                           [(jit(axpy), [Float64, vec_t, vec_t], [Int64, vec_t, vec_t]), 
+                            (total, [vec_t], [mat_t])], 
+                           output_dir = output_dir)
+    m = imp.load_source("exported_kernels", shim)
+    x = np.arange(10, dtype = 'float64')
+    y = np.ones(10)
+    expect_eq(m.axpy(3.0, x, y), axpy(3.0, x, y))
+    expect_eq(m.axpy(3, x, y), axpy(3, x, y))
+    # not specialized for unit strides, so views have to work too 
+    expect_eq(m.axpy(3, x[::2], y[::2]), axpy(3, x[::2], y[::2]))
+    expect_eq(m.total(x), np.sum(x))
+    z = np.arange(12.0).reshape(3,4)
+    expect_eq(m.total(z), np.sum(z, axis = 0))
+    try:
+      m.total(np.arange(10))
+    except TypeError:
+      pass 
+    else:
+      assert False, "Expected TypeError for a signature which wasn't exported"
+  finally:
+    shutil.rmtree(output_dir)
+
+if __name__ == '__main__':
+  run_local_tests()
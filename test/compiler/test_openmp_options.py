@@ -0,0 +1,85 @@
+import numpy as np
+
+import parakeet
+from parakeet import jit, openmp_backend, specialize
+from parakeet.c_backend.prepare_args import prepare_args
+from parakeet.openmp_backend import config as openmp_config
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def collatz_len(a0):
+  a = a0
+  length = 0
+  while a != 1:
+    a = (a if a % 2 == 0 else 3 * a + 1) / 2
+    length += 1
+  return length
+
+def collatz_lengths(xs):
+  return parakeet.each(collatz_len, xs)
+
+xs = np.arange(1, 2000)
+expected = np.array([collatz_len(x) for x in xs])
+
+def test_runtime_schedule_in_source():
+  typed_fn, linear_args = specialize(collatz_lengths, [xs])
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  src = openmp_backend.compile_entry(typed_fn, linear_args).src
+  assert "schedule(runtime)" in src, \
+    "Expected parallel loops to take their schedule from the OpenMP runtime"
+
+def test_options_per_call():
+  f = jit(collatz_lengths)
+  expect_eq(f(xs, _backend = 'openmp'), expected)
+  for num_threads in (1, 2, 3):
+    for schedule in ('static', 'dynamic', 'guided', 'auto'):
+      for chunk_size in (None, 1, 64):
+        result = f(xs, _backend = 'openmp', _num_threads = num_threads,
+                   _schedule = schedule, _chunk_size = chunk_size)
+        expect_eq(result, expected)
+  assert len(f._dispatch) == 1, \
+    "Changing OpenMP options shouldn't require recompiling"
+
+def test_options_per_jit():
+  f = jit(collatz_lengths, num_threads = 3, schedule = 'dynamic', chunk_size = 16)
+  expect_eq(f(xs, _backend = 'openmp'), expected)
+  # the OpenMP settings stick to the calling thread until the next call changes them
+  old_options = openmp_backend.set_options()
+  assert old_options == (3, 'dynamic', 16), "Unexpected OpenMP settings %s" % (old_options,)
+
+  # per-call keywords take precedence over the jit's own settings
+  expect_eq(f(xs, _backend = 'openmp', _num_threads = 2), expected)
+  old_options = openmp_backend.set_options()
+  assert old_options == (2, 'dynamic', 16), "Unexpected OpenMP settings %s" % (old_options,)
+
+def test_config_defaults():
+  f = jit(collatz_lengths)
+  old_schedule = openmp_config.schedule
+  openmp_config.schedule = 'guided'
+  try:
+    expect_eq(f(xs, _backend = 'openmp'), expected)
+    _, schedule, _ = openmp_backend.set_options()
+    assert schedule == 'guided', "Expected configured schedule, got %s" % schedule
+  finally:
+    openmp_config.schedule = old_schedule
+
+def test_bad_schedule():
+  f = jit(collatz_lengths)
+  try:
+    f(xs, _backend = 'openmp', _schedule = 'round-robin')
+  except AssertionError:
+    pass
+  else:
+    assert False, "Expected unknown schedule to be rejected"
+
+def reduce_min(x):
+  return parakeet.reduce(parakeet.minimum, x)
+
+def test_parallel_reduce_thread_count():
+  # the number of partial results follows the thread count at runtime
+  f = jit(reduce_min)
+  x = np.random.randn(1001)
+  for num_threads in (1, 2, 5):
+    expect_eq(f(x, _backend = 'openmp', _num_threads = num_threads), x.min())
+
+if __name__ == '__main__':
+  run_local_tests()
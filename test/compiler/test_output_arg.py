@@ -0,0 +1,162 @@
+import numpy as np
+
+import parakeet
+from parakeet import jit
+from parakeet.frontend.run_function import specialize
+from parakeet.testing_helpers import run_local_tests, expect_eq
+from parakeet.transforms import pipeline
+
+def scale_and_shift(x, a, b):
+  return x * a + b
+
+def test_out_1d():
+  f = jit(scale_and_shift)
+  x = np.arange(10.0)
+  out = np.empty_like(x)
+  result = f(x, 2.0, 1.5, _out = out)
+  assert result is out, "Expected the output array to be returned"
+  expect_eq(out, x * 2.0 + 1.5)
+  # the second call goes through the output dispatch table
+  result = f(x, 3.0, 0.5, _out = out)
+  expect_eq(out, x * 3.0 + 0.5)
+  assert len(f._output_dispatch) == 1
+  assert f._output_dispatch.values()[0] is not None
+
+def test_out_2d_strided():
+  f = jit(scale_and_shift)
+  x = np.arange(20.0).reshape(4, 5)
+  out = np.zeros((5, 4)).T
+  f(x, -1.0, 2.0, _out = out)
+  expect_eq(out, x * -1.0 + 2.0)
+
+def test_no_result_alloc():
+  x = np.arange(12.0).reshape(3, 4)
+  typed_fn, _ = specialize(scale_and_shift, (x, 2.0, 1.0))
+  output_fn = pipeline.with_output_arg(typed_fn)
+  indexified = pipeline.optimize_indexified_code.apply(output_fn)
+  assert "AllocArray" not in repr(indexified), \
+    "Expected result to be written directly into the output: %s" % indexified
+
+def add_pairs(x, y):
+  return parakeet.outer_map(lambda a, b: a + b, x, y)
+
+def test_out_outer_map():
+  f = jit(add_pairs)
+  x = np.arange(3.0)
+  y = np.arange(4.0)
+  out = np.empty((3, 4))
+  f(x, y, _out = out)
+  expect_eq(out, np.add.outer(x, y))
+
+def sign_dependent(x):
+  if x[0] > 0:
+    return x + 1
+  else:
+    return x - 1
+
+def test_out_branches():
+  f = jit(sign_dependent)
+  out = np.empty(4)
+  x = np.arange(1.0, 5.0)
+  f(x, _out = out)
+  expect_eq(out, x + 1)
+  f(-x, _out = out)
+  expect_eq(out, -x - 1)
+
+def add_reversed(x):
+  return x + x[::-1]
+
+def test_out_overlaps_input():
+  f = jit(add_reversed)
+  x = np.arange(5.0)
+  expected = x + x[::-1]
+  f(x, _out = x)
+  expect_eq(x, expected)
+
+def prefix_twice(x, n):
+  return x[:n] * 2
+
+def test_out_unknown_shape():
+  f = jit(prefix_twice)
+  out = np.empty(3)
+  f(np.arange(5.0), 3, _out = out)
+  expect_eq(out, np.arange(3.0) * 2)
+  # the result shape depends on n, so the result gets copied into out
+  assert f._output_dispatch.values() == [None]
+
+def test_out_wrong_shape():
+  f = jit(scale_and_shift)
+  x = np.arange(10.0)
+  try:
+    f(x, 2.0, 1.0, _out = np.empty(9))
+  except ValueError:
+    pass
+  else:
+    assert False, "Expected ValueError for output of the wrong shape"
+
+def test_out_wrong_dtype():
+  f = jit(scale_and_shift)
+  x = np.arange(10.0)
+  try:
+    f(x, 2.0, 1.0, _out = np.empty(10, dtype = 'int64'))
+  except TypeError:
+    pass
+  else:
+    assert False, "Expected TypeError for output of the wrong dtype"
+
+def total(x):
+  return np.sum(x)
+
+def test_out_scalar_result():
+  f = jit(total)
+  try:
+    f(np.arange(10.0), _out = np.empty(1))
+  except TypeError:
+    pass
+  else:
+    assert False, "Expected TypeError for a function which doesn't return an array"
+
+def scale_for_openmp(x, a):
+  return x * a
+
+def test_out_openmp():
+  f = jit(scale_for_openmp)
+  x = np.arange(100.0)
+  out = np.empty(100)
+  f(x, 3.0, _out = out, _backend = 'openmp')
+  expect_eq(out, x * 3.0)
+
+def shift_for_interp(x):
+  return x - 1
+
+def test_out_interp():
+  f = jit(shift_for_interp)
+  x = np.arange(6.0)
+  out = np.empty(6)
+  assert f(x, _out = out, _backend = 'interp') is out
+  expect_eq(out, x - 1)
+
+def ufunc_out(x, y, z):
+  np.add(x, y, out = z)
+  return np.sqrt(z, out = z)
+
+def test_ufunc_out():
+  x = np.arange(6.0).reshape(2, 3)
+  y = np.ones((2, 3))
+  z = np.zeros((2, 3))
+  result = jit(ufunc_out)(x, y, z)
+  expect_eq(z, np.sqrt(x + y))
+  expect_eq(result, np.sqrt(x + y))
+
+def ufunc_out_then_sum(x, z):
+  np.multiply(x, x, out = z)
+  return np.sum(z)
+
+def test_ufunc_out_in_place():
+  x = np.arange(5.0)
+  z = np.zeros(5)
+  expect_eq(jit(ufunc_out_then_sum)(x, z), np.sum(x * x))
+  expect_eq(z, x * x)
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,80 @@
+import numpy as np
+
+import parakeet
+from parakeet import openmp_backend, specialize
+from parakeet.c_backend.prepare_args import prepare_args
+from parakeet.lib import argmax, argmin
+from parakeet.openmp_backend import MulticoreCompiler
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def reduce_min(x):
+  return parakeet.reduce(parakeet.minimum, x)
+
+def reduce_max_2d(x):
+  return parakeet.reduce(parakeet.maximum, x, axis = None)
+
+def compiled_source(fn, args):
+  typed_fn, linear_args = specialize(fn, args)
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  return openmp_backend.compile_entry(typed_fn, linear_args).src
+
+def expect_parallel(fn, args):
+  assert "has_partial" in compiled_source(fn, args), \
+    "Expected %s to use per-thread partial reductions" % fn
+
+def run_openmp(fn, x):
+  return parakeet.run_python_fn(fn, [x], backend = 'openmp')
+
+def check_all(x, reduce_min = reduce_min, argmax = argmax, argmin = argmin):
+  expect_eq(run_openmp(reduce_min, x), np.min(x))
+  expect_eq(run_openmp(argmax, x), np.argmax(x))
+  expect_eq(run_openmp(argmin, x), np.argmin(x))
+
+def test_partial_reductions_used():
+  x = np.random.randn(100)
+  expect_parallel(reduce_min, [x])
+  expect_parallel(argmax.fn, [x])
+
+def test_min_argmax():
+  check_all(np.random.randn(10000))
+
+def test_argmax_ties():
+  # the first occurrence has to win no matter how the chunks are split  
+  x = np.array([1.0, 3.0, 3.0, 2.0, 3.0, 0.0, 3.0])
+  check_all(x)
+  check_all(-x)
+
+def test_min_2d():
+  x = np.random.randn(37, 11)
+  expect_eq(run_openmp(reduce_max_2d, x), np.max(x))
+
+# separate functions so that nothing compiled by other tests gets reused 
+def chunked_min(x):
+  return parakeet.reduce(parakeet.minimum, x)
+
+def chunked_argmax(x):
+  return argmax(x)
+
+def chunked_argmin(x):
+  return argmin(x)
+
+_original_num_cores = MulticoreCompiler.visit_NumCores
+def more_chunks_than_elements(self, expr):
+  return "16"
+
+def test_short_and_empty_chunks():
+  # with more chunks than elements some threads get nothing to reduce
+  MulticoreCompiler.visit_NumCores = more_chunks_than_elements 
+  try:
+    for n in (1, 2, 3, 15, 17, 33):
+      x = np.random.randn(n) 
+      src = compiled_source(chunked_argmax, [x])
+      assert "has_partial" in src and "= 16;" in src, \
+        "Expected reduction to be split into 16 chunks" 
+      check_all(x, chunked_min, chunked_argmax, chunked_argmin)
+      check_all(np.zeros(n), chunked_min, chunked_argmax, chunked_argmin)
+  finally:
+    MulticoreCompiler.visit_NumCores = _original_num_cores
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,79 @@
+import numpy as np
+
+import parakeet
+from parakeet import openmp_backend, specialize
+from parakeet.c_backend.prepare_args import prepare_args
+from parakeet.openmp_backend import MulticoreCompiler
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def cumsum(x):
+  return np.cumsum(x)
+
+def cumprod(x):
+  return np.cumprod(x)
+
+def running_max(x):
+  return parakeet.scan(parakeet.maximum, x, init = -1000.0)
+
+def python_running_max(x):
+  return np.maximum.accumulate(np.concatenate([[-1000.0], x]))[1:]
+
+def compiled_source(fn, args):
+  typed_fn, linear_args = specialize(fn, args)
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  return openmp_backend.compile_entry(typed_fn, linear_args).src
+
+def run_openmp(fn, x):
+  return parakeet.run_python_fn(fn, [x], backend = 'openmp')
+
+def check_all(x):
+  expect_eq(run_openmp(cumsum, x), np.cumsum(x))
+  expect_eq(run_openmp(running_max, x), python_running_max(x))
+  small = x[:20]
+  expect_eq(run_openmp(cumprod, small), np.cumprod(small))
+
+def test_blocked_scan_used():
+  x = np.random.randn(100)
+  for fn in (cumsum, cumprod, running_max):
+    assert "chunk_totals" in compiled_source(fn, [x]), \
+      "Expected %s to use the blocked parallel scan" % fn.__name__
+
+def test_scan_sizes():
+  for n in (10**3, 10**4, 10**5, 10**6):
+    check_all(np.random.randn(n))
+
+def test_scan_ints():
+  x = np.arange(1000)
+  expect_eq(run_openmp(cumsum, x), np.cumsum(x))
+
+def test_scan_2d():
+  # without an axis the elements get flattened first 
+  x = np.arange(12.0).reshape(3, 4)
+  expect_eq(run_openmp(cumsum, x), np.cumsum(x))
+
+# separate functions so that nothing compiled by other tests gets reused 
+def chunked_cumsum(x):
+  return np.cumsum(x)
+
+def chunked_running_max(x):
+  return parakeet.scan(parakeet.maximum, x, init = -1000.0)
+
+_original_num_cores = MulticoreCompiler.visit_NumCores
+def more_chunks_than_elements(self, expr):
+  return "16"
+
+def test_short_and_empty_chunks():
+  MulticoreCompiler.visit_NumCores = more_chunks_than_elements 
+  try:
+    for n in (1, 2, 3, 15, 17, 33, 1000):
+      x = np.random.randn(n)
+      src = compiled_source(chunked_cumsum, [x])
+      assert "chunk_totals" in src and "= 16;" in src, \
+        "Expected scan to be split into 16 chunks" 
+      expect_eq(run_openmp(chunked_cumsum, x), np.cumsum(x))
+      expect_eq(run_openmp(chunked_running_max, x), python_running_max(x))
+  finally:
+    MulticoreCompiler.visit_NumCores = _original_num_cores
+
+if __name__ == '__main__':
+  run_local_tests()
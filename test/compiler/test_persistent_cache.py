@@ -0,0 +1,60 @@
+import numpy as np 
+
+from parakeet import jit 
+from parakeet.frontend import persistent_cache 
+from parakeet.testing_helpers import run_local_tests, expect_eq 
+
+scale = 3 
+offsets = np.arange(4, dtype='float64')
+
+def scaled(x):
+  return x * scale + offsets
+
+def test_fingerprint_stable():
+  assert persistent_cache.fn_fingerprint(scaled) is not None
+  assert persistent_cache.fn_fingerprint(scaled) == persistent_cache.fn_fingerprint(jit(scaled))
+
+def test_fingerprint_sees_globals():
+  global scale 
+  old_fingerprint = persistent_cache.fn_fingerprint(scaled)
+  scale = 4
+  try:
+    new_fingerprint = persistent_cache.fn_fingerprint(scaled)
+  finally:
+    scale = 3 
+  assert old_fingerprint != new_fingerprint 
+  
+def test_load_without_translation():
+  x = np.ones(4)
+  expected = scaled(x)
+  first = jit(scaled)
+  expect_eq(first(x), expected)
+  if persistent_cache.index_dir() is None:
+    return 
+  # a fresh wrapper should find the compiled entry point on disk
+  second = jit(scaled)
+  expect_eq(second(x), expected)
+  assert second.untyped is None, "Expected entry point to be loaded without translating"
+  
+  # later calls shouldn't go back to the index on disk
+  loads = []
+  original_load = persistent_cache._load
+  def counting_load(filename):
+    loads.append(filename)
+    return original_load(filename)
+  persistent_cache._load = counting_load 
+  try:
+    for _ in xrange(10):
+      expect_eq(second(x), expected)
+  finally:
+    persistent_cache._load = original_load
+  assert len(loads) == 0, "Expected no index reads on warm calls, got %d" % len(loads)
+
+def test_encode_types():
+  from parakeet import Int32, Float64, make_array_type, make_tuple_type, NoneType 
+  for t in [Int32, make_array_type(Float64, 2), 
+            make_tuple_type([Int32, make_array_type(Int32, 1)]), NoneType]:
+    assert persistent_cache.decode_type(persistent_cache.encode_type(t)) == t
+ 
+if __name__ == '__main__':
+  run_local_tests()
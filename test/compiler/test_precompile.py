@@ -0,0 +1,69 @@
+import numpy as np 
+
+import parakeet 
+from parakeet import jit, Float64, Int64, make_array_type, specialize, config
+from parakeet import c_backend, openmp_backend
+from parakeet.c_backend.prepare_args import prepare_args
+from parakeet.frontend import persistent_cache
+from parakeet.testing_helpers import run_local_tests, expect_eq 
+
+def axpy(a, x, y):
+  return a * x + y 
+
+def test_precompile_types():
+  f = jit(axpy)
+  vec_t = make_array_type(Float64, 1)
+  results = parakeet.precompile([(f, [Float64, vec_t, vec_t]), 
+                                 (f, [Int64, vec_t, vec_t])], workers = 2)
+  assert len(results) == 2
+  for r in results:
+    compiled_fn = r.get()
+    assert compiled_fn.c_fn is not None
+  assert len(f._dispatch) == 2, "Expected dispatch entries for both signatures"
+  x = np.arange(10, dtype='float64')
+  y = np.ones(10)
+  expect_eq(f(3.0, x, y), axpy(3.0, x, y))
+  expect_eq(f(3, x, y), axpy(3, x, y))
+  assert len(f._dispatch) == 2, "Calls shouldn't have added new dispatch entries"
+  
+def backend_cache_key(fn, args):
+  typed_fn, linear_args = specialize(fn, args)
+  linear_args = prepare_args(linear_args, typed_fn.input_types)
+  backend_module = openmp_backend if config.backend == 'openmp' else c_backend 
+  entry_fn = backend_module.specialize_entry(typed_fn, linear_args)
+  run_function = backend_module.run_function
+  return run_function.entry_key(entry_fn), run_function._cache 
+
+def test_precompile_example_values():
+  x = np.arange(12).reshape(3,4)
+  results = parakeet.precompile([(axpy, [2, x, x]), (axpy, [2, x.T, x])])
+  for r in results:
+    r.get()
+  # plain functions only benefit if the backend's cache got filled in 
+  for args in [(2, x, x), (2, x.T, x)]:
+    key, cache = backend_cache_key(axpy, args)
+    assert key in cache, "Expected precompiled entry for %s" % (args,)
+  expect_eq(jit(axpy)(2, x.T, x.T), axpy(2, x.T, x.T))
+
+def test_precompile_failed_registration():
+  # errors after compiling have to show up in the results rather than 
+  # killing the pool's result handler and leaving get() hanging
+  original_save_entry = persistent_cache.save_entry
+  def broken_save_entry(*args):
+    raise IOError("disk full")
+  persistent_cache.save_entry = broken_save_entry
+  try:
+    f = jit(axpy)
+    vec_t = make_array_type(Float64, 1)
+    results = parakeet.precompile([(f, [Float64, vec_t, vec_t]), 
+                                   (f, [Float64, vec_t, vec_t])], workers = 2)
+    for r in results:
+      try:
+        r.get(60)
+      except IOError:
+        pass
+  finally:
+    persistent_cache.save_entry = original_save_entry
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import parakeet
+from parakeet import jit
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def profile_call(f, *args):
+  # don't let entry points compiled by earlier runs of these
+  # tests get loaded from the persistent cache
+  persistent = parakeet.config.persistent_cache
+  parakeet.config.persistent_cache = False
+  try:
+    with parakeet.profile_compile() as profile:
+      result = f(*args)
+  finally:
+    parakeet.config.persistent_cache = persistent
+  return result, profile
+
+def profiled_axpy(a, x, y):
+  return a * x + y
+
+def profiled_axpb(a, x, b):
+  # the constant keeps this from sharing its optimized code with
+  # any structurally identical function compiled by other tests
+  return a * x + 0.5 * b
+
+def test_profile_categories():
+  f = jit(profiled_axpb)
+  x = np.arange(10.0)
+  result, profile = profile_call(f, 2.0, x, x)
+  expect_eq(result, 2.5 * x)
+  jit_events = profile.events("jit")
+  expect_eq(len(jit_events), 1)
+  root = jit_events[0]
+  assert root.name == "profiled_axpb", root
+  categories = set(event.category for event in profile.events())
+  for expected in ("frontend", "type_inference", "phase", "transform", "codegen"):
+    assert expected in categories, "Missing %s events in %s" % (expected, categories)
+  # children never outlast their parents
+  for event in root.walk():
+    for child in event.children:
+      assert event.start <= child.start and child.end <= event.end, (event, child)
+  summary = profile.summary()
+  assert summary["phase"]["count"] > 0
+  assert summary["jit"]["time"] <= profile.end - profile.start
+
+def profiled_double(x):
+  return x * 2
+
+def test_profile_cache_hits():
+  x = np.arange(5)
+  profile_call(jit(profiled_double), x)
+  # a new jit object has its own dispatch table but shares all the
+  # compiler's caches with the first one
+  _, profile = profile_call(jit(profiled_double), x)
+  phases = profile.events("phase")
+  assert len(phases) > 0
+  assert all(event.duration == 0 for event in phases), phases
+  assert any(event.args.get('cached') for event in profile.events()), profile
+
+def test_no_events_outside_profile():
+  with parakeet.profile_compile() as profile:
+    pass
+  jit(profiled_axpy)(1, np.arange(3), np.arange(3))
+  assert profile.roots == []
+
+def test_chrome_trace():
+  f = jit(profiled_axpy)
+  x = np.arange(3, dtype = 'float32')
+  _, profile = profile_call(f, 1.0, x, x)
+  filename = tempfile.mktemp(suffix = ".json")
+  profile.save_chrome_trace(filename)
+  with open(filename) as f:
+    trace = json.load(f)
+  os.remove(filename)
+  events = trace["traceEvents"]
+  expect_eq(len(events), len(profile.events()))
+  for event in events:
+    assert event["ph"] in ("X", "i"), event
+    assert event["ts"] >= 0
+  assert any(event["cat"] == "jit" and event["ph"] == "X" for event in events)
+
+if __name__ == '__main__':
+  run_local_tests()
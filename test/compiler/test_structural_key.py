@@ -0,0 +1,87 @@
+import numpy as np
+
+import parakeet
+from parakeet import config, jit
+from parakeet.analysis import structural_key
+from parakeet.frontend import ast_conversion
+from parakeet.frontend.run_function import specialize
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def typed(fn, *args):
+  untyped = ast_conversion.translate_function_value(fn)
+  typed_fn, _ = specialize(untyped, args)
+  return typed_fn
+
+def clipped_sum(x, bound):
+  total = 0
+  for i in range(len(x)):
+    if x[i] < bound:
+      total += x[i]
+    else:
+      total += bound
+  return total
+
+def renamed_clipped_sum(values, limit):
+  acc = 0
+  for j in range(len(values)):
+    if values[j] < limit:
+      acc += values[j]
+    else:
+      acc += limit
+  return acc
+
+def clipped_sum_plus_one(x, bound):
+  total = 1
+  for i in range(len(x)):
+    if x[i] < bound:
+      total += x[i]
+    else:
+      total += bound
+  return total
+
+def test_same_key_after_renaming():
+  x = np.arange(5)
+  key = structural_key(typed(clipped_sum, x, 3))
+  assert key is not None
+  expect_eq(key == structural_key(typed(renamed_clipped_sum, x, 3)), True)
+
+def test_different_keys():
+  x = np.arange(5)
+  key = structural_key(typed(clipped_sum, x, 3))
+  assert key != structural_key(typed(clipped_sum_plus_one, x, 3))
+  assert key != structural_key(typed(clipped_sum, x.astype('float64'), 3))
+  assert key != structural_key(typed(clipped_sum, x, 3.0))
+
+def test_config_in_key():
+  fn = typed(clipped_sum, np.arange(5), 3)
+  key = structural_key(fn, config)
+  old_value = config.opt_licm
+  config.opt_licm = not old_value
+  try:
+    assert key != structural_key(fn, config)
+  finally:
+    config.opt_licm = old_value
+  expect_eq(key == structural_key(fn, config), True)
+
+def make_scaled_sum(c):
+  def scaled_sum(x):
+    total = 0.0
+    for xi in x:
+      total += xi * c
+    return total
+  return scaled_sum
+
+def test_closures_share_phases():
+  x = np.arange(10.0)
+  persistent = config.persistent_cache
+  config.persistent_cache = False
+  try:
+    expect_eq(jit(make_scaled_sum(2.0))(x), 2 * np.sum(x))
+    with parakeet.profile_compile() as profile:
+      expect_eq(jit(make_scaled_sum(3.0))(x), 3 * np.sum(x))
+  finally:
+    config.persistent_cache = persistent
+  assert profile.summary()["phase"]["structural"] > 0, profile
+
+if __name__ == '__main__':
+  run_local_tests()
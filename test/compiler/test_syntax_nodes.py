@@ -0,0 +1,51 @@
+from parakeet.ndtypes import Float64, Int64
+from parakeet.syntax import (Assign, ConstArray, Const, ForLoop, Index, Map,
+                             Scan, Tuple, Var)
+from parakeet.testing_helpers import run_local_tests, expect_eq
+from parakeet.transforms.clone_function import CloneFunction
+
+def test_no_instance_dict():
+  nodes = [Const(1), Var("x"), Index(Var("x"), Const(0)),
+           Map(fn = Var("f"), args = (Var("x"),), axis = Const(0)),
+           Assign(Var("x"), Const(1))]
+  for node in nodes:
+    assert not hasattr(node, '__dict__'), \
+      "Expected %s to store its fields in slots" % node.node_type()
+
+def test_declared_members():
+  assert Index.members() == ('value', 'index', 'check_negative'), Index.members()
+  assert ForLoop.members() == ('var', 'start', 'stop', 'step', 'body', 'merge'), \
+    ForLoop.members()
+  # fields of mixins come from the classes using them
+  assert set(Scan.members()) == \
+    set(['fn', 'output', 'args', 'axis', 'combine', 'init', 'emit'])
+  # annotations aren't fields
+  assert 'type' not in Map.members()
+  assert 'source_info' not in Assign.members()
+
+def test_positional_stmt_fields():
+  stmt = Assign(Var("x"), Const(1))
+  assert stmt.lhs.name == "x"
+  assert stmt.rhs.value == 1
+  assert stmt.source_info is None
+
+def test_unknown_field():
+  try:
+    Map(fn = Var("f"), args = (), bogus = 1)
+  except AssertionError:
+    pass
+  else:
+    assert False, "Expected unknown keyword to be rejected"
+
+def test_clone_generic_expr():
+  shape = Tuple((Const(3, type = Int64),))
+  expr = ConstArray(shape, Const(1.0, type = Float64))
+  clone = CloneFunction().transform_expr(expr)
+  assert clone is not expr
+  assert clone.__class__ is ConstArray
+  assert clone.shape is not expr.shape
+  expect_eq(clone.value.value, 1.0)
+  assert clone.type is expr.type
+
+if __name__ == '__main__':
+  run_local_tests()
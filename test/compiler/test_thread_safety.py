@@ -0,0 +1,93 @@
+import threading
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from parakeet import config, jit
+from parakeet.frontend.run_function import run_python_fn
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def scaled_sum(x, c):
+  total = 0
+  for xi in x:
+    total += xi * c
+  return total
+
+def clip(x, bound):
+  return np.minimum(x, bound)
+
+inputs = [np.arange(20), np.arange(20.0), np.arange(20).astype('float32'),
+          np.arange(20).astype('int32')]
+scales = [2, 2.5]
+
+def run_in_threads(fn, n_calls, n_threads = 8):
+  pool = ThreadPool(n_threads)
+  try:
+    return pool.map(fn, range(n_calls))
+  finally:
+    pool.close()
+    pool.join()
+
+def test_concurrent_dispatch():
+  persistent = config.persistent_cache
+  config.persistent_cache = False
+  try:
+    jit_sum = jit(scaled_sum)
+    jit_clip = jit(clip)
+    def call(i):
+      x = inputs[i % len(inputs)]
+      c = scales[(i // len(inputs)) % len(scales)]
+      return (x, c, jit_sum(x, c), jit_clip(x, c))
+    for (x, c, total, clipped) in run_in_threads(call, 200):
+      expect_eq(total, scaled_sum(x, c))
+      expect_eq(clipped, clip(x, c))
+    # every signature got compiled exactly once
+    n_signatures = len(inputs) * len(scales)
+    expect_eq(jit_sum.call_stats.misses, n_signatures)
+    expect_eq(jit_clip.call_stats.misses, n_signatures)
+  finally:
+    config.persistent_cache = persistent
+
+def test_single_flight():
+  persistent = config.persistent_cache
+  config.persistent_cache = False
+  try:
+    f = jit(scaled_sum)
+    x = np.arange(100.0)
+    start = threading.Event()
+    def call(i):
+      start.wait()
+      return f(x, 3.0)
+    pool = ThreadPool(8)
+    try:
+      results = pool.map_async(call, range(8))
+      start.set()
+      for result in results.get():
+        expect_eq(result, scaled_sum(x, 3.0))
+    finally:
+      pool.close()
+      pool.join()
+    expect_eq(f.call_stats.misses, 1)
+  finally:
+    config.persistent_cache = persistent
+
+def test_concurrent_failures():
+  f = jit(scaled_sum)
+  def call(i):
+    try:
+      f("not an array", 1)
+    except Exception:
+      return True
+    return False
+  assert all(run_in_threads(call, 16)), "Expected every call to fail"
+  expect_eq(f(np.arange(3), 2), 6)
+
+def test_concurrent_run_python_fn():
+  def call(i):
+    x = inputs[i % len(inputs)]
+    return (x, run_python_fn(clip, [x, 4]))
+  for (x, clipped) in run_in_threads(call, 40):
+    expect_eq(clipped, clip(x, 4))
+
+if __name__ == '__main__':
+  run_local_tests()
@@ -0,0 +1,134 @@
+import numpy as np
+
+from parakeet import jit, config
+from parakeet.c_backend import config as c_config
+from parakeet.frontend.dispatch import QuickDispatchEntry
+from parakeet.testing_helpers import run_local_tests, expect_eq
+
+def without_persistent_cache(test):
+  """
+  Entry points compiled by an earlier run would otherwise be loaded
+  from disk and the background compilation would never happen
+  """
+  def wrapped():
+    old_value = config.persistent_cache
+    config.persistent_cache = False
+    try:
+      test()
+    finally:
+      config.persistent_cache = old_value
+  wrapped.__name__ = test.__name__
+  return wrapped
+
+def add_one(x):
+  return x + 1
+
+@without_persistent_cache
+def test_tiered_scalar():
+  f = jit(add_one, tiered = True)
+  expect_eq(f(3), 4)
+  assert f.tier_counts['python'] >= 1, "Expected first call to run as Python: %s" % f.tier_counts
+  f.wait()
+  expect_eq(f(3), 4)
+  assert f.tier_counts['native'] >= 1, "Expected native entry to be used: %s" % f.tier_counts
+  assert f.tier_counts['python'] + f.tier_counts['native'] == 2
+
+def add_two(x):
+  return x + 2
+
+@without_persistent_cache
+def test_tiered_array():
+  f = jit(add_two, tiered = True)
+  x = np.arange(10, dtype = 'float64')
+  expect_eq(f(x), x + 2)
+  assert f.tier_counts['python'] >= 1, "Expected first call to run as Python: %s" % f.tier_counts
+  for _ in xrange(2):
+    expect_eq(f(x), x + 2)
+  f.wait()
+  expect_eq(f(x), x + 2)
+  assert f.tier_counts['python'] + f.tier_counts['native'] == 4
+  assert f.tier_counts['native'] >= 1
+
+def increment_then_sum(x):
+  x[0] += 1
+  # Python's sum doesn't take an axis argument, so the Python tier fails
+  # after it has already modified its input
+  return sum(x, axis = 0)
+
+@without_persistent_cache
+def test_tiered_python_fails():
+  f = jit(increment_then_sum, tiered = True)
+  x = np.zeros(4)
+  try:
+    f(x)
+  except TypeError:
+    pass
+  else:
+    assert False, "Expected the Python tier's TypeError"
+  expect_eq(x[0], 1.0)
+  f.wait()
+
+def divide(x, y):
+  return x / y
+
+@without_persistent_cache
+def test_tiered_user_errors():
+  f = jit(divide, tiered = True)
+  try:
+    f(1, 0)
+  except ZeroDivisionError:
+    pass
+  else:
+    assert False, "Expected ZeroDivisionError from the Python tier"
+  f.wait()
+
+def with_opt_tiers(test):
+  def wrapped():
+    old_values = (c_config.tiered_opt_levels, c_config.hot_call_threshold)
+    c_config.tiered_opt_levels = True
+    c_config.hot_call_threshold = 5
+    try:
+      test()
+    finally:
+      c_config.tiered_opt_levels, c_config.hot_call_threshold = old_values
+  wrapped.__name__ = test.__name__
+  return wrapped
+
+def scaled_total(x, c):
+  total = 0.0
+  for xi in x:
+    total += xi * c
+  return total
+
+@without_persistent_cache
+@with_opt_tiers
+def test_hot_recompile():
+  f = jit(scaled_total)
+  x = np.arange(100.0)
+  expect_eq(f(x, 2.0), 2 * np.sum(x))
+  entries = f._dispatch.values()
+  expect_eq(len(entries), 1)
+  quick_entry = entries[0]
+  assert isinstance(quick_entry, QuickDispatchEntry), quick_entry
+  for _ in xrange(c_config.hot_call_threshold):
+    expect_eq(f(x, 2.0), 2 * np.sum(x))
+  f.wait()
+  hot_entry = f._dispatch.values()[0]
+  assert type(hot_entry) is not QuickDispatchEntry, hot_entry
+  assert hot_entry.c_fn is not quick_entry.c_fn
+  expect_eq(f.call_stats.misses, 1)
+  expect_eq(f.call_stats.hot_recompiles, 1)
+  expect_eq(f(x, 2.0), 2 * np.sum(x))
+
+@without_persistent_cache
+@with_opt_tiers
+def test_cold_stays_quick():
+  f = jit(scaled_total)
+  x = np.arange(10, dtype = 'int32')
+  expect_eq(f(x, 3), 3 * np.sum(x))
+  f.wait()
+  assert isinstance(f._dispatch.values()[0], QuickDispatchEntry)
+  expect_eq(f.call_stats.hot_recompiles, 0)
+
+if __name__ == '__main__':
+  run_local_tests()